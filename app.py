@@ -3,8 +3,9 @@ Application Flask - Système de Diagnostic Frigorifique avec IA
 Remplace le workflow n8n avec toutes les fonctionnalités intégrées
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from datetime import datetime
+import json
 import logging
 import sys
 import os
@@ -19,10 +20,18 @@ if sys.platform == 'win32':
 from services.agent_ia import AgentIAService
 from services.telegram_service import TelegramService
 from services.apprentissage_service import ApprentissageService
+from services.dataset_segments import encoder_position, decoder_position
+from services.export_dataset import FORMATS_EXPORT, exporter_csv, exporter_ndjson, exporter_parquet
+from services.echantillonnage import parser_quotas
 
 # Utils
-from utils.validation import valider_donnees_capteurs
-from utils.helpers import generer_diagnostic_id
+from utils.validation import valider_donnees_capteurs, valider_lot_capteurs, ligne_validee
+from utils.payload import decoder_corps, normaliser_payload, PayloadNonSupporte
+from utils.frame_binaire import decoder_frames, est_frame, TYPES_MIME_FRAME
+from utils.helpers import generer_diagnostic_id, parser_duree, normaliser_timestamp, horodatage_releve
+
+# Mots-clés (moteur partagé avec le service IA)
+from gpt.keyword_matcher import KeywordMatcher
 
 # Config
 from config import Config
@@ -51,7 +60,24 @@ logger.info(f"🤖 IA Service URL: {IA_SERVICE_URL}")
 logger.info(f"💬 Chat Service URL: {CHAT_SERVICE_URL}")
 agent_ia = AgentIAService(Config.AGENT_IA_URL)
 telegram = TelegramService(Config.TELEGRAM_BOT_TOKEN, Config.TELEGRAM_CHAT_ID)
-apprentissage = ApprentissageService()
+apprentissage = ApprentissageService(
+    seuil_retraining=Config.SEUIL_RETRAINING,
+    derive_seuil_psi=Config.DERIVE_SEUIL_PSI,
+    derive_intervalle=Config.DERIVE_INTERVALLE,
+    derive_cooldown=Config.DERIVE_COOLDOWN,
+    derive_fenetre=Config.DERIVE_FENETRE,
+    reservoir_quota_normal=Config.RESERVOIR_QUOTA_NORMAL,
+    reservoir_quota_panne=Config.RESERVOIR_QUOTA_PANNE,
+    reservoir_quotas=parser_quotas(Config.RESERVOIR_QUOTAS),
+    seuil_nouvelle_panne=Config.SEUIL_NOUVELLE_PANNE,
+    decouverte_rayon=Config.DECOUVERTE_RAYON,
+    decouverte_seuil_confiance=Config.DECOUVERTE_SEUIL_CONFIANCE,
+    flush_every=Config.COMPTEUR_FLUSH_EVERY,
+    flush_interval=Config.COMPTEUR_FLUSH_INTERVAL,
+    archive_capacite=Config.ARCHIVE_CAPACITE,
+    dataset_lignes_par_segment=Config.DATASET_LIGNES_PAR_SEGMENT,
+    dataset_max_segments=Config.DATASET_MAX_SEGMENTS
+)
 
 # Test IA Service au démarrage
 try:
@@ -215,155 +241,239 @@ def diagnostic_frigo():
     """
     Endpoint principal - Remplace le webhook n8n
     Traite un diagnostic complet de bout en bout
+    
+    Accepte un relevé plat, imbriqué ({"capteurs": {...}}) ou un lot
+    ([...] ou {"releves": [...]}), en JSON ou MessagePack, ainsi que des
+    trames binaires concaténées (application/vnd.frigo.frame, ou
+    application/octet-stream commençant par le magic des trames).
     """
+    # 1️⃣ DÉCODAGE ET VALIDATION DES DONNÉES
+    logger.info("Réception nouvelle requête de diagnostic")
+    corps = request.get_data()
+    if request.mimetype in TYPES_MIME_FRAME or (request.mimetype == 'application/octet-stream' and est_frame(corps)):
+        return diagnostic_frames(corps)
+    
     try:
-        # 1️⃣ VALIDATION DES DONNÉES
-        logger.info("Réception nouvelle requête de diagnostic")
-        donnees = request.get_json(force=True)
-        
-        donnees_validees = valider_donnees_capteurs(donnees)
-        diagnostic_id = generer_diagnostic_id()
-        timestamp = datetime.now().isoformat()
-        
-        diagnostic_data = {
-            'diagnostic_id': diagnostic_id,
-            'timestamp': timestamp,
-            'donnees_capteurs': donnees_validees,
-            'source': donnees.get('source', 'capteur_principal'),
-            'localisation': donnees.get('localisation', 'Zone non spécifiée')
-        }
-        
-        logger.info(f"Données validées - ID: {diagnostic_id}")
-        
-        # 2️⃣ APPEL AGENT IA POUR PRÉDICTION
-        logger.info("Appel de l'agent IA...")
-        prediction = agent_ia.predict(donnees_validees)
-        
-        # Fusion des résultats
-        diagnostic_data['prediction_ia'] = prediction
-        diagnostic_data['panne_detectee'] = prediction.get('panne_detectee') is not None
+        releves, est_lot = normaliser_payload(decoder_corps(corps, request.content_type))
+    except PayloadNonSupporte as e:
+        return jsonify({'success': False, 'error': str(e)}), 415
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if est_lot:
+        return diagnostic_lot(releves)
+    
+    try:
+        donnees_validees = valider_donnees_capteurs(releves[0]['capteurs'])
+        return jsonify(traiter_releve(donnees_validees, releves[0])), 200
         
-        logger.info(f"Prédiction: {prediction.get('panne_detectee', 'Aucune')}")
+    except Exception as e:
+        logger.error(f"Erreur lors du diagnostic: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'diagnostic_id': None
+        }), 500
+
+
+def diagnostic_frames(corps):
+    """Traite des trames binaires: décodage et validation numpy, sans dict intermédiaire"""
+    try:
+        frames = decoder_frames(corps)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    releves = [
+        {'source': device_id.decode('utf-8', 'replace'), 'timestamp': timestamp}
+        for device_id, timestamp in zip(frames['device_id'], frames['timestamp'].tolist())
+    ]
+    return diagnostic_lot(releves, valider_lot_capteurs(frames['valeurs']))
+
+
+def diagnostic_lot(releves, validation=None):
+    """Traite un lot de relevés: validation vectorisée puis pipeline par relevé valide"""
+    if len(releves) > Config.LOT_MAX_RELEVES:
+        return jsonify({
+            'success': False,
+            'error': f"Lot trop volumineux: {len(releves)} relevés (max {Config.LOT_MAX_RELEVES} par requête)"
+        }), 413
+    if validation is None:
+        validation = valider_lot_capteurs([releve['capteurs'] for releve in releves])
+    resultats = []
+    
+    for index, releve in enumerate(releves):
+        if not validation['valides'][index]:
+            resultats.append({
+                'success': False,
+                'index': index,
+                'error': f"Données insuffisantes: {len(ligne_validee(validation, index))}/{len(validation['capteurs'])}"
+            })
+            continue
+        try:
+            resultats.append({'index': index, **traiter_releve(ligne_validee(validation, index), releve)})
+        except Exception as e:
+            logger.error(f"Erreur diagnostic relevé {index}: {e}", exc_info=True)
+            resultats.append({'success': False, 'index': index, 'error': str(e)})
+    
+    traites = sum(1 for r in resultats if r.get('success'))
+    logger.info(f"Lot traité: {traites}/{len(releves)} relevé(s)")
+    return jsonify({
+        'success': traites > 0 or not releves,
+        'total': len(releves),
+        'traites': traites,
+        'resultats': resultats
+    }), 200
+
+
+def traiter_releve(donnees_validees, releve):
+    """
+    Pipeline complet d'un relevé validé: prédiction, alertes, apprentissage, archivage
+    
+    Args:
+        donnees_validees: Capteurs validés
+        releve: Relevé normalisé (source, localisation...)
         
-        # 3️⃣ SI PANNE DÉTECTÉE → ANALYSE IA + TELEGRAM
-        if diagnostic_data['panne_detectee']:
-            logger.info("Panne détectée - Envoi au service IA pour analyse")
+    Returns:
+        Résumé du diagnostic (corps de réponse)
+    """
+    diagnostic_id = generer_diagnostic_id()
+    # Heure de mesure (trame, relevé JSON) plutôt que de réception
+    timestamp = horodatage_releve(releve.get('timestamp'))
+    
+    diagnostic_data = {
+        'diagnostic_id': diagnostic_id,
+        'timestamp': timestamp,
+        'donnees_capteurs': donnees_validees,
+        'source': releve.get('source') or 'capteur_principal',
+        'localisation': releve.get('localisation') or 'Zone non spécifiée'
+    }
+    
+    logger.info(f"Données validées - ID: {diagnostic_id}")
+    
+    # 2️⃣ APPEL AGENT IA POUR PRÉDICTION
+    logger.info("Appel de l'agent IA...")
+    prediction = agent_ia.predict(donnees_validees)
+    
+    # Fusion des résultats
+    diagnostic_data['prediction_ia'] = prediction
+    diagnostic_data['panne_detectee'] = prediction.get('panne_detectee') is not None
+    
+    logger.info(f"Prédiction: {prediction.get('panne_detectee', 'Aucune')}")
+    
+    # 3️⃣ SI PANNE DÉTECTÉE → ANALYSE IA + TELEGRAM
+    if diagnostic_data['panne_detectee']:
+        logger.info("Panne détectée - Envoi au service IA pour analyse")
+        
+        try:
+            # Envoyer l'alerte au service IA pour traitement
+            alert_data = {
+                'diagnostic_id': diagnostic_id,
+                'title': f"Panne détectée: {prediction.get('panne_detectee', 'Inconnu')}",
+                'severity': 'critical',
+                'sensors': donnees_validees,
+                'prediction': prediction
+            }
             
-            try:
-                # Envoyer l'alerte au service IA pour traitement
-                alert_data = {
-                    'diagnostic_id': diagnostic_id,
-                    'title': f"Panne détectée: {prediction.get('panne_detectee', 'Inconnu')}",
-                    'severity': 'critical',
-                    'sensors': donnees_validees,
-                    'prediction': prediction
-                }
-                
-                ia_response = requests.post(
-                    f"{IA_SERVICE_URL}/api/alerts/process",
-                    json=alert_data,
-                    timeout=10
-                )
-                
-                if ia_response.status_code == 200:
-                    enriched_alert = ia_response.json()
-                    texte_analyse = enriched_alert.get('analysis', str(enriched_alert))
-                    logger.info("Alerte enrichie par le service IA")
-                else:
-                    logger.warning(f"Service IA retourné {ia_response.status_code}")
-                    texte_analyse = f"Panne détectée: {prediction.get('panne_detectee', 'Anomalie')} - Score: {prediction.get('score', 0)}%"
-                
-            except Exception as e:
-                logger.error(f"Erreur appel service IA: {e}")
-                texte_analyse = f"Alerte: Panne détectée - {prediction.get('panne_detectee', 'Inconnue')}"
+            ia_response = requests.post(
+                f"{IA_SERVICE_URL}/api/alerts/process",
+                json=alert_data,
+                timeout=10
+            )
             
-            # Envoyer alerte Telegram
-            telegram.envoyer_alerte_panne_sync(texte_analyse)
-            logger.info("Alerte Telegram envoyée")
-        
-        # 4️⃣ GESTION APPRENTISSAGE CONTINU
-        logger.info("Mise à jour compteur apprentissage")
-        apprentissage_data = apprentissage.traiter_diagnostic(diagnostic_data)
-        diagnostic_data['apprentissage'] = apprentissage_data
+            if ia_response.status_code == 200:
+                enriched_alert = ia_response.json()
+                texte_analyse = enriched_alert.get('analysis', str(enriched_alert))
+                logger.info("Alerte enrichie par le service IA")
+            else:
+                logger.warning(f"Service IA retourné {ia_response.status_code}")
+                texte_analyse = f"Panne détectée: {prediction.get('panne_detectee', 'Anomalie')} - Score: {prediction.get('score', 0)}%"
+            
+        except Exception as e:
+            logger.error(f"Erreur appel service IA: {e}")
+            texte_analyse = f"Alerte: Panne détectée - {prediction.get('panne_detectee', 'Inconnue')}"
         
-        # 5️⃣ RÉENTRAÎNEMENT SI SEUIL ATTEINT
-        if apprentissage_data.get('retraining_requis'):
-            logger.info("Seuil atteint - Lancement réentraînement")
-            resultat_retraining = agent_ia.retrain()
+        # Envoyer alerte Telegram
+        telegram.envoyer_alerte_panne_sync(texte_analyse)
+        logger.info("Alerte Telegram envoyée")
+    
+    # 4️⃣ GESTION APPRENTISSAGE CONTINU
+    logger.info("Mise à jour compteur apprentissage")
+    apprentissage_data = apprentissage.traiter_diagnostic(diagnostic_data)
+    diagnostic_data['apprentissage'] = apprentissage_data
+    
+    # 5️⃣ RÉENTRAÎNEMENT SI DÉRIVE DÉTECTÉE
+    if apprentissage_data.get('retraining_requis'):
+        logger.info(f"Dérive détectée ({', '.join(apprentissage_data.get('derive', []))}) - Lancement réentraînement")
+        resultat_retraining = agent_ia.retrain(
+            compteur=apprentissage_data.get('compteur_total', 0),
+            dataset_content=apprentissage.jeu_entrainement()
+        )
+        
+        # Notification via le service IA
+        try:
+            ia_response = requests.post(
+                f"{IA_SERVICE_URL}/api/learn",
+                json={'learning_data': apprentissage_data, 'event': 'retraining'},
+                timeout=10
+            )
+            if ia_response.status_code == 200:
+                message_retraining = "✅ Réentraînement complété - Service IA mis à jour"
+                logger.info("Service IA notifié du réentraînement")
+            else:
+                message_retraining = f"⚠️ Réentraînement effectué mais erreur IA: {ia_response.status_code}"
+        except Exception as e:
+            logger.error(f"Erreur notification IA retraining: {e}")
+            message_retraining = "✅ Réentraînement effectué"
+        
+        if message_retraining:
+            telegram.envoyer_notification_sync(message_retraining)
+            logger.info(f"🔍 DEBUG - Contenu: {str(message_retraining)[:150]}")
+            telegram.envoyer_notification_sync(message_retraining)
+    
+    # 6️⃣ NOUVELLE PANNE DÉTECTÉE
+    if apprentissage_data.get('nouvelles_pannes_a_entrainer'):
+        logger.info("Nouvelle panne identifiée")
+        for nouvelle_panne in apprentissage_data['nouvelles_pannes_a_entrainer']:
+            agent_ia.train_new_fault(nouvelle_panne)
             
             # Notification via le service IA
             try:
                 ia_response = requests.post(
                     f"{IA_SERVICE_URL}/api/learn",
-                    json={'learning_data': apprentissage_data, 'event': 'retraining'},
+                    json={'fault_data': nouvelle_panne, 'event': 'new_fault'},
                     timeout=10
                 )
                 if ia_response.status_code == 200:
-                    message_retraining = "✅ Réentraînement complété - Service IA mis à jour"
-                    logger.info("Service IA notifié du réentraînement")
+                    message_nouvelle = f"🆕 Nouvelle panne entraînée: {nouvelle_panne.get('name', 'Inconnue')}"
+                    logger.info("Service IA notifié de la nouvelle panne")
                 else:
-                    message_retraining = f"⚠️ Réentraînement effectué mais erreur IA: {ia_response.status_code}"
+                    message_nouvelle = f"🆕 Nouvelle panne détectée: {nouvelle_panne.get('name', 'Inconnue')}"
             except Exception as e:
-                logger.error(f"Erreur notification IA retraining: {e}")
-                message_retraining = "✅ Réentraînement effectué"
+                logger.error(f"Erreur notification IA nouvelle panne: {e}")
+                message_nouvelle = f"🆕 Nouvelle panne: {nouvelle_panne.get('name', 'Inconnue')}"
             
-            if message_retraining:
-                telegram.envoyer_notification_sync(message_retraining)
-                logger.info(f"🔍 DEBUG - Contenu: {str(message_retraining)[:150]}")
-                telegram.envoyer_notification_sync(message_retraining)
-        
-        # 6️⃣ NOUVELLE PANNE DÉTECTÉE
-        if apprentissage_data.get('nouvelles_pannes_a_entrainer'):
-            logger.info("Nouvelle panne identifiée")
-            for nouvelle_panne in apprentissage_data['nouvelles_pannes_a_entrainer']:
-                agent_ia.train_new_fault(nouvelle_panne)
-                
-                # Notification via le service IA
-                try:
-                    ia_response = requests.post(
-                        f"{IA_SERVICE_URL}/api/learn",
-                        json={'fault_data': nouvelle_panne, 'event': 'new_fault'},
-                        timeout=10
-                    )
-                    if ia_response.status_code == 200:
-                        message_nouvelle = f"🆕 Nouvelle panne entraînée: {nouvelle_panne.get('name', 'Inconnue')}"
-                        logger.info("Service IA notifié de la nouvelle panne")
-                    else:
-                        message_nouvelle = f"🆕 Nouvelle panne détectée: {nouvelle_panne.get('name', 'Inconnue')}"
-                except Exception as e:
-                    logger.error(f"Erreur notification IA nouvelle panne: {e}")
-                    message_nouvelle = f"🆕 Nouvelle panne: {nouvelle_panne.get('name', 'Inconnue')}"
-                
-                if message_nouvelle:
-                    telegram.envoyer_notification_sync(message_nouvelle)
-        
-        # 7️⃣ ARCHIVAGE
-        apprentissage.archiver_diagnostic(diagnostic_data)
-        
-        # 8️⃣ RÉPONSE
-        logger.info(f"Diagnostic {diagnostic_id} terminé avec succès")
-        return jsonify({
-            'success': True,
-            'diagnostic_id': diagnostic_id,
-            'timestamp': timestamp,
-            'panne_detectee': diagnostic_data['panne_detectee'],
-            'type_panne': prediction.get('panne_detectee'),
-            'score_confiance': prediction.get('score', 0),
-            'alerte_envoyee': diagnostic_data['panne_detectee'],
-            'apprentissage': {
-                'compteur': apprentissage_data.get('compteur_total', 0),
-                'retraining_requis': apprentissage_data.get('retraining_requis', False),
-                'nouvelle_panne': apprentissage_data.get('nouvelle_panne_detectee', False)
-            }
-        }), 200
-        
-    except Exception as e:
-        logger.error(f"Erreur lors du diagnostic: {str(e)}", exc_info=True)
-        return jsonify({
-            'success': False,
-            'error': str(e),
-            'diagnostic_id': diagnostic_id if 'diagnostic_id' in locals() else None
-        }), 500
+            if message_nouvelle:
+                telegram.envoyer_notification_sync(message_nouvelle)
+    
+    # 7️⃣ ARCHIVAGE
+    apprentissage.archiver_diagnostic(diagnostic_data)
+    
+    # 8️⃣ RÉPONSE
+    logger.info(f"Diagnostic {diagnostic_id} terminé avec succès")
+    return {
+        'success': True,
+        'diagnostic_id': diagnostic_id,
+        'timestamp': timestamp,
+        'panne_detectee': diagnostic_data['panne_detectee'],
+        'type_panne': prediction.get('panne_detectee'),
+        'score_confiance': prediction.get('score', 0),
+        'alerte_envoyee': diagnostic_data['panne_detectee'],
+        'apprentissage': {
+            'compteur': apprentissage_data.get('compteur_total', 0),
+            'retraining_requis': apprentissage_data.get('retraining_requis', False),
+            'nouvelle_panne': apprentissage_data.get('nouvelle_panne_detectee', False)
+        }
+    }
 
 
 def generer_prompt_alerte(diagnostic_data):
@@ -417,11 +527,141 @@ TÂCHE:
 
 @app.route('/stats', methods=['GET'])
 def get_stats():
-    """Endpoint pour obtenir les statistiques du système"""
-    stats = apprentissage.get_statistiques()
+    """
+    Endpoint pour obtenir les statistiques du système
+    
+    Utilisation:
+        GET /stats
+        GET /stats?window=24h&group_by=localisation
+    """
+    window = request.args.get('window')
+    group_by = request.args.get('group_by')
+    try:
+        fenetre = parser_duree(window) if window else None
+        stats = apprentissage.get_statistiques(fenetre, group_by)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(stats)
 
 
+@app.route('/api/diagnostics/recent', methods=['GET'])
+def get_recent_diagnostics():
+    """
+    Derniers diagnostics archivés, optionnellement pour un équipement
+    
+    Utilisation:
+        GET /api/diagnostics/recent?source=capteur_principal&limit=10
+    """
+    source = request.args.get('source')
+    limite = min(request.args.get('limit', 10, type=int), Config.ARCHIVE_CAPACITE)
+    diagnostics = apprentissage.derniers_diagnostics(source, limite)
+    return jsonify({
+        'source': source,
+        'count': len(diagnostics),
+        'diagnostics': diagnostics
+    })
+
+
+@app.route('/api/diagnostics/history', methods=['GET'])
+def get_diagnostics_history():
+    """
+    Historique des diagnostics en NDJSON, paginé par curseur
+    
+    Utilisation:
+        GET /api/diagnostics/history?from=2025-01-15&to=2025-01-16T12:00:00
+            &localisation=Zone A&type_panne=fuite_fluide&limit=500&cursor=...
+    
+    Réponse (application/x-ndjson):
+        une ligne JSON par diagnostic, puis une ligne finale
+        {"next_cursor": "..." | null, "count": N}
+    """
+    try:
+        debut = normaliser_timestamp(request.args['from']) if request.args.get('from') else None
+        fin = normaliser_timestamp(request.args['to'], fin=True) if request.args.get('to') else None
+        apres = decoder_position(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    limite = max(1, min(request.args.get('limit', 1000, type=int), 10000))
+    filtres = {
+        colonne: request.args[colonne]
+        for colonne in ('localisation', 'type_panne', 'source')
+        if request.args.get(colonne)
+    }
+    
+    def generer():
+        count = 0
+        suivant = None
+        for position, ligne in apprentissage.historique_diagnostics(debut, fin, filtres, apres):
+            if count == limite:
+                # Il reste au moins une ligne: reprise après la dernière envoyée
+                suivant = encoder_position(derniere)
+                break
+            yield json.dumps(ligne, ensure_ascii=False) + '\n'
+            derniere = position
+            count += 1
+        yield json.dumps({'next_cursor': suivant, 'count': count}) + '\n'
+    
+    return Response(generer(), mimetype='application/x-ndjson')
+
+
+@app.route('/api/diagnostics/<diagnostic_id>', methods=['GET'])
+def get_diagnostic(diagnostic_id):
+    """Diagnostic complet par ID (parmi les derniers archivés)"""
+    diagnostic = apprentissage.obtenir_diagnostic(diagnostic_id)
+    if diagnostic is None:
+        return jsonify({'error': f'Diagnostic {diagnostic_id} introuvable dans l\'archive'}), 404
+    return jsonify(diagnostic)
+
+
+@app.route('/api/dataset/export', methods=['GET'])
+def export_dataset():
+    """
+    Export en flux du dataset d'apprentissage (jamais chargé entier en mémoire)
+    
+    Utilisation:
+        GET /api/dataset/export?format=csv|ndjson|parquet
+            &columns=timestamp,type_panne,Température&from=2025-01-01&to=2025-01-31
+    """
+    format_export = request.args.get('format', 'csv').lower()
+    if format_export not in FORMATS_EXPORT:
+        return jsonify({'error': f"Format non supporté: {format_export} (attendu: {', '.join(FORMATS_EXPORT)})"}), 400
+    
+    colonnes = apprentissage.dataset.colonnes
+    if request.args.get('columns'):
+        demandees = [c.strip() for c in request.args['columns'].split(',') if c.strip()]
+        inconnues = [c for c in demandees if c not in colonnes]
+        if inconnues:
+            return jsonify({'error': f"Colonnes inconnues: {', '.join(inconnues)}", 'colonnes': colonnes}), 400
+        colonnes = demandees
+    
+    try:
+        debut = normaliser_timestamp(request.args['from']) if request.args.get('from') else None
+        fin = normaliser_timestamp(request.args['to'], fin=True) if request.args.get('to') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    exporteurs = {'csv': exporter_csv, 'ndjson': exporter_ndjson, 'parquet': exporter_parquet}
+    flux = exporteurs[format_export](apprentissage.lire_dataset(debut, fin), colonnes)
+    
+    # Démarrer le flux ici pour renvoyer une erreur propre (ex: pyarrow absent)
+    try:
+        premier = next(flux, b'')
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 501
+    
+    def generer():
+        yield premier
+        yield from flux
+    
+    logger.info(f"📤 Export dataset {format_export} - colonnes: {len(colonnes)}")
+    return Response(
+        generer(),
+        mimetype=FORMATS_EXPORT[format_export],
+        headers={'Content-Disposition': f'attachment; filename=dataset_apprentissage.{format_export}'}
+    )
+
+
 @app.route('/test-telegram', methods=['POST'])
 def test_telegram():
     """Endpoint pour tester l'envoi Telegram"""
@@ -481,9 +721,29 @@ def handle_chat():
         return jsonify({'error': str(e)}), 500
 
 
+SYMPTOMES_CLES = [
+    'température', 'bruit', 'condensation', 'froid', 'compresseur',
+    'thermostat', 'ventilateur', 'fuite', 'vibration', 'humidité',
+    'erreur', 'code', 'pression', 'courant', 'tension'
+]
+
+# Sujets du chat (ordre = priorité) et symptômes, cherchés en une seule passe
+MOTS_CLES_CHAT = KeywordMatcher({
+    'sujet': {
+        'diagnostic': ['diagnostic'],
+        'panne': ['panne', 'erreur'],
+        'solution': ['solution', 'comment réparer', 'fix'],
+        'apprendre': ['apprendre', 'learn'],
+        'aide': ['aide', 'help', 'quoi'],
+    },
+    'symptome': {symptome: [symptome] for symptome in SYMPTOMES_CLES},
+})
+
+
 def generer_reponse_chat(message):
     """Génère une réponse intelligente au message du chat"""
     msg_lower = message.lower()
+    sujet = MOTS_CLES_CHAT.premiere(message, 'sujet')
     
     # Commandes système
     if msg_lower.startswith('/status'):
@@ -496,26 +756,26 @@ def generer_reponse_chat(message):
         return "🚨 Alertes actuelles: Aucune alerte critique"
     
     # Diagnostics
-    if 'diagnostic' in msg_lower:
+    if sujet == 'diagnostic':
         symptomes = extraire_symptomes(message)
         if symptomes:
             return f"🔍 Diagnostic basé sur: {', '.join(symptomes)}\n\n✅ Analyse en cours...\n\nRésultat: Voir le rapport complet"
         return "📋 Pour un diagnostic, décrivez les symptômes (température, bruit, froid, etc.)"
     
     # Pannes
-    if 'panne' in msg_lower or 'erreur' in msg_lower:
+    if sujet == 'panne':
         return "⚠️ Panne détectée\n\n🔧 Solutions recommandées:\n1. Vérifier l'alimentation\n2. Vérifier le thermostat\n3. Contacter un technicien si problème persiste"
     
     # Solutions
-    if 'solution' in msg_lower or 'comment réparer' in msg_lower or 'fix' in msg_lower:
+    if sujet == 'solution':
         return "🔧 Étapes de réparation:\n\n1. Débrancher l'appareil\n2. Laisser refroidir 5 minutes\n3. Rebrancher et tester\n\nSi le problème persiste, consultez un professionnel"
     
     # Apprentissage
-    if 'apprendre' in msg_lower or 'learn' in msg_lower:
+    if sujet == 'apprendre':
         return "✅ Apprentissage enregistré!\n\nCe diagnostic sera utilisé pour améliorer les futurs diagnostics"
     
     # Aide générale
-    if 'aide' in msg_lower or 'help' in msg_lower or 'quoi' in msg_lower:
+    if sujet == 'aide':
         return """📖 Guide d'utilisation:
 
 1️⃣ Diagnostic: "Diagnostic: symptômes"
@@ -544,14 +804,7 @@ Consultez CHAT_GUIDE.md pour plus d'infos"""
 
 def extraire_symptomes(message):
     """Extrait les symptômes du message"""
-    symptomes_cles = [
-        'température', 'bruit', 'condensation', 'froid', 'compresseur',
-        'thermostat', 'ventilateur', 'fuite', 'vibration', 'humidité',
-        'erreur', 'code', 'pression', 'courant', 'tension'
-    ]
-    
-    symptomes = [s for s in symptomes_cles if s in message.lower()]
-    return symptomes
+    return list(MOTS_CLES_CHAT.trouver(message)['symptome'])
 
 
 if __name__ == '__main__':
@@ -580,7 +833,7 @@ if __name__ == '__main__':
         
         options = {
             'bind': f'0.0.0.0:{Config.PORT}',
-            'workers': 4,
+            'workers': Config.WEB_WORKERS,
             'worker_class': 'gevent',
             'timeout': 120
         }
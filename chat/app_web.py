@@ -367,6 +367,95 @@ def get_stats():
     }), 200
 
 
+# ------------------------------------------------------------------
+# 💬  SOCKET.IO – CHAT EN FLUX
+# ------------------------------------------------------------------
+def lire_evenements_sse(reponse):
+    """Itère sur (event, data) d'un flux Server-Sent Events"""
+    evenement, donnees = 'message', []
+    for ligne in reponse.iter_lines(decode_unicode=True):
+        if not ligne:
+            if donnees:
+                yield evenement, json.loads('\n'.join(donnees))
+            evenement, donnees = 'message', []
+        elif ligne.startswith('event:'):
+            evenement = ligne[6:].strip()
+        elif ligne.startswith('data:'):
+            donnees.append(ligne[5:].strip())
+
+
+def relayer_reponse_ia(sid, query, user_id, user_name, db_disponible):
+    """Relaye les jetons du service IA vers la room Socket.IO du client"""
+    stream_id = f"{sid}-{datetime.utcnow().timestamp():.6f}"
+    socketio.emit('system_response_start', {'stream_id': stream_id}, room=sid)
+    reply = None
+    try:
+        with requests.post(
+            f"{Config.IA_SERVICE_URL}/api/chat/stream",
+            json={'message': query, 'user_id': str(user_id), 'user_name': user_name},
+            stream=True,
+            timeout=(5, 30)
+        ) as r:
+            r.raise_for_status()
+            for evenement, donnees in lire_evenements_sse(r):
+                if evenement == 'token':
+                    socketio.emit('system_response_chunk',
+                                  {'stream_id': stream_id, 'text': donnees['text']}, room=sid)
+                elif evenement == 'done':
+                    reply = donnees.get('response')
+                elif evenement == 'error':
+                    raise RuntimeError(donnees.get('error', 'erreur inconnue'))
+        if not reply:
+            raise RuntimeError('Réponse vide')
+    except Exception as exc:
+        app.logger.warning(f"⚠️ Flux IA interrompu : {exc}")
+        socketio.emit('system_error', {'stream_id': stream_id, 'error': f"Service IA indisponible : {exc}"}, room=sid)
+        return
+
+    socketio.emit('system_response_end', {'stream_id': stream_id, 'content': reply}, room=sid)
+    if db_disponible:
+        with app.app_context():
+            db.session.add(Message(user_id=1, content=reply, is_from_system=True))
+            db.session.commit()
+
+
+def utilisateur_socket():
+    """Utilisateur de la connexion Socket.IO (invité sans DB, None si non connecté)"""
+    if not current_app.config["DB_AVAILABLE"]:
+        return GuestUser()
+    return current_user if current_user.is_authenticated else None
+
+
+@socketio.on('send_message')
+def on_send_message(data):
+    user = utilisateur_socket()
+    content = (data or {}).get('content', '').strip()
+    if user is None or not content:
+        return
+    if current_app.config["DB_AVAILABLE"]:
+        msg = Message(user_id=user.id, content=content, is_from_system=False)
+        db.session.add(msg)
+        db.session.commit()
+        payload = msg.to_dict()
+    else:
+        payload = {'content': content, 'is_from_system': False,
+                   'username': user.username, 'created_at': datetime.utcnow().isoformat()}
+    # L'émetteur affiche déjà son message
+    emit('new_message', payload, broadcast=True, include_self=False)
+
+
+@socketio.on('request_system_response')
+def on_request_system_response(data):
+    user = utilisateur_socket()
+    query = (data or {}).get('query', '').strip()
+    if user is None or not query:
+        return
+    socketio.start_background_task(
+        relayer_reponse_ia, request.sid, query,
+        user.id, user.username, current_app.config["DB_AVAILABLE"]
+    )
+
+
 # ------------------------------------------------------------------
 # 🔗  ROUTE SYSTÈME (RECEPTION ALERTES)
 # ------------------------------------------------------------------
@@ -15,6 +15,7 @@ let currentTab = 'chat';
 let allAlerts = [];
 let allMessages = [];
 let allDiagnostics = [];
+const streamingMessages = {};
 
 // ==================== NAVIGATION ====================
 
@@ -82,6 +83,7 @@ function addMessage(content, sender = 'user') {
     
     messagesBox.appendChild(msgDiv);
     messagesBox.scrollTop = messagesBox.scrollHeight;
+    return pTag;
 }
 
 // ==================== WEBSOCKET EVENTS ====================
@@ -101,7 +103,40 @@ socket.on('system_response', (data) => {
     addMessage(data.content, 'system');
 });
 
+// Réponse en flux: une bulle créée au premier événement, complétée à chaque morceau
+socket.on('system_response_start', (data) => {
+    const pTag = addMessage('', 'system');
+    pTag.classList.add('streaming');
+    streamingMessages[data.stream_id] = pTag;
+});
+
+socket.on('system_response_chunk', (data) => {
+    const pTag = streamingMessages[data.stream_id];
+    if (!pTag) return;
+    pTag.textContent += data.text;
+    messagesBox.scrollTop = messagesBox.scrollHeight;
+});
+
+socket.on('system_response_end', (data) => {
+    const pTag = streamingMessages[data.stream_id];
+    delete streamingMessages[data.stream_id];
+    if (!pTag) {
+        addMessage(data.content, 'system');
+        return;
+    }
+    // Texte final du service (peut différer: nettoyage, fallback)
+    pTag.textContent = data.content;
+    pTag.classList.remove('streaming');
+});
+
 socket.on('system_error', (data) => {
+    const pTag = data.stream_id ? streamingMessages[data.stream_id] : null;
+    if (pTag) {
+        delete streamingMessages[data.stream_id];
+        pTag.classList.remove('streaming');
+        pTag.textContent = `Erreur: ${data.error}`;
+        return;
+    }
     addMessage(`Erreur: ${data.error}`, 'system');
 });
 
@@ -15,6 +15,16 @@ class Config:
     ENV = os.getenv('ENV', 'development')
     DEBUG = ENV == 'development'
     PORT = int(os.getenv('PORT', 5000))
+    # Workers gunicorn (gevent). Dataset segmenté et archive des diagnostics sont
+    # partagés entre workers sous verrou fcntl. Les snapshots en write-behind
+    # (compteur, statistiques, dérive, découverte, réservoir) ne sont écrits que
+    # par un worker: l'état en mémoire des autres n'est pas persisté, et les
+    # statistiques ne reprennent leurs lignes du dataset qu'au redémarrage
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', '4'))
+    
+    # Relevés par requête de diagnostic (lot JSON ou trames): au-delà, 413. Chaque
+    # relevé appelle l'agent IA et écrit sur disque pendant la requête
+    LOT_MAX_RELEVES = int(os.getenv('LOT_MAX_RELEVES', '100'))
     
     # Agent IA
     AGENT_IA_URL = os.getenv('AGENT_IA_URL', 'https://agent-ia-frigo-tdmm.onrender.com')
@@ -30,13 +40,29 @@ class Config:
     
     # Apprentissage
     SEUIL_RETRAINING = int(os.getenv('SEUIL_RETRAINING', '1000'))
+    DERIVE_FENETRE = int(os.getenv('DERIVE_FENETRE', '1000'))  # relevés comparés au jeu d'entraînement
+    DERIVE_SEUIL_PSI = float(os.getenv('DERIVE_SEUIL_PSI', '0.2'))
+    DERIVE_INTERVALLE = int(os.getenv('DERIVE_INTERVALLE', '100'))  # diagnostics entre deux vérifications
+    DERIVE_COOLDOWN = float(os.getenv('DERIVE_COOLDOWN', '21600'))  # secondes entre deux réentraînements
+    RESERVOIR_QUOTA_NORMAL = int(os.getenv('RESERVOIR_QUOTA_NORMAL', '5000'))  # lignes sans panne
+    RESERVOIR_QUOTA_PANNE = int(os.getenv('RESERVOIR_QUOTA_PANNE', '1000'))  # lignes par type de panne
+    RESERVOIR_QUOTAS = os.getenv('RESERVOIR_QUOTAS', '')  # ex: "fuite_fluide:2000,givrage:500"
     SEUIL_NOUVELLE_PANNE = int(os.getenv('SEUIL_NOUVELLE_PANNE', '50'))
+    DECOUVERTE_RAYON = float(os.getenv('DECOUVERTE_RAYON', '0.1'))  # distance normalisée [0-1]
+    DECOUVERTE_SEUIL_CONFIANCE = float(os.getenv('DECOUVERTE_SEUIL_CONFIANCE', '60'))  # score %
+    COMPTEUR_FLUSH_EVERY = int(os.getenv('COMPTEUR_FLUSH_EVERY', '50'))  # diagnostics
+    COMPTEUR_FLUSH_INTERVAL = float(os.getenv('COMPTEUR_FLUSH_INTERVAL', '10'))  # secondes
     
     # Chemins de fichiers
     DATA_DIR = os.getenv('DATA_DIR', './data')
     COMPTEUR_FILE = os.path.join(DATA_DIR, 'compteur_apprentissage.json')
     DATASET_FILE = os.path.join(DATA_DIR, 'dataset_apprentissage.csv')
+    DATASET_DIR = os.path.join(DATA_DIR, 'dataset')
+    DATASET_LIGNES_PAR_SEGMENT = int(os.getenv('DATASET_LIGNES_PAR_SEGMENT', '10000'))
+    DATASET_MAX_SEGMENTS = int(os.getenv('DATASET_MAX_SEGMENTS', '0'))  # 0 = illimité
     DERNIER_DIAGNOSTIC_FILE = os.path.join(DATA_DIR, 'dernier_diagnostic.json')
+    ARCHIVE_FILE = os.path.join(DATA_DIR, 'archive_diagnostics.bin')
+    ARCHIVE_CAPACITE = int(os.getenv('ARCHIVE_CAPACITE', '1000'))  # derniers diagnostics conservés
     
     # Simulateur
     SIMULATEUR_ENABLED = os.getenv('SIMULATEUR_ENABLED', 'true').lower() == 'true'
@@ -271,12 +271,16 @@ class ModelFinetuner:
             self.model.save_pretrained(str(output_dir))
             self.tokenizer.save_pretrained(str(output_dir))
             
-            # Créer un lien symbolique vers la version "latest"
+            # Créer un lien symbolique vers la version "latest" (remplacé atomiquement)
             latest_dir = self.config.OUTPUT_DIR / f"{self.model_name}-finetuned"
-            if latest_dir.exists():
+            latest_tmp = self.config.OUTPUT_DIR / f".{self.model_name}-finetuned.tmp"
+            if latest_tmp.is_symlink():
+                latest_tmp.unlink()
+            latest_tmp.symlink_to(output_dir)
+            if latest_dir.is_dir() and not latest_dir.is_symlink():
                 import shutil
                 shutil.rmtree(latest_dir)
-            latest_dir.symlink_to(output_dir)
+            os.replace(latest_tmp, latest_dir)
             
             logger.info(f"🎉 Modèle fine-tuné sauvegardé!")
             logger.info(f"📁 Chemin: {output_dir}")
@@ -293,8 +297,12 @@ class ModelFinetuner:
                 'data_file': str(train_file)
             }
             
-            with open(output_dir / 'finetuning_metadata.json', 'w') as f:
+            # Écrites en dernier et atomiquement: leur présence signale un fine-tune
+            # complet au service IA (rechargement à chaud)
+            metadata_tmp = output_dir / 'finetuning_metadata.json.tmp'
+            with open(metadata_tmp, 'w') as f:
                 json.dump(metadata, f, indent=2)
+            os.replace(metadata_tmp, output_dir / 'finetuning_metadata.json')
             
             logger.info(f"✅ Métadonnées sauvegardées")
             
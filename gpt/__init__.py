@@ -6,9 +6,16 @@ Remplace Gemini et Telegram avec des modèles open-source locaux
 __version__ = '1.0.0'
 __author__ = 'Diagnostic Frigo Team'
 
-from .ia_service import IAService, get_ia_service
-
 __all__ = [
     'IAService',
     'get_ia_service'
 ]
+
+
+def __getattr__(name):
+    # Import paresseux: les modules légers (batching, cache...) restent
+    # importables sans charger torch/transformers
+    if name in __all__:
+        from . import ia_service
+        return getattr(ia_service, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
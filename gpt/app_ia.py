@@ -3,17 +3,18 @@ API Flask - Service IA Local
 Endpoints pour traiter les messages et alertes
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import logging
 import sys
 import os
 import requests
+import json
 from datetime import datetime
 from pathlib import Path
 
 # Import du service IA
-from ia_service import get_ia_service
+from ia_service import get_ia_service, get_model_pool, service_for, IAConfig
 
 # Configuration logging
 logging.basicConfig(
@@ -56,7 +57,7 @@ def init_ia_service():
         
         ia_service = get_ia_service(model_choice)
         _initialized = True
-        logger.info("✅ Service IA initialisé")
+        logger.info("✅ Service IA initialisé (modèle en cours de chargement)")
 
 # Hook pour initialiser avant la première requête (compatible Flask 3.0)
 @app.before_request
@@ -66,6 +67,9 @@ def ensure_initialized():
     if not _initialized:
         init_ia_service()
 
+# Chargement lancé dès l'import (gunicorn) et non à la première requête
+init_ia_service()
+
 # ==================== ENDPOINTS ====================
 
 @app.route('/health', methods=['GET'])
@@ -77,6 +81,31 @@ def health():
         'timestamp': datetime.now().isoformat()
     }), 200
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """
+    État de chargement du modèle
+    
+    Response (200 si chargement terminé, 503 pendant le chargement):
+        {
+            "ready": true,
+            "phase": "ready|fallback|selecting|loading_tokenizer|loading_weights|...",
+            "progress": 1.0,
+            "model": "phi2",
+            "elapsed_s": 12.3,
+            "error": null
+        }
+    """
+    if not ia_service:
+        return jsonify({'ready': False, 'phase': 'init', 'progress': 0.0}), 503
+    
+    state = dict(ia_service.loading_state)
+    debut = datetime.fromisoformat(state['started_at'])
+    fin = datetime.fromisoformat(state['ready_at']) if state['ready_at'] else datetime.now()
+    state['elapsed_s'] = round((fin - debut).total_seconds(), 1)
+    state['ready'] = ia_service.ready.is_set()
+    return jsonify(state), 200 if state['ready'] else 503
+
 @app.route('/api/chat/message', methods=['POST'])
 def process_chat_message():
     """
@@ -88,7 +117,8 @@ def process_chat_message():
             "message": "Message utilisateur",
             "user_id": "user123",
             "user_name": "admin",
-            "source": "websocket|rest"
+            "source": "websocket|rest",
+            "model": "phi2-finetuned-20240115_103045"   (optionnel, défaut: modèle principal)
         }
     
     Response:
@@ -97,7 +127,8 @@ def process_chat_message():
             "response": "Réponse du service IA",
             "intent": "diagnostic",
             "processing_time_ms": 1234,
-            "model": "phi",
+            "model": "phi2",            (modèle ayant répondu)
+            "requested_model": "...",   (si différent: modèle demandé en cours de chargement)
             "timestamp": "..."
         }
     """
@@ -110,6 +141,7 @@ def process_chat_message():
         user_id = data.get('user_id', 'anonymous')
         user_name = data.get('user_name', 'Utilisateur')
         source = data.get('source', 'rest')
+        model = data.get('model')
         
         if not message:
             logger.warning(f"⚠️ Message vide reçu de {user_id}")
@@ -128,7 +160,9 @@ def process_chat_message():
                 'error': 'Service IA non disponible'
             }), 503
         
-        result = ia_service.process_chat_message(message, user_id)
+        with service_for(model) as service:
+            result = service.process_chat_message(message, user_id)
+        annoter_modele(result, service, model)
         
         # Ajouter temps de traitement
         processing_time_ms = int((time.time() - start_time) * 1000)
@@ -138,6 +172,8 @@ def process_chat_message():
         
         return jsonify(result), 200 if result['success'] else 500
     
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logger.error(f"❌ ERREUR traitement message: {e}", exc_info=True)
         return jsonify({
@@ -145,6 +181,70 @@ def process_chat_message():
             'error': f'Erreur traitement: {str(e)}'
         }), 500
 
+def annoter_modele(result, service, model):
+    """Indiquer le modèle ayant répondu (et le modèle demandé s'il est encore en chargement)"""
+    result['model'] = service.model_name
+    if model and service._normalize_model_name(model) != service._normalize_model_name(service.model_name):
+        result['requested_model'] = model
+
+@app.route('/api/chat/stream', methods=['POST'])
+def stream_chat_message():
+    """
+    Traiter un message du chat en flux (Server-Sent Events)
+
+    Request: identique à /api/chat/message
+
+    Response (text/event-stream):
+        event: token
+        data: {"text": "morceau de réponse"}
+
+        event: done
+        data: {"response": "...", "intent": "...", "processing_time_ms": 1234, ...}
+    """
+    import time
+    start_time = time.time()
+
+    data = request.get_json(silent=True) or {}
+    message = data.get('message', '').strip()
+    user_id = data.get('user_id', 'anonymous')
+    user_name = data.get('user_name', 'Utilisateur')
+    model = data.get('model')
+
+    if not message:
+        return jsonify({'success': False, 'error': 'Message vide'}), 400
+    if not ia_service:
+        return jsonify({'success': False, 'error': 'Service IA non disponible'}), 503
+    if model and IAConfig.model_config(ia_service._normalize_model_name(model)) is None:
+        return jsonify({'success': False, 'error': f'Modèle inconnu: {model}'}), 400
+
+    logger.info(f"💬 [stream] Message de {user_name} ({user_id}): {message[:50]}...")
+
+    def evenements():
+        premier = None
+        try:
+            # Modèle protégé de l'éviction jusqu'à la fin du flux
+            with service_for(model) as service:
+                for evenement in service.stream_chat_message(message, user_id):
+                    type_evenement = evenement.pop('type')
+                    if type_evenement == 'token' and premier is None:
+                        premier = int((time.time() - start_time) * 1000)
+                    if type_evenement == 'done':
+                        evenement['success'] = True
+                        annoter_modele(evenement, service, model)
+                        evenement['first_token_ms'] = premier
+                        evenement['processing_time_ms'] = int((time.time() - start_time) * 1000)
+                        logger.info(f"✅ Réponse en flux: 1er jeton {premier}ms, total {evenement['processing_time_ms']}ms")
+                    yield f"event: {type_evenement}\ndata: {json.dumps(evenement, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.error(f"❌ ERREUR flux message: {e}", exc_info=True)
+            yield f"event: error\ndata: {json.dumps({'success': False, 'error': str(e)})}\n\n"
+
+    return Response(
+        stream_with_context(evenements()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/alerts/process', methods=['POST'])
 def process_alert():
     """
@@ -274,6 +374,65 @@ def add_knowledge():
             'error': str(e)
         }), 500
 
+@app.route('/api/knowledge/bulk', methods=['POST'])
+def bulk_knowledge():
+    """
+    Importer des entrées en masse (NDJSON, une entrée par ligne)
+
+    Request (Content-Type: application/x-ndjson):
+        {"topic": "Clé", "content": "Contenu ou objet"}
+        {"topic": "Clé 2", "content": {...}}
+
+    Le corps est lu en flux; chaque lot de KB_BULK_BATCH entrées est indexé
+    et persisté en une seule écriture.
+
+    Response:
+        {
+            "success": true,
+            "imported": 20000,
+            "errors": [{"line": 12, "error": "..."}]
+        }
+    """
+    try:
+        taille_lot = int(os.environ.get('KB_BULK_BATCH', 1000))
+        lot, importees, erreurs = [], 0, []
+
+        for numero, ligne in enumerate(request.stream, start=1):
+            ligne = ligne.strip()
+            if not ligne:
+                continue
+            try:
+                entree = json.loads(ligne)
+                topic = str(entree.get('topic', '')).strip()
+                content = entree.get('content')
+                if not topic or content in (None, ''):
+                    raise ValueError('Topic et content requis')
+            except (ValueError, AttributeError) as e:
+                if len(erreurs) < 100:
+                    erreurs.append({'line': numero, 'error': str(e)})
+                continue
+
+            lot.append((topic, content))
+            if len(lot) >= taille_lot:
+                importees += ia_service.add_many_to_knowledge_base(lot)
+                lot = []
+
+        importees += ia_service.add_many_to_knowledge_base(lot)
+
+        logger.info(f"📚 Import KB: {importees} entrées, {len(erreurs)} erreurs")
+        return jsonify({
+            'success': True,
+            'imported': importees,
+            'errors': erreurs
+        }), 201
+
+    except Exception as e:
+        logger.error(f"❌ Erreur import KB: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """
@@ -297,7 +456,7 @@ def get_stats():
 @app.route('/api/models', methods=['GET'])
 def get_models():
     """
-    Lister les modèles disponibles
+    Lister les modèles disponibles et l'état du pool
     
     Response:
         {
@@ -305,16 +464,92 @@ def get_models():
                 "mistral": "mistral-7b-instruct",
                 ...
             },
-            "current_model": "phi"
+            "local_models": ["phi2-finetuned-20240115_103045", ...],
+            "current_model": "phi",
+            "pool": {
+                "budget_mb": 8192.0,
+                "used_mb": 5400.2,
+                "models": {
+                    "phi2": {"status": "resident", "pinned": true, "size_mb": 5400.2, ...},
+                    "gpt2": {"status": "loading|resident|evicted|failed", ...}
+                }
+            }
         }
     """
-    from ia_service import IAConfig
     config = IAConfig()
     return jsonify({
         'available_models': config.MODEL_OPTIONS,
-        'current_model': ia_service.model_name
+        'local_models': sorted(
+            d.name for d in config.MODELS_PATH.iterdir()
+            if d.is_dir() and d.name not in config.MODEL_OPTIONS and not d.name.endswith(('-int8', '-onnx'))
+        ),
+        'current_model': ia_service.model_name,
+        'pool': get_model_pool().etat()
     }), 200
 
+@app.route('/api/models/load', methods=['POST'])
+def load_model():
+    """
+    Précharger un modèle dans le pool (avant de lui envoyer du trafic)
+    
+    Request:
+        {"model": "phi2-finetuned-20240115_103045"}
+    
+    Response (202 si chargement en cours, 200 si déjà résident):
+        {"model": "...", "status": "loading|resident|failed"}
+    """
+    data = request.get_json(silent=True) or {}
+    model = data.get('model', '').strip()
+    if not model:
+        return jsonify({'error': 'Champ "model" requis'}), 400
+    try:
+        with service_for(model) as service:
+            resident = service._normalize_model_name(service.model_name) == service._normalize_model_name(model)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not ia_service.ready.is_set():
+        return jsonify({'model': model, 'status': 'waiting_default_model'}), 503
+    
+    etat = get_model_pool().etat()['models'].get(ia_service._normalize_model_name(model), {})
+    status = 'resident' if resident else etat.get('status', 'loading')
+    return jsonify({'model': model, 'status': status, 'error': etat.get('error')}), 200 if resident else 202
+
+@app.route('/api/models/reload', methods=['POST'])
+def reload_model():
+    """
+    Basculer à chaud sur un autre modèle (chargé en arrière-plan, sans interrompre les requêtes)
+    
+    Les fine-tunes terminés sont détectés automatiquement (IA_HOT_RELOAD);
+    cet endpoint force la bascule.
+    
+    Request:
+        {"model": "phi2-finetuned-20240115_103045"}   (optionnel, défaut: dernier fine-tune terminé)
+    
+    Response (202):
+        {"status": "loading", "candidate": "...", "current_model": "phi2"}
+    """
+    data = request.get_json(silent=True) or {}
+    model = data.get('model') or ia_service.latest_finetune()
+    if not model:
+        return jsonify({'error': 'Aucun fine-tune terminé pour ce modèle'}), 404
+    if IAConfig.model_config(ia_service._normalize_model_name(model)) is None:
+        return jsonify({'error': f'Modèle inconnu: {model}'}), 400
+    if not ia_service.reload_model(ia_service._normalize_model_name(model)):
+        return jsonify({'error': 'Rechargement déjà en cours', **ia_service.reload_state}), 409
+    return jsonify({**ia_service.reload_state, 'current_model': ia_service.model_name}), 202
+
+@app.route('/api/models/rollback', methods=['POST'])
+def rollback_model():
+    """
+    Revenir instantanément au modèle servi avant la dernière bascule
+    
+    Response:
+        {"current_model": "phi2", "previous": "phi2-finetuned-20240115_103045"}
+    """
+    if not ia_service.rollback_model():
+        return jsonify({'error': 'Aucun modèle précédent en mémoire'}), 409
+    return jsonify({'current_model': ia_service.model_name, 'previous': ia_service.reload_state['previous']}), 200
+
 @app.route('/api/diagnostic/analyze', methods=['POST'])
 def analyze_diagnostic():
     """
@@ -760,5 +995,6 @@ if __name__ == '__main__':
     logger.info("   GET  /api/finetune/status/{job_id} - Statut job")
     logger.info("   GET  /api/finetune/models - Lister modèles")
     logger.info("   GET  /health - Health check")
+    logger.info("   GET  /ready - État de chargement du modèle")
     
     app.run(host='0.0.0.0', port=5002, debug=False)
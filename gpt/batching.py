@@ -0,0 +1,144 @@
+"""
+Micro-batching de la génération LLM
+Regroupe les requêtes concurrentes sur une courte fenêtre et les exécute en un seul lot
+"""
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationScheduler:
+    """
+    Ordonnanceur de génération par micro-lots
+
+    Les appels concurrents à `generer()` sont mis en file. Un thread unique
+    attend la première requête, puis collecte les suivantes pendant
+    `fenetre_ms` millisecondes (ou jusqu'à `taille_max`), et exécute chaque
+    groupe de paramètres identiques en un seul appel batché au modèle.
+    Chaque appelant reçoit le résultat de son propre prompt.
+    """
+
+    def __init__(self, generer_lot, fenetre_ms=20, taille_max=8):
+        """
+        Args:
+            generer_lot (callable): fonction(prompts, params) -> liste de sorties (une par prompt)
+            fenetre_ms (float): Durée de collecte d'un lot après la première requête
+            taille_max (int): Nombre maximal de prompts par lot
+        """
+        self.generer_lot = generer_lot
+        self.fenetre = fenetre_ms / 1000.0
+        self.taille_max = max(1, int(taille_max))
+
+        self._file = queue.Queue()
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._boucle, name='generation-scheduler', daemon=True)
+        self._thread.start()
+
+        self.stats = {'requetes': 0, 'lots': 0, 'taille_max_observee': 0}
+
+    def generer(self, prompt, params, timeout=None):
+        """
+        Génère la sortie d'un prompt (bloquant, exécuté dans un micro-lot)
+
+        Args:
+            prompt (str): Prompt complet
+            params (dict): Paramètres de génération (doivent être hashables en valeurs)
+            timeout (float): Attente maximale en secondes
+
+        Returns:
+            Sortie du pipeline pour ce prompt
+
+        Raises:
+            concurrent.futures.TimeoutError: Délai dépassé (le prompt est retiré
+                du lot s'il n'a pas encore été exécuté)
+        """
+        futur = Future()
+        self._file.put((prompt, params, futur))
+        try:
+            return futur.result(timeout=timeout)
+        except TimeoutError:
+            futur.cancel()
+            raise
+
+    def arreter(self):
+        """Arrête le thread de génération (les requêtes en attente échouent)"""
+        self._arret.set()
+        self._file.put(None)
+        self._thread.join(timeout=5)
+
+    def _collecter(self, premiere):
+        """Collecte un lot: première requête + arrivées pendant la fenêtre"""
+        lot = [premiere]
+        echeance = time.monotonic() + self.fenetre
+        while len(lot) < self.taille_max:
+            restant = echeance - time.monotonic()
+            if restant <= 0:
+                break
+            try:
+                requete = self._file.get(timeout=restant)
+            except queue.Empty:
+                break
+            if requete is None:
+                self._arret.set()
+                break
+            lot.append(requete)
+        return lot
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            premiere = self._file.get()
+            if premiere is None:
+                break
+            lot = self._collecter(premiere)
+
+            # Seuls les prompts aux paramètres identiques partagent un appel
+            groupes = {}
+            for prompt, params, futur in lot:
+                # Appelant parti (délai dépassé): prompt non généré
+                if not futur.set_running_or_notify_cancel():
+                    continue
+                try:
+                    cle = tuple(sorted(params.items()))
+                    hash(cle)
+                except Exception as e:
+                    # Paramètres non hashables: seule cette requête échoue, pas le thread
+                    futur.set_exception(e)
+                    continue
+                groupes.setdefault(cle, (params, []))[1].append((prompt, futur))
+
+            for params, requetes in groupes.values():
+                self._executer(params, requetes)
+
+        # Libérer les appelants encore en attente
+        while True:
+            try:
+                requete = self._file.get_nowait()
+            except queue.Empty:
+                break
+            if requete is not None:
+                requete[2].set_exception(RuntimeError("Ordonnanceur de génération arrêté"))
+
+    def _executer(self, params, requetes):
+        prompts = [prompt for prompt, _ in requetes]
+        try:
+            sorties = self.generer_lot(prompts, params)
+            if len(sorties) != len(prompts):
+                raise RuntimeError(f"Lot incohérent: {len(sorties)} sorties pour {len(prompts)} prompts")
+        except Exception as e:
+            for _, futur in requetes:
+                futur.set_exception(e)
+            return
+
+        for (_, futur), sortie in zip(requetes, sorties):
+            futur.set_result(sortie)
+
+        self.stats['requetes'] += len(prompts)
+        self.stats['lots'] += 1
+        self.stats['taille_max_observee'] = max(self.stats['taille_max_observee'], len(prompts))
+        if len(prompts) > 1:
+            logger.info(f"📦 Lot de génération: {len(prompts)} prompts")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark qualité / vitesse: modèle fp32 vs quantification dynamique int8 (CPU),
+et optionnellement ONNX Runtime (--onnx)
+
+Usage:
+    python benchmark_quantization.py --model ../models/gpt2
+    python benchmark_quantization.py --model ../models/gpt2 --onnx
+    python benchmark_quantization.py --model microsoft/phi-2 --runs 5 --json resultats.json
+
+Mesures:
+    - taille des poids (Mo) et temps de chargement/quantification
+    - débit de génération (jetons/s) et latence par prompt, greedy, 40 jetons
+    - perplexité sur des phrases du domaine frigorifique
+    - accord des jetons générés avec la sortie fp32 (même préfixe)
+"""
+
+import sys
+import json
+import time
+import math
+import argparse
+import logging
+from pathlib import Path
+
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM
+
+sys.path.insert(0, str(Path(__file__).parent))
+from ia_service import PROMPT_PREFIX
+from quantization import quantifier_int8, taille_poids
+from onnx_backend import charger_onnx, onnx_disponible
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+QUESTIONS = [
+    "Le compresseur tourne en continu mais la température reste à 8°C",
+    "Givre important sur l'évaporateur après deux jours",
+    "Pression basse anormale et sifflement près du détendeur",
+    "Le ventilateur du condenseur fait un bruit métallique",
+]
+
+TEXTES_REFERENCE = [
+    "Un encrassement du condenseur augmente la pression haute et la consommation du compresseur.",
+    "Une fuite de fluide frigorigène se traduit par une pression basse faible et une surchauffe élevée.",
+    "Le dégivrage doit être déclenché lorsque la couche de givre réduit le débit d'air de l'évaporateur.",
+    "Un thermostat mal étalonné provoque des cycles courts et une température instable dans l'enceinte.",
+]
+
+
+def perplexite(model, tokenizer, textes):
+    """Perplexité moyenne (par jeton) sur les textes de référence"""
+    nll, jetons = 0.0, 0
+    with torch.inference_mode():
+        for texte in textes:
+            ids = tokenizer(texte, return_tensors='pt')['input_ids']
+            # Perte calculée sur les logits: identique pour PyTorch et ONNX Runtime
+            logits = model(input_ids=ids, attention_mask=torch.ones_like(ids)).logits
+            nll += torch.nn.functional.cross_entropy(logits[0, :-1].float(), ids[0, 1:], reduction='sum').item()
+            jetons += ids.shape[1] - 1
+    return math.exp(nll / jetons)
+
+
+def generer(model, tokenizer, prompts, max_new_tokens, runs):
+    """Générations greedy chronométrées; retourne (sorties, jetons/s, latence moyenne)"""
+    sorties, duree, jetons = [], 0.0, 0
+    with torch.inference_mode():
+        for run in range(runs + 1):  # premier passage = échauffement, non mesuré
+            for prompt in prompts:
+                ids = tokenizer(prompt, return_tensors='pt')['input_ids']
+                debut = time.perf_counter()
+                seq = model.generate(ids, attention_mask=torch.ones_like(ids), max_new_tokens=max_new_tokens,
+                                     do_sample=False, pad_token_id=tokenizer.eos_token_id)
+                if run:
+                    duree += time.perf_counter() - debut
+                    jetons += seq.shape[1] - ids.shape[1]
+                elif len(sorties) < len(prompts):
+                    sorties.append(seq[0, ids.shape[1]:].tolist())
+    return sorties, jetons / duree, duree / (runs * len(prompts))
+
+
+def accord(reference, candidat):
+    """Part des jetons identiques avant la première divergence"""
+    total = identiques = 0
+    for ref, cand in zip(reference, candidat):
+        n = 0
+        while n < min(len(ref), len(cand)) and ref[n] == cand[n]:
+            n += 1
+        identiques += n
+        total += len(ref)
+    return identiques / max(total, 1)
+
+
+def mesurer(nom, model, tokenizer, prompts, args, duree_chargement, octets=None):
+    logger.info(f"📏 Mesures {nom}...")
+    sorties, debit, latence = generer(model, tokenizer, prompts, args.max_new_tokens, args.runs)
+    return {
+        'variant': nom,
+        'weights_mb': round((octets if octets is not None else taille_poids(model)) / 1e6, 1),
+        'load_s': round(duree_chargement, 1),
+        'tokens_per_s': round(debit, 2),
+        'latency_s': round(latence, 3),
+        'perplexity': round(perplexite(model, tokenizer, TEXTES_REFERENCE), 2),
+    }, sorties
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fp32 vs int8 dynamique (CPU)")
+    parser.add_argument('--model', default=str(Path(__file__).parent.parent / 'models' / 'gpt2'),
+                        help="Dossier local ou identifiant HuggingFace")
+    parser.add_argument('--runs', type=int, default=3, help="Passages mesurés par prompt")
+    parser.add_argument('--max-new-tokens', type=int, default=40)
+    parser.add_argument('--threads', type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument('--onnx', action='store_true', help="Mesurer aussi ONNX Runtime (export mis en cache)")
+    parser.add_argument('--json', help="Fichier de sortie des résultats")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model, trust_remote_code=True)
+    prompts = [f"{PROMPT_PREFIX}Question: {q}\n\nReponse courte et technique:" for q in QUESTIONS]
+
+    debut = time.time()
+    model = AutoModelForCausalLM.from_pretrained(args.model, trust_remote_code=True, torch_dtype=torch.float32).eval()
+    fp32, sorties_fp32 = mesurer('fp32', model, tokenizer, prompts, args, time.time() - debut)
+
+    debut = time.time()
+    model = quantifier_int8(model)
+    int8, sorties_int8 = mesurer('int8', model, tokenizer, prompts, args, fp32['load_s'] + time.time() - debut)
+    int8['token_agreement'] = round(accord(sorties_fp32, sorties_int8), 3)
+    fp32['token_agreement'] = 1.0
+    resultats = [fp32, int8]
+
+    if args.onnx:
+        if not onnx_disponible():
+            logger.error("❌ optimum[onnxruntime] non installé, variante ONNX ignorée")
+        else:
+            dossier = Path(str(args.model).rstrip('/') + '-onnx')
+            if not Path(args.model).is_dir():
+                dossier = Path(__file__).parent.parent / 'models' / (Path(args.model).name + '-onnx')
+            debut = time.time()
+            model = charger_onnx(args.model, dossier, threads=args.threads, trust_remote_code=True)
+            octets = sum(f.stat().st_size for f in dossier.glob('*.onnx*'))
+            onnx, sorties_onnx = mesurer('onnx', model, tokenizer, prompts, args, time.time() - debut, octets)
+            onnx['token_agreement'] = round(accord(sorties_fp32, sorties_onnx), 3)
+            resultats.append(onnx)
+
+    print(f"\n📊 {args.model} - {torch.get_num_threads()} threads, {args.max_new_tokens} jetons, greedy")
+    print(f"{'variante':10} {'poids Mo':>9} {'charg. s':>9} {'jetons/s':>9} {'latence s':>10} {'perplexité':>11} {'accord':>7}")
+    for r in resultats:
+        print(f"{r['variant']:10} {r['weights_mb']:>9} {r['load_s']:>9} {r['tokens_per_s']:>9} "
+              f"{r['latency_s']:>10} {r['perplexity']:>11} {r['token_agreement']:>7}")
+    print(f"\nGain: x{int8['tokens_per_s'] / fp32['tokens_per_s']:.2f} jetons/s, "
+          f"poids /{fp32['weights_mb'] / int8['weights_mb']:.2f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'model': args.model, 'results': resultats}, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Rechargement à chaud des modèles fine-tunés
+Détection des fine-tunes terminés (métadonnées écrites en dernier par fine_tune.py)
+et bascule entre deux requêtes
+"""
+
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FICHIER_META = 'finetuning_metadata.json'
+
+
+def finetunes_termines(dossier, filtre=None):
+    """
+    Fine-tunes complets de `dossier`, du plus ancien au plus récent
+
+    Args:
+        dossier (Path): Dossier des modèles (models/)
+        filtre (callable): nom de dossier -> bool (ex: même modèle de base)
+
+    Returns:
+        list[Path]: Dossiers {modèle}-finetuned-{AAAAMMJJ_HHMMSS} contenant leurs métadonnées
+    """
+    dossiers = [
+        d for d in Path(dossier).glob('*-finetuned-*')
+        if d.is_dir() and not d.is_symlink() and (d / FICHIER_META).exists()
+        and (filtre is None or filtre(d.name))
+    ]
+    # Horodatage en fin de nom: l'ordre alphabétique est l'ordre chronologique
+    return sorted(dossiers, key=lambda d: d.name.rsplit('-finetuned-', 1)[1])
+
+
+class SurveillantFinetunes:
+    """
+    Scrute models/ et signale chaque nouveau fine-tune terminé
+
+    Les fine-tunes présents au démarrage sont ignorés. Si plusieurs
+    apparaissent entre deux passages, seul le plus récent est signalé. Un
+    fine-tune refusé par le rappel (rechargement déjà en cours) est signalé
+    de nouveau au passage suivant.
+    """
+
+    def __init__(self, dossier, rappel, filtre=None, intervalle=30):
+        """
+        Args:
+            dossier (Path): Dossier des modèles
+            rappel (callable): (dossier du fine-tune, métadonnées) -> bool (False: à retenter)
+            filtre (callable): nom de dossier -> bool
+            intervalle (float): Secondes entre deux passages
+        """
+        self.dossier = Path(dossier)
+        self.rappel = rappel
+        self.filtre = filtre
+        self.intervalle = intervalle
+        self._vus = set(finetunes_termines(self.dossier, filtre))
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._boucle, name='finetune-watcher', daemon=True)
+        self._thread.start()
+
+    def verifier(self):
+        """
+        Un passage: signaler le fine-tune terminé le plus récent non encore accepté
+
+        Returns:
+            Path du fine-tune accepté par le rappel, sinon None
+        """
+        nouveaux = [d for d in finetunes_termines(self.dossier, self.filtre) if d not in self._vus]
+        if not nouveaux:
+            return None
+        dernier = nouveaux[-1]
+        try:
+            metadata = json.loads((dernier / FICHIER_META).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            metadata = {}
+        logger.info(f"🆕 Nouveau fine-tune détecté: {dernier.name}")
+        if not self.rappel(dernier, metadata):
+            logger.info(f"⏳ Fine-tune {dernier.name} non pris en charge, nouvel essai au prochain passage")
+            return None
+        # Les plus anciens sont remplacés par le dernier: inutile de les charger
+        self._vus.update(nouveaux)
+        return dernier
+
+    def arreter(self):
+        self._arret.set()
+
+    def _boucle(self):
+        while not self._arret.wait(self.intervalle):
+            try:
+                self.verifier()
+            except Exception as e:
+                logger.error(f"❌ Surveillance des fine-tunes: {e}")
+
+
+class PorteBascule:
+    """
+    Compteur des requêtes en cours: une bascule attend qu'elles se terminent
+    et retient les nouvelles le temps de l'échange des références
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._en_cours = 0
+        self._bascule = False
+
+    @contextmanager
+    def requete(self):
+        """Bloc d'une requête (la bascule n'a jamais lieu pendant ce bloc, sauf délai dépassé)"""
+        with self._condition:
+            self._condition.wait_for(lambda: not self._bascule)
+            self._en_cours += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._en_cours -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self, timeout=None):
+        """
+        Bloc de bascule, exécuté sans requête en cours
+
+        Yields:
+            bool: False si des requêtes étaient encore en cours après `timeout`
+        """
+        with self._condition:
+            self._bascule = True
+            try:
+                yield self._condition.wait_for(lambda: self._en_cours == 0, timeout)
+            finally:
+                self._bascule = False
+                self._condition.notify_all()
@@ -6,18 +6,76 @@ Prêt pour réentraînement avec données domaine frigo
 """
 
 import os
+import gc
 import json
 import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import AutoTokenizer, AutoModelForCausalLM, TextIteratorStreamer, pipeline
 import requests
 
+try:
+    from .batching import GenerationScheduler
+    from .response_cache import ResponseCache
+    from .kb_index import IndexBM25, texte_entree
+    from .semantic_index import IndexSemantique, encodeur_sentence_transformers, MODELE_DEFAUT
+    from .kb_store import KnowledgeStore
+    from .probes import sonder
+    from .prefix_cache import PrefixKVCache
+    from .quantization import charger_ou_quantifier, taille_poids
+    from .onnx_backend import charger_onnx
+    from .model_pool import ModelPool
+    from .hot_reload import SurveillantFinetunes, PorteBascule, finetunes_termines
+    from .keyword_matcher import KeywordMatcher
+except ImportError:
+    from batching import GenerationScheduler
+    from response_cache import ResponseCache
+    from kb_index import IndexBM25, texte_entree
+    from semantic_index import IndexSemantique, encodeur_sentence_transformers, MODELE_DEFAUT
+    from kb_store import KnowledgeStore
+    from probes import sonder
+    from prefix_cache import PrefixKVCache
+    from quantization import charger_ou_quantifier, taille_poids
+    from onnx_backend import charger_onnx
+    from model_pool import ModelPool
+    from hot_reload import SurveillantFinetunes, PorteBascule, finetunes_termines
+    from keyword_matcher import KeywordMatcher
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Préambule commun à tous les prompts (son cache KV est réutilisé, cf. PrefixKVCache)
+PROMPT_PREFIX = "Vous etes un expert en diagnostic frigorifique. Repondez brievement.\n\n"
+
+# Mots-clés d'intention, de réponse de fallback et de solutions d'alerte
+# (ordre de déclaration = priorité), cherchés en une seule passe par message
+MOTS_CLES = KeywordMatcher({
+    'intent': {
+        'diagnostic': ['diagnostic', 'diagnose', 'problem', 'issue'],
+        'solution': ['fix', 'repair', 'solution', 'how to'],
+        'alert': ['alert', 'error', 'warning', 'critical'],
+        'info': ['what', 'why', 'how', 'explain'],
+        'learn': ['learn', 'train', 'remember'],
+    },
+    'fallback': {
+        'panne': ['panne', 'problème', 'erreur', 'error', 'problem', 'fail'],
+        'temperature': ['température', 'temperature', 'temp', 'chaud', 'froid', 'heat', 'cold'],
+        'electrique': ['électrique', 'electrical', 'puissance', 'power', 'courant', 'current'],
+        'bruit': ['bruit', 'noise', 'son', 'sound', 'vibration'],
+        'fuite': ['fuite', 'leak', 'eau', 'water', 'condensation'],
+        'diagnostic': ['diagnostique', 'diagnostic', 'analyse', 'analyze', 'test'],
+    },
+    'solution': {
+        'temperature': ['temperature'],
+        'pressure': ['pressure'],
+        'noise': ['noise'],
+    },
+})
+
 class IAConfig:
     """Configuration du service IA - Support multi-modèles"""
     
@@ -73,6 +131,46 @@ class IAConfig:
     # Contexte persistant
     CONTEXT_SIZE = 5
     
+    # Micro-batching des générations concurrentes
+    BATCH_WINDOW_MS = float(os.environ.get('IA_BATCH_WINDOW_MS', 20))
+    BATCH_MAX_SIZE = int(os.environ.get('IA_BATCH_MAX_SIZE', 8))
+    GENERATION_TIMEOUT = float(os.environ.get('IA_GENERATION_TIMEOUT', 60))  # secondes (file + génération)
+    
+    # Cache des réponses (LRU mémoire + journal dans CACHE_PATH)
+    RESPONSE_CACHE_SIZE = int(os.environ.get('IA_RESPONSE_CACHE_SIZE', 512))
+    RESPONSE_CACHE_TTL = float(os.environ.get('IA_RESPONSE_CACHE_TTL', 7 * 24 * 3600))
+    
+    # Chargement du modèle en arrière-plan (réponses de fallback en attendant)
+    BACKGROUND_LOADING = os.environ.get('IA_BACKGROUND_LOADING', 'true').lower() in ('1', 'true', 'yes')
+    PROBE_TTL = float(os.environ.get('IA_PROBE_TTL', 600))
+    
+    # Backend d'inférence CPU: 'transformers' ou 'onnx' (ONNX Runtime, graphe exporté dans models/<dossier>-onnx)
+    BACKEND = os.environ.get('IA_BACKEND', 'transformers').lower()
+    ONNX_THREADS = int(os.environ.get('IA_ONNX_THREADS', 0)) or None
+    
+    # Quantification dynamique int8 sur CPU (poids quantifiés mis en cache dans models/<dossier>-int8)
+    QUANTIZE_CPU = os.environ.get('IA_QUANTIZE_CPU', 'false').lower() in ('1', 'true', 'yes')
+    
+    # Pool multi-modèles (paramètre `model` des requêtes): budget mémoire des modèles résidents, éviction LRU
+    POOL_BUDGET_MB = float(os.environ.get('IA_POOL_BUDGET_MB', 8192))
+    
+    # Rechargement à chaud des fine-tunes terminés (models/{modèle}-finetuned-*), ancien modèle gardé pour rollback
+    HOT_RELOAD = os.environ.get('IA_HOT_RELOAD', 'true').lower() in ('1', 'true', 'yes')
+    HOT_RELOAD_INTERVAL = float(os.environ.get('IA_HOT_RELOAD_INTERVAL', 30))
+    HOT_RELOAD_DRAIN_TIMEOUT = float(os.environ.get('IA_HOT_RELOAD_DRAIN_TIMEOUT', 30))
+    
+    # Réutilisation du cache KV du préambule système
+    PREFIX_CACHE = os.environ.get('IA_PREFIX_CACHE', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Streaming des réponses (attente maximale entre deux jetons)
+    STREAM_TIMEOUT = float(os.environ.get('IA_STREAM_TIMEOUT', 30))
+    
+    # Recherche sémantique dans la KB (optionnelle, combinée au BM25)
+    KB_SEMANTIC = os.environ.get('IA_KB_SEMANTIC', 'false').lower() in ('1', 'true', 'yes')
+    KB_EMBEDDING_MODEL = os.environ.get('IA_KB_EMBEDDING_MODEL', MODELE_DEFAUT)
+    KB_SEMANTIC_MIN_SCORE = float(os.environ.get('IA_KB_SEMANTIC_MIN_SCORE', 0.3))
+    KB_SEMANTIC_IVF_THRESHOLD = int(os.environ.get('IA_KB_SEMANTIC_IVF_THRESHOLD', 20000))
+    
     # Bases de données
     DB_PATH = Path(__file__).parent / "data"
     CACHE_PATH = Path(__file__).parent / "cache"
@@ -82,41 +180,323 @@ class IAConfig:
         self.DB_PATH.mkdir(exist_ok=True)
         self.CACHE_PATH.mkdir(exist_ok=True)
         self.MODELS_PATH.mkdir(exist_ok=True)
+    
+    @classmethod
+    def model_config(cls, name):
+        """
+        Configuration d'un modèle: entrée de MODEL_OPTIONS, ou dossier de models/
+        (modèles fine-tunés: phi2-finetuned-20240115_103045...)
+        
+        Returns:
+            dict ou None si le modèle est inconnu
+        """
+        if not isinstance(name, str):
+            return None
+        if name in cls.MODEL_OPTIONS:
+            return cls.MODEL_OPTIONS[name]
+        # Nom de dossier simple uniquement (pas de chemin)
+        if name and Path(name).name == name and not name.startswith('.') and (cls.MODELS_PATH / name).is_dir():
+            return {
+                'hf_id': None,
+                'local_folder': name,
+                'production': False,
+                'description': f'Modèle local: {name}'
+            }
+        return None
 
 class IAService:
     """Service IA principal - Architecture modulaire multi-modèles"""
     
-    def __init__(self, model_name=None):
+    # Références échangées d'un bloc lors d'une bascule de modèle
+    _SWAP_ATTRS = ('model', 'tokenizer', 'text_generator', 'scheduler', 'prefix_cache', 'model_info', 'model_name')
+    
+    def __init__(self, model_name=None, background=False, shared=None):
+        """
+        Args:
+            model_name (str): Modèle demandé (None = sélection automatique)
+            background (bool): Charger le modèle dans un thread; en attendant,
+                les requêtes reçoivent les réponses de fallback
+            shared (IAService): Service principal dont la KB, les index, l'historique
+                et le cache de réponses sont partagés (modèles du pool)
+        """
         self.config = IAConfig()
         self.model = None
         self.tokenizer = None
         self.text_generator = None
+        self.scheduler = None
+        self.prefix_cache = None
+        self.response_cache = None
         self.conversation_history = []
         self.knowledge_base = {}
+        self.kb_store = KnowledgeStore(self.config.DB_PATH)
+        self.kb_index = IndexBM25()
+        self.kb_lock = threading.Lock()  # Écritures KB: dict, index et journal (compaction) cohérents
+        self.semantic_index = None
         self.model_info = {}
+        self.model_name = model_name
+        self.shared = shared
         
-        # Sélection intelligente si pas spécifié
-        if model_name is None:
-            model_name = self._auto_select_model()
+        # Rechargement à chaud: requêtes en cours, modèle précédent (rollback)
+        self.swap_gate = PorteBascule()
+        self.previous_model = None
+        self.reload_watcher = None
+        self._reload_lock = threading.Lock()
+        self.reload_state = {'status': 'idle', 'candidate': None, 'previous': None, 'swapped_at': None, 'error': None}
+        
+        # État de chargement exposé par /ready
+        self.ready = threading.Event()
+        self.loading_state = {
+            'phase': 'init',
+            'progress': 0.0,
+            'model': model_name,
+            'started_at': datetime.now().isoformat(),
+            'ready_at': None,
+            'error': None
+        }
         
-        self.model_name = model_name
         logger.info(f"🤖 Initialisation service IA")
-        logger.info(f"📋 Modèle demandé: {model_name}")
+        if shared is not None:
+            self.knowledge_base = shared.knowledge_base
+            self.kb_store = shared.kb_store
+            self.kb_index = shared.kb_index
+            self.kb_lock = shared.kb_lock
+            self.conversation_history = shared.conversation_history
+        else:
+            self._load_knowledge_base()
         
-        self._load_model()
-        self._load_knowledge_base()
+        if background:
+            threading.Thread(target=self._load_all, name='model-loader', daemon=True).start()
+        else:
+            self._load_all()
+    
+    def _set_phase(self, phase, progress):
+        """Mettre à jour l'état de chargement"""
+        self.loading_state.update({'phase': phase, 'progress': progress, 'model': self.model_name})
+        logger.info(f"⏳ Chargement IA: {phase} ({progress:.0%})")
+    
+    def _load_all(self):
+        """Sélection + chargement du modèle, puis caches (thread de chargement ou appel direct)"""
+        try:
+            # Sélection intelligente si pas spécifié
+            if self.model_name is None:
+                self._set_phase('selecting', 0.05)
+                self.model_name = self._auto_select_model()
+            logger.info(f"📋 Modèle demandé: {self.model_name}")
+            
+            self._set_phase('loading', 0.1)
+            self._load_model()
+            self._init_scheduler()
+            self._init_prefix_cache()
+        except Exception as e:
+            logger.error(f"❌ Erreur chargement modèle: {e}")
+            self.loading_state['error'] = str(e)
+        
+        if self.shared is not None:
+            # Les clés du cache incluent le nom du modèle: un seul cache pour tout le pool
+            self.response_cache = self.shared.response_cache
+            self.semantic_index = self.shared.semantic_index
+        else:
+            self.response_cache = ResponseCache(
+                self.config.CACHE_PATH,
+                capacite=self.config.RESPONSE_CACHE_SIZE,
+                ttl=self.config.RESPONSE_CACHE_TTL,
+                empreinte=self._cache_fingerprint()
+            )
+        self.loading_state['ready_at'] = datetime.now().isoformat()
+        self._set_phase('ready' if self.model_info else 'fallback', 1.0)
+        self.ready.set()
+        
+        if self.shared is None:
+            self._init_semantic_index()
+            self._init_hot_reload()
+    
+    def _cache_fingerprint(self):
+        """Empreinte modèle + base de connaissances: toute modification invalide le cache"""
+        model = f"{self.model_info.get('name', 'fallback')}@{self.model_info.get('device', '')}"
+        return f"{self.model_name}:{model}:{self.kb_store.revision}"
+    
+    def invalidate_response_cache(self):
+        """Invalider le cache après changement de modèle ou de KB"""
+        if self.response_cache is not None:
+            self.response_cache.invalider(self._cache_fingerprint())
+    
+    def memory_bytes(self):
+        """Mémoire occupée par les poids du modèle chargé et du modèle gardé pour rollback (0 si fallback)"""
+        previous = (self.previous_model or {}).get('model_info') or {}
+        return self.model_info.get('memory_bytes', 0) + previous.get('memory_bytes', 0)
+    
+    def unload(self):
+        """Libérer le modèle (éviction du pool): micro-batching arrêté, poids rendus à l'allocateur"""
+        self.ready.clear()
+        references = {attr: getattr(self, attr) for attr in self._SWAP_ATTRS if attr != 'model_name'}
+        for attr in references:
+            setattr(self, attr, None)
+        self.model_info = {}
+        self._set_phase('unloaded', 0.0)
+        self._release(references)
+    
+    @staticmethod
+    def _release(references):
+        """Arrêter le micro-batching d'un modèle retiré et rendre sa mémoire"""
+        if references.get('scheduler') is not None:
+            references['scheduler'].arreter()
+        references.clear()
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    
+    def _base_model(self, name):
+        """Modèle de base d'un fine-tune (phi-finetuned-20240115_103045 -> phi2)"""
+        return self._normalize_model_name((name or '').split('-finetuned')[0])
+    
+    def _init_hot_reload(self):
+        """Surveiller models/ et basculer sur chaque nouveau fine-tune du modèle servi (IA_HOT_RELOAD)"""
+        if not self.config.HOT_RELOAD or not self.model_info or self.model_name == 'ollama':
+            return
+        self.reload_watcher = SurveillantFinetunes(
+            self.config.MODELS_PATH,
+            lambda dossier, metadata: self.reload_model(dossier.name),
+            filtre=lambda nom: self._base_model(nom) == self._base_model(self.model_name),
+            intervalle=self.config.HOT_RELOAD_INTERVAL
+        )
+        logger.info(f"👀 Rechargement à chaud actif: fine-tunes de {self._base_model(self.model_name)}")
+    
+    def latest_finetune(self):
+        """Nom du fine-tune terminé le plus récent du modèle servi (None si aucun)"""
+        base = self._base_model(self.model_name)
+        dossiers = finetunes_termines(self.config.MODELS_PATH, lambda nom: self._base_model(nom) == base)
+        return dossiers[-1].name if dossiers else None
+    
+    def reload_model(self, name):
+        """
+        Charger un modèle en arrière-plan puis basculer dessus entre deux requêtes
+        
+        Le modèle remplacé reste en mémoire pour rollback_model().
+        
+        Args:
+            name (str): Modèle à charger (ex: phi2-finetuned-20240115_103045)
+            
+        Returns:
+            bool: False si un rechargement est déjà en cours
+        """
+        with self._reload_lock:
+            if self.reload_state['status'] == 'loading':
+                return False
+            self.reload_state.update({'status': 'loading', 'candidate': name, 'error': None})
+        threading.Thread(target=self._reload, args=(name,), name='model-reload', daemon=True).start()
+        return True
+    
+    def _reload(self, name):
+        """Chargement du candidat (thread), puis bascule; le modèle actuel est conservé en cas d'échec"""
+        debut = datetime.now()
+        try:
+            candidate = IAService(name, shared=self)
+            if not candidate.model_info:
+                raise RuntimeError(candidate.loading_state['error'] or f"modèle {name} non chargé")
+        except Exception as e:
+            logger.error(f"❌ Rechargement de {name} échoué, modèle actuel conservé: {e}")
+            self.reload_state.update({'status': 'failed', 'error': str(e)})
+            return
+        
+        with self._reload_lock:
+            previous = self.previous_model
+            self.previous_model = self._swap({attr: getattr(candidate, attr) for attr in self._SWAP_ATTRS})
+            self.reload_state.update({
+                'status': 'idle',
+                'previous': self.previous_model['model_name'],
+                'swapped_at': datetime.now().isoformat(),
+                'load_s': round((datetime.now() - debut).total_seconds(), 1)
+            })
+        # Une seule version gardée pour le rollback
+        if previous is not None:
+            self._release(previous)
+        logger.info(f"🔄 Modèle basculé à chaud: {self.previous_model['model_name']} -> {self.model_name}")
+    
+    def rollback_model(self):
+        """
+        Revenir au modèle précédent (sans rechargement; le modèle actuel devient le précédent)
+        
+        Returns:
+            bool: False si aucun modèle précédent n'est gardé
+        """
+        with self._reload_lock:
+            if self.previous_model is None:
+                return False
+            self.previous_model = self._swap(self.previous_model)
+            self.reload_state.update({
+                'previous': self.previous_model['model_name'],
+                'swapped_at': datetime.now().isoformat()
+            })
+        logger.info(f"↩️ Rollback du modèle: {self.previous_model['model_name']} -> {self.model_name}")
+        return True
+    
+    def _swap(self, references):
+        """Échanger les références du modèle servi entre deux requêtes; retourne les anciennes"""
+        with self.swap_gate.exclusive(self.config.HOT_RELOAD_DRAIN_TIMEOUT) as sans_requete:
+            if not sans_requete:
+                logger.warning("⚠️ Requêtes encore en cours après le délai, bascule immédiate")
+            anciennes = {attr: getattr(self, attr) for attr in self._SWAP_ATTRS}
+            for attr, valeur in references.items():
+                setattr(self, attr, valeur)
+        self.loading_state['model'] = self.model_name
+        self.invalidate_response_cache()
+        return anciennes
+    
+    def _init_scheduler(self):
+        """Activer le micro-batching si un pipeline HuggingFace est chargé"""
+        if self.text_generator is None or self.scheduler is not None:
+            return
+        
+        # Padding à gauche: les prompts de longueurs différentes finissent
+        # tous au même index, la génération continue juste après
+        if self.tokenizer is not None:
+            self.tokenizer.padding_side = 'left'
+            if self.tokenizer.pad_token is None:
+                self.tokenizer.pad_token = self.tokenizer.eos_token
+        
+        self.scheduler = GenerationScheduler(
+            self._generate_batch,
+            fenetre_ms=self.config.BATCH_WINDOW_MS,
+            taille_max=self.config.BATCH_MAX_SIZE
+        )
+        logger.info(f"📦 Micro-batching actif ({self.config.BATCH_WINDOW_MS:g} ms, max {self.config.BATCH_MAX_SIZE})")
+    
+    def _init_prefix_cache(self):
+        """Pré-calculer le cache KV du préambule (vérifié contre la génération complète)"""
+        if not self.config.PREFIX_CACHE or not isinstance(self.model, torch.nn.Module) or self.tokenizer is None:
+            return
+        try:
+            self._set_phase('prefix_cache', 0.95)
+            cache = PrefixKVCache(self.model, self.tokenizer, PROMPT_PREFIX)
+            
+            # Certains modèles (code distant) ignorent past_key_values: vérifier sur un prompt court
+            prompt = self._build_prompt("Le compresseur chauffe", {}, 'general')
+            params = {**self._generation_params(), 'max_new_tokens': 4}
+            attendu = self.text_generator(prompt, **params)[0]['generated_text']
+            obtenu = cache.generer([prompt], params)[0][0]['generated_text']
+            if obtenu.strip() != attendu.strip():
+                logger.warning("⚠️ Cache KV du préambule incohérent avec ce modèle, désactivé")
+                return
+            self.prefix_cache = cache
+        except Exception as e:
+            logger.warning(f"⚠️ Cache KV du préambule indisponible: {e}")
+    
+    def _generate_batch(self, prompts, generation_params):
+        """Exécuter un lot de prompts en un seul appel (cache KV du préambule si possible)"""
+        if self.prefix_cache is not None and all(self.prefix_cache.couvre(p) for p in prompts):
+            return self.prefix_cache.generer(prompts, generation_params)
+        with torch.inference_mode():
+            return self.text_generator(prompts, batch_size=len(prompts), **generation_params)
     
     def _auto_select_model(self):
         """Sélection automatique selon ressources disponibles"""
         logger.info("🔍 Détection des ressources disponibles...")
         
         # Vérifier ollama
-        try:
-            requests.get('http://localhost:11434/api/tags', timeout=2)
+        if sonder('http://localhost:11434/api/tags', timeout=2, ttl=self.config.PROBE_TTL,
+                  fichier=self.config.CACHE_PATH / 'probes.json'):
             logger.info("✅ Ollama détecté - utilisation recommandée")
             return 'ollama'
-        except:
-            pass
         
         # Vérifier GPU
         if torch.cuda.is_available():
@@ -139,12 +519,12 @@ class IAService:
             # Supporter anciens noms (mapping backward compatibility)
             model_name = self._normalize_model_name(self.model_name)
             
-            if model_name not in self.config.MODEL_OPTIONS:
+            model_cfg = self.config.model_config(model_name)
+            if model_cfg is None:
                 logger.error(f"❌ Modèle inconnu: {model_name}")
                 logger.info(f"Modèles disponibles: {list(self.config.MODEL_OPTIONS.keys())}")
                 return False
             
-            model_cfg = self.config.MODEL_OPTIONS[model_name]
             logger.info(f"📋 Configuration: {model_cfg['description']}")
             
             # Cas spécial: Ollama
@@ -193,10 +573,10 @@ class IAService:
         
         # 3. Vérifier connectivité si téléchargement
         if not use_local:
-            try:
-                requests.get('https://huggingface.co', timeout=3)
+            if sonder('https://huggingface.co', timeout=3, ttl=self.config.PROBE_TTL,
+                      fichier=self.config.CACHE_PATH / 'probes.json'):
                 logger.info("✅ Connectivité HuggingFace OK")
-            except:
+            else:
                 logger.error("❌ Pas d'accès à huggingface.co")
                 if model_name == 'phi2' or model_name == 'gpt2':
                     logger.info("💡 Fallback sur réponses intelligentes")
@@ -207,6 +587,7 @@ class IAService:
             device = "cuda" if torch.cuda.is_available() else "cpu"
             logger.info(f"🖥️ Device: {device.upper()}")
             
+            self._set_phase('loading_tokenizer', 0.2)
             logger.info(f"⏳ Chargement tokenizer...")
             self.tokenizer = AutoTokenizer.from_pretrained(
                 model_id,
@@ -226,10 +607,28 @@ class IAService:
             if torch.cuda.is_available():
                 load_kwargs['torch_dtype'] = torch.float16
             
-            self.model = AutoModelForCausalLM.from_pretrained(model_id, **load_kwargs)
-            self.model.eval()
+            self._set_phase('loading_weights', 0.3)
+            onnx_model = None
+            if device == 'cpu' and self.config.BACKEND == 'onnx':
+                onnx_model = self._load_onnx_model(model_id, local_folder or model_name, use_local)
+            
+            if onnx_model is not None:
+                self.model = onnx_model
+                device = 'cpu-onnx'
+            elif device == 'cpu' and self.config.QUANTIZE_CPU:
+                cache_int8 = self.config.MODELS_PATH / f"{local_folder or model_name}-int8"
+                self.model = charger_ou_quantifier(
+                    model_id, cache_int8,
+                    lambda: AutoModelForCausalLM.from_pretrained(model_id, **load_kwargs)
+                )
+                device = 'cpu-int8'
+            else:
+                self.model = AutoModelForCausalLM.from_pretrained(model_id, **load_kwargs)
+            if hasattr(self.model, 'eval'):
+                self.model.eval()
             
             # Créer le pipeline
+            self._set_phase('building_pipeline', 0.9)
             self.text_generator = pipeline(
                 'text-generation',
                 model=self.model,
@@ -237,14 +636,34 @@ class IAService:
                 device=0 if torch.cuda.is_available() else -1
             )
             
-            logger.info(f"✅ Modèle {model_name} chargé avec succès")
-            self.model_info = {'name': model_name, 'device': device}
+            if isinstance(self.model, torch.nn.Module):
+                memory_bytes = taille_poids(self.model)
+            else:
+                export = self.config.MODELS_PATH / f"{local_folder or model_name}-onnx"
+                memory_bytes = sum(f.stat().st_size for f in export.glob('*.onnx*'))
+            
+            logger.info(f"✅ Modèle {model_name} chargé avec succès ({memory_bytes / 1e6:.0f} Mo)")
+            self.model_info = {'name': model_name, 'device': device, 'memory_bytes': memory_bytes}
             return True
             
         except Exception as e:
             logger.error(f"❌ Erreur chargement HuggingFace: {e}")
             return False
     
+    def _load_onnx_model(self, model_id, folder, use_local):
+        """Modèle ONNX Runtime (export mis en cache), None si indisponible -> backend transformers"""
+        try:
+            return charger_onnx(
+                model_id,
+                self.config.MODELS_PATH / f"{folder}-onnx",
+                threads=self.config.ONNX_THREADS,
+                trust_remote_code=True,
+                local_files_only=use_local
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Backend ONNX indisponible ({e}), utilisation de transformers")
+            return None
+    
     def _load_ollama_model(self):
         """Charger via Ollama API"""
         try:
@@ -409,16 +828,44 @@ class IAService:
     def _load_knowledge_base(self):
         """Charger la base de connaissances"""
         try:
-            kb_file = self.config.DB_PATH / "knowledge_base.json"
-            if kb_file.exists():
-                with open(kb_file, 'r', encoding='utf-8') as f:
-                    self.knowledge_base = json.load(f)
+            self.knowledge_base = self.kb_store.charger()
+            if self.knowledge_base:
+                for topic, content in self.knowledge_base.items():
+                    self.kb_index.ajouter(topic, texte_entree(topic, content))
                 logger.info(f"✅ Base de connaissances chargée: {len(self.knowledge_base)} entrées")
             else:
                 logger.info("ℹ Pas de base de connaissances existante")
         except Exception as e:
             logger.error(f"❌ Erreur chargement KB: {e}")
     
+    def _init_semantic_index(self):
+        """Activer la recherche sémantique (IA_KB_SEMANTIC) et encoder les entrées manquantes"""
+        if not self.config.KB_SEMANTIC:
+            return
+        try:
+            encodeur = encodeur_sentence_transformers(self.config.KB_EMBEDDING_MODEL)
+            if encodeur is None:
+                logger.warning("⚠️ sentence-transformers non installé, recherche KB en BM25 seul")
+                return
+            self.semantic_index = IndexSemantique(
+                self.config.CACHE_PATH / "embeddings",
+                encodeur,
+                modele=self.config.KB_EMBEDDING_MODEL,
+                seuil_quantifieur=self.config.KB_SEMANTIC_IVF_THRESHOLD
+            )
+            with self.kb_lock:
+                entrees = list(self.knowledge_base.items())
+            manquantes = [
+                (topic, texte_entree(topic, content))
+                for topic, content in entrees
+                if topic not in self.semantic_index
+            ]
+            self.semantic_index.ajouter_lot(manquantes)
+            logger.info(f"✅ Recherche sémantique active ({len(manquantes)} entrées encodées)")
+        except Exception as e:
+            logger.error(f"❌ Erreur index sémantique: {e}")
+            self.semantic_index = None
+    
     def process_chat_message(self, message, user_id=None):
         """
         Traiter un message du chat
@@ -439,8 +886,9 @@ class IAService:
             # 2. Récupérer le contexte
             context = self._get_context(message, user_id)
             
-            # 3. Générer la réponse
-            response = self._generate_response(message, context, intent)
+            # 3. Générer la réponse (jamais pendant une bascule de modèle)
+            with self.swap_gate.requete():
+                response = self._generate_response(message, context, intent)
             
             # 4. Sauvegarder dans l'historique
             self._save_to_history(user_id, message, response)
@@ -459,6 +907,58 @@ class IAService:
                 'response': 'Erreur lors du traitement du message'
             }
     
+    def stream_chat_message(self, message, user_id=None):
+        """
+        Traiter un message du chat en flux: le texte est émis dès qu'il est décodé
+        
+        Args:
+            message (str): Message de l'utilisateur
+            user_id (str): ID de l'utilisateur
+            
+        Yields:
+            dict: {'type': 'token', 'text': ...} puis un dernier
+                  {'type': 'done', 'response': ..., 'intent': ..., 'timestamp': ...}
+        """
+        logger.info(f"💬 Message reçu (flux): {message[:50]}...")
+        intent = self._analyze_intent(message)
+        context = self._get_context(message, user_id)
+        
+        response = None
+        emis = False
+        try:
+            with self.swap_gate.requete():
+                if self.ready.is_set() and self.text_generator is not None and self.tokenizer is not None:
+                    generation_params = self._generation_params()
+                    cle = ResponseCache.cle(message, intent, self.model_name, generation_params)
+                    response = self.response_cache.obtenir(cle)
+                    if response is None:
+                        morceaux = []
+                        prompt = self._build_prompt(message, context, intent)
+                        for texte in self._stream_with_model(prompt, generation_params):
+                            morceaux.append(texte)
+                            emis = True
+                            yield {'type': 'token', 'text': texte}
+                        response = self._clean_response(''.join(morceaux))
+                        if response is not None:
+                            self.response_cache.stocker(cle, response)
+        except Exception as e:
+            logger.error(f"❌ Erreur génération en flux: {e}")
+            response = None
+        
+        # Fallback (ou réponse en cache): envoyée d'un bloc
+        if response is None:
+            response = self._generate_fallback_response(message, intent)
+        if not emis:
+            yield {'type': 'token', 'text': response}
+        
+        self._save_to_history(user_id, message, response)
+        yield {
+            'type': 'done',
+            'response': response,
+            'intent': intent,
+            'timestamp': datetime.now().isoformat()
+        }
+    
     def process_alert(self, alert_data):
         """
         Traiter une alerte de app.py
@@ -494,21 +994,7 @@ class IAService:
     
     def _analyze_intent(self, message):
         """Analyser l'intention du message"""
-        message_lower = message.lower()
-        
-        intents = {
-            'diagnostic': ['diagnostic', 'diagnose', 'problem', 'issue'],
-            'solution': ['fix', 'repair', 'solution', 'how to'],
-            'alert': ['alert', 'error', 'warning', 'critical'],
-            'info': ['what', 'why', 'how', 'explain'],
-            'learn': ['learn', 'train', 'remember'],
-        }
-        
-        for intent, keywords in intents.items():
-            if any(kw in message_lower for kw in keywords):
-                return intent
-        
-        return 'general'
+        return MOTS_CLES.premiere(message, 'intent') or 'general'
     
     def _get_context(self, message, user_id):
         """Récupérer le contexte pertinent"""
@@ -520,19 +1006,34 @@ class IAService:
         }
         return context
     
-    def _search_knowledge_base(self, query):
-        """Chercher dans la base de connaissances"""
-        # Sera implémenté avec recherche sémantique
-        results = []
-        for key, value in self.knowledge_base.items():
-            if any(word in query.lower() for word in key.split()):
-                results.append(value)
-        return results[:3]  # Top 3 résultats
+    def _search_knowledge_base(self, query, top_k=3):
+        """
+        Chercher dans la base de connaissances
+        
+        BM25 sur sujet + contenu; si l'index sémantique est actif, les deux
+        classements sont fusionnés (reciprocal rank fusion).
+        """
+        classements = [self.kb_index.rechercher(query, 2 * top_k)]
+        if self.semantic_index is not None:
+            try:
+                classements.append(self.semantic_index.rechercher(
+                    query, 2 * top_k, score_min=self.config.KB_SEMANTIC_MIN_SCORE
+                ))
+            except Exception as e:
+                logger.warning(f"⚠️ Recherche sémantique indisponible: {e}")
+        
+        scores = {}
+        for classement in classements:
+            for rang, (topic, _) in enumerate(classement):
+                scores[topic] = scores.get(topic, 0.0) + 1.0 / (60 + rang)
+        
+        meilleurs = sorted(scores, key=scores.get, reverse=True)
+        return [self.knowledge_base[topic] for topic in meilleurs if topic in self.knowledge_base][:top_k]
     
     def _generate_response(self, message, context, intent):
         """Générer une réponse avec le modèle LLM - MODE ULTRA-RAPIDE CPU"""
         try:
-            if self.text_generator is None:
+            if self.text_generator is None or not self.ready.is_set():
                 logger.warning("⚠ Modèle non disponible, réponse de fallback")
                 return self._generate_fallback_response(message, intent)
             
@@ -542,35 +1043,16 @@ class IAService:
             # Prompt structuré pour éviter le bruit
             prompt = self._build_prompt(message, context, intent)
             
-            # Paramètres ultra-optimisés pour CPU + qualité + rapidité
-            generation_params = {
-                'max_new_tokens': 40,  # Ultra-court: 40 tokens
-                'temperature': 0.3,    # Plus déterministe (moins aléatoire)
-                'top_p': 0.85,
-                'do_sample': False,    # Greedy decoding (plus rapide, plus cohérent)
-                'pad_token_id': self.tokenizer.eos_token_id if self.tokenizer else 50256,
-            }
+            generation_params = self._generation_params()
             
-            try:
-                outputs = self.text_generator(
-                    prompt,
-                    **generation_params
-                )
-            except Exception as e:
-                logger.warning(f"⚠ Génération échouée ({e}), fallback")
-                return self._generate_fallback_response(message, intent)
-            
-            if not outputs or len(outputs) == 0:
-                return self._generate_fallback_response(message, intent)
-                
-            full_text = outputs[0].get('generated_text', '')
-            response = full_text[len(prompt):].strip()
-            
-            # Nettoyer et limiter
-            response = response.replace('\n', ' ')[:150]
-            response = response.strip()
+            # Questions répétées: réponse en cache, requêtes identiques simultanées coalescées
+            cle = ResponseCache.cle(message, intent, self.model_name, generation_params)
+            response = self.response_cache.obtenir_ou_calculer(
+                cle,
+                lambda: self._generate_with_model(prompt, generation_params)
+            )
             
-            if not response or len(response) < 3:
+            if response is None:
                 return self._generate_fallback_response(message, intent)
             
             logger.info(f"✅ Réponse: {response[:70]}...")
@@ -580,27 +1062,101 @@ class IAService:
             logger.error(f"❌ Erreur génération: {e}")
             return self._generate_fallback_response(message, intent)
     
+    def _generation_params(self):
+        """Paramètres ultra-optimisés pour CPU + qualité + rapidité"""
+        return {
+            'max_new_tokens': 40,  # Ultra-court: 40 tokens
+            'temperature': 0.3,    # Plus déterministe (moins aléatoire)
+            'top_p': 0.85,
+            'do_sample': False,    # Greedy decoding (plus rapide, plus cohérent)
+            'pad_token_id': self.tokenizer.eos_token_id if self.tokenizer else 50256,
+        }
+    
+    def _clean_response(self, text):
+        """Nettoyer et limiter une sortie brute (None si inexploitable)"""
+        response = text.replace('\n', ' ')[:150].strip()
+        if not response or len(response) < 3:
+            return None
+        return response
+    
+    def _stream_with_model(self, prompt, generation_params):
+        """
+        Génération en flux via TextIteratorStreamer (hors micro-batching:
+        le streamer ne suit qu'une séquence)
+        
+        Yields:
+            str: Morceaux de texte nettoyés, 150 caractères au total au plus
+        """
+        streamer = TextIteratorStreamer(
+            self.tokenizer,
+            skip_prompt=True,
+            skip_special_tokens=True,
+            timeout=self.config.STREAM_TIMEOUT
+        )
+        if self.prefix_cache is not None and self.prefix_cache.couvre(prompt):
+            inputs = self.prefix_cache.entrees([prompt])
+        else:
+            inputs = self.tokenizer(prompt, return_tensors='pt').to(self.model.device)
+        
+        def generer():
+            try:
+                with torch.inference_mode():
+                    self.model.generate(**inputs, streamer=streamer, **generation_params)
+            except Exception as e:
+                logger.warning(f"⚠ Génération en flux échouée: {e}")
+                streamer.end()
+        
+        thread = threading.Thread(target=generer, name='generation-stream', daemon=True)
+        thread.start()
+        
+        restant = 150
+        for texte in streamer:
+            texte = texte.replace('\n', ' ')
+            if restant == 150:
+                texte = texte.lstrip()
+            texte = texte[:restant]
+            if texte:
+                restant -= len(texte)
+                yield texte
+        thread.join()
+    
+    def _generate_with_model(self, prompt, generation_params):
+        """Génération LLM brute nettoyée (None si échec ou réponse inexploitable)"""
+        try:
+            if self.scheduler is not None:
+                outputs = self.scheduler.generer(prompt, generation_params, timeout=self.config.GENERATION_TIMEOUT)
+            else:
+                outputs = self._generate_batch([prompt], generation_params)[0]
+        except Exception as e:
+            logger.warning(f"⚠ Génération échouée ({e}), fallback")
+            return None
+        
+        if not outputs or len(outputs) == 0:
+            return None
+            
+        full_text = outputs[0].get('generated_text', '')
+        return self._clean_response(full_text[len(prompt):].strip())
+    
     def _generate_fallback_response(self, message, intent):
         """Générer une réponse de fallback intelligente - PRIORITÉ sur gpt2 aléatoire"""
-        message_lower = message.lower()
-        
-        # Réponses intelligentes basées sur les mots-clés
-        if any(word in message_lower for word in ['panne', 'problème', 'erreur', 'error', 'problem', 'fail']):
+        # Réponses intelligentes basées sur les mots-clés (même passe que l'intention)
+        categorie = MOTS_CLES.premiere(message, 'fallback')
+        if categorie == 'panne':
             return "🔴 Diagnostic d'alerte détecté.\n\nEtapes recommandées:\n1. Vérifier l'alimentation\n2. Contrôler la température\n3. Inspecter les connexions\n4. Consulter les logs détaillés"
         
-        elif any(word in message_lower for word in ['température', 'temperature', 'temp', 'chaud', 'froid', 'heat', 'cold']):
+        elif categorie == 'temperature':
             return "🌡️ Problème de température identifié.\n\nActions:\n1. Vérifier le thermostat\n2. Nettoyer les filtres à air\n3. Vérifier la circulation d'air\n4. Contrôler le compresseur"
         
-        elif any(word in message_lower for word in ['électrique', 'electrical', 'puissance', 'power', 'courant', 'current']):
+        elif categorie == 'electrique':
             return "⚡ Problème d'alimentation détecté.\n\nVérifications:\n1. Contrôler le fusible/disjoncteur\n2. Mesurer la tension (230V)\n3. Vérifier le câblage\n4. Tester l'interrupteur"
         
-        elif any(word in message_lower for word in ['bruit', 'noise', 'son', 'sound', 'vibration']):
+        elif categorie == 'bruit':
             return "🔊 Anomalie sonore détectée.\n\nCauses possibles:\n1. Compresseur usé\n2. Ventilateur défaillant\n3. Vibrations mécaniques\n4. Accumulation de givre"
         
-        elif any(word in message_lower for word in ['fuite', 'leak', 'eau', 'water', 'condensation']):
+        elif categorie == 'fuite':
             return "💧 Problème d'humidité détecté.\n\nSolutions:\n1. Nettoyer l'évacuation\n2. Vérifier les joints\n3. Vérifier l'évaporateur\n4. Contrôler le drainage"
         
-        elif any(word in message_lower for word in ['diagnostique', 'diagnostic', 'analyse', 'analyze', 'test']):
+        elif categorie == 'diagnostic':
             return "🔍 Diagnostic en cours.\n\nParamètres vérifiés:\n- Température interne/externe\n- Pression du circuit\n- Consommation électrique\n- Cycles de compresseur\n- État des alarmes"
         
         elif intent == 'solution':
@@ -616,9 +1172,7 @@ class IAService:
     def _build_prompt(self, message, context, intent):
         """Construire le prompt pour le modèle - COURT et STRUCTURÉ"""
         # Prompt court mais structuré pour éviter du bruit
-        prompt = f"""Vous etes un expert en diagnostic frigorifique. Repondez brievement.
-
-Question: {message}
+        prompt = f"""{PROMPT_PREFIX}Question: {message}
 
 Reponse courte et technique:"""
         return prompt
@@ -633,8 +1187,8 @@ Reponse courte et technique:"""
         }
         base_severity = severity_map.get(alert_data.get('severity', 'info'), 1)
         
-        # Ajuster selon les données
-        if 'temperature' in str(alert_data).lower():
+        # Ajuster selon les données (passe partagée avec _find_solutions)
+        if 'temperature' in MOTS_CLES.trouver(str(alert_data))['solution']:
             base_severity *= 1.2
         
         return min(base_severity, 4)
@@ -642,7 +1196,6 @@ Reponse courte et technique:"""
     def _find_solutions(self, alert_data):
         """Trouver des solutions pour une alerte"""
         solutions = []
-        alert_str = str(alert_data).lower()
         
         # Solutions pré-définies
         solution_map = {
@@ -663,9 +1216,8 @@ Reponse courte et technique:"""
             ]
         }
         
-        for key, sols in solution_map.items():
-            if key in alert_str:
-                solutions.extend(sols)
+        for key in MOTS_CLES.trouver(str(alert_data))['solution']:
+            solutions.extend(solution_map[key])
         
         return solutions[:3]  # Top 3 solutions
     
@@ -681,25 +1233,57 @@ Reponse courte et technique:"""
         
         # Garder seulement les N derniers messages
         if len(self.conversation_history) > 100:
-            self.conversation_history = self.conversation_history[-100:]
+            del self.conversation_history[:-100]  # En place: liste partagée avec le pool
     
     def add_to_knowledge_base(self, topic, content):
         """Ajouter une entrée à la base de connaissances"""
-        self.knowledge_base[topic] = content
+        self.add_many_to_knowledge_base([(topic, content)])
+        logger.info(f"✅ Entrée ajoutée à la KB: {topic}")
+    
+    def add_many_to_knowledge_base(self, entries):
+        """
+        Ajouter un lot d'entrées à la base de connaissances
         
-        # Sauvegarder
-        kb_file = self.config.DB_PATH / "knowledge_base.json"
-        with open(kb_file, 'w', encoding='utf-8') as f:
-            json.dump(self.knowledge_base, f, ensure_ascii=False, indent=2)
+        Index, journal disque et cache de réponses ne sont mis à jour
+        qu'une fois pour tout le lot.
         
-        logger.info(f"✅ Entrée ajoutée à la KB: {topic}")
+        Args:
+            entries (list): [(topic, content)]
+            
+        Returns:
+            int: Nombre d'entrées ajoutées
+        """
+        entries = list(entries)
+        if not entries:
+            return 0
+        
+        textes = [(topic, texte_entree(topic, content)) for topic, content in entries]
+        if self.semantic_index is not None:
+            self.semantic_index.ajouter_lot(textes)
+        
+        # Un seul écrivain: la compaction sérialise la base sans qu'un autre lot la modifie
+        with self.kb_lock:
+            for (topic, content), (_, texte) in zip(entries, textes):
+                self.knowledge_base[topic] = content
+                self.kb_index.ajouter(topic, texte)
+            
+            # Sauvegarder (ajout au journal, compaction périodique)
+            self.kb_store.ajouter(entries, self.knowledge_base)
+        
+        self.invalidate_response_cache()
+        return len(entries)
     
     def get_stats(self):
         """Obtenir les statistiques du service"""
         return {
             'model': self.model_name,
+            'loading': dict(self.loading_state),
+            'hot_reload': dict(self.reload_state),
             'messages_processed': len(self.conversation_history),
             'knowledge_base_size': len(self.knowledge_base),
+            'kb_semantic_entries': len(self.semantic_index) if self.semantic_index else None,
+            'batching': dict(self.scheduler.stats) if self.scheduler else None,
+            'response_cache': {'entries': len(self.response_cache), **self.response_cache.stats} if self.response_cache else None,
             'uptime': datetime.now().isoformat()
         }
 
@@ -708,8 +1292,75 @@ Reponse courte et technique:"""
 _ia_service = None
 
 def get_ia_service(model='phi'):
-    """Obtenir l'instance du service IA (singleton)"""
+    """Obtenir l'instance du service IA (singleton, modèle chargé en arrière-plan)"""
     global _ia_service
     if _ia_service is None:
-        _ia_service = IAService(model)
+        _ia_service = IAService(model, background=IAConfig.BACKGROUND_LOADING)
     return _ia_service
+
+
+# Pool des autres modèles (base et fine-tunés), chargés à la demande
+_model_pool = None
+_pool_lock = threading.Lock()
+
+def estimate_model_bytes(name):
+    """Taille des fichiers de poids du modèle sur disque (None si non téléchargé)"""
+    model_cfg = IAConfig.model_config(name) or {}
+    folder = IAConfig.MODELS_PATH / (model_cfg.get('local_folder') or name)
+    if not folder.is_dir():
+        return None
+    motifs = ('*.safetensors', '*.bin', '*.pt', '*.onnx*')
+    return sum(f.stat().st_size for motif in motifs for f in folder.glob(motif)) or None
+
+def _load_pooled_service(name):
+    """Chargement d'un modèle du pool (thread du pool): erreur si seul le fallback est disponible"""
+    service = IAService(name, shared=get_ia_service())
+    if not service.model_info:
+        raise RuntimeError(service.loading_state['error'] or f"modèle {name} non chargé")
+    return service
+
+def get_model_pool():
+    """Obtenir le pool de modèles (singleton, budget IA_POOL_BUDGET_MB)"""
+    global _model_pool
+    with _pool_lock:
+        if _model_pool is None:
+            _model_pool = ModelPool(
+                _load_pooled_service,
+                budget_octets=int(IAConfig.POOL_BUDGET_MB * 1e6),
+                taille=lambda service: service.memory_bytes(),
+                liberer=lambda service: service.unload(),
+                estimer=estimate_model_bytes
+            )
+        return _model_pool
+
+@contextmanager
+def service_for(model=None):
+    """
+    Service du modèle demandé, protégé de l'éviction pendant le bloc
+    
+    Tant que le modèle demandé charge (ou a échoué), la requête est servie
+    par le modèle par défaut: comparer `service.model_name` au modèle demandé.
+    
+    Args:
+        model (str): Nom du modèle (None = modèle par défaut)
+    
+    Raises:
+        ValueError: Si le modèle est inconnu
+    """
+    default = get_ia_service()
+    name = default._normalize_model_name(model) if model else None
+    if not name or name == default._normalize_model_name(default.model_name):
+        yield default
+        return
+    if IAConfig.model_config(name) is None:
+        raise ValueError(f"Modèle inconnu: {model}")
+    # KB et cache de réponses partagés: le modèle par défaut doit être prêt
+    if not default.ready.is_set():
+        yield default
+        return
+    
+    pool = get_model_pool()
+    if default.model_info:
+        pool.epingler(default._normalize_model_name(default.model_name), default)
+    with pool.utiliser(name) as service:
+        yield service or default
@@ -0,0 +1,120 @@
+"""
+Index inversé BM25 de la base de connaissances
+Tokenisation française insensible aux accents, mise à jour incrémentale
+"""
+
+import re
+import math
+import json
+import threading
+import unicodedata
+from collections import Counter
+
+_MOTS = re.compile(r"[a-z0-9]+")
+
+# Mots vides français/anglais les plus fréquents (sans accents)
+MOTS_VIDES = frozenset("""
+a au aux avec ce ces cette dans de des du elle en est et il ils je la le les leur lui ma mais
+me mes mon ne nous on ou par pas pour qu que qui sa se ses son sur ta te tes ton tu un une vos
+votre vous y d l j c n s t m est sont ete etre avoir fait faire comment pourquoi quoi quel quelle
+the an and of to in is it for on with what why how
+""".split())
+
+
+def sans_accents(texte):
+    """Minuscules sans diacritiques (é -> e, ç -> c)"""
+    decompose = unicodedata.normalize('NFKD', str(texte).lower())
+    return ''.join(c for c in decompose if not unicodedata.combining(c))
+
+
+def tokeniser(texte):
+    """Tokens normalisés d'un texte (mots vides retirés)"""
+    return [mot for mot in _MOTS.findall(sans_accents(texte)) if mot not in MOTS_VIDES]
+
+
+def texte_entree(topic, content):
+    """Texte indexé d'une entrée KB: sujet + contenu (dict aplati)"""
+    if isinstance(content, dict):
+        content = ' '.join(str(v) for v in content.values())
+    elif not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False, default=str)
+    return f"{str(topic).replace('_', ' ')} {content}"
+
+
+class IndexBM25:
+    """
+    Index inversé avec classement Okapi BM25
+
+    Les listes de postings (terme -> {document: fréquence}) sont mises à jour
+    à chaque ajout: une recherche ne parcourt que les documents contenant au
+    moins un terme de la requête.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._verrou = threading.Lock()
+        self._postings = {}
+        self._termes = {}
+        self._longueurs = {}
+        self._longueur_totale = 0
+
+    def __len__(self):
+        return len(self._longueurs)
+
+    def ajouter(self, cle, texte):
+        """Indexe (ou ré-indexe) un document"""
+        frequences = Counter(tokeniser(texte))
+        with self._verrou:
+            self._retirer(cle)
+            for terme, tf in frequences.items():
+                self._postings.setdefault(terme, {})[cle] = tf
+            longueur = sum(frequences.values())
+            self._termes[cle] = list(frequences)
+            self._longueurs[cle] = longueur
+            self._longueur_totale += longueur
+
+    def supprimer(self, cle):
+        """Retire un document de l'index"""
+        with self._verrou:
+            self._retirer(cle)
+
+    def _retirer(self, cle):
+        longueur = self._longueurs.pop(cle, None)
+        if longueur is None:
+            return
+        self._longueur_totale -= longueur
+        for terme in self._termes.pop(cle):
+            del self._postings[terme][cle]
+            if not self._postings[terme]:
+                del self._postings[terme]
+
+    def rechercher(self, requete, k=3):
+        """
+        Documents les plus pertinents pour une requête
+
+        Args:
+            requete (str): Texte de la requête
+            k (int): Nombre de résultats
+
+        Returns:
+            list: [(cle, score)] par score décroissant (scores > 0 uniquement)
+        """
+        termes = set(tokeniser(requete))
+        with self._verrou:
+            n = len(self._longueurs)
+            if not n or not termes:
+                return []
+            longueur_moyenne = self._longueur_totale / n
+
+            scores = Counter()
+            for terme in termes:
+                docs = self._postings.get(terme)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for cle, tf in docs.items():
+                    norme = self.k1 * (1 - self.b + self.b * self._longueurs[cle] / longueur_moyenne)
+                    scores[cle] += idf * tf * (self.k1 + 1) / (tf + norme)
+
+        return scores.most_common(k)
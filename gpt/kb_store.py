@@ -0,0 +1,131 @@
+"""
+Stockage de la base de connaissances
+Journal en ajout seul + instantané compacté périodiquement, reprise après crash
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeStore:
+    """
+    Base de connaissances persistée en instantané + journal
+
+    `knowledge_base.json` est l'instantané (format inchangé: {topic: content}).
+    Chaque ajout est écrit en une ligne JSON dans `knowledge_base.log`; un lot
+    d'entrées coûte une seule écriture + fsync, quelle que soit la taille de la
+    base. Quand le journal dépasse `ratio_compaction` fois la taille de la base,
+    l'instantané est réécrit atomiquement (fichier temporaire + rename) puis le
+    journal est vidé. Au chargement, le journal est rejoué sur l'instantané;
+    une dernière ligne tronquée (crash pendant l'écriture) est ignorée.
+    """
+
+    def __init__(self, dossier, ratio_compaction=1.0, lignes_min_compaction=1000):
+        """
+        Args:
+            dossier (Path): Dossier des fichiers (IAConfig.DB_PATH)
+            ratio_compaction (float): Lignes de journal / entrées avant compaction
+            lignes_min_compaction (int): Taille minimale du journal avant compaction
+        """
+        self.dossier = Path(dossier)
+        self.dossier.mkdir(parents=True, exist_ok=True)
+        self.fichier_instantane = self.dossier / 'knowledge_base.json'
+        self.fichier_journal = self.dossier / 'knowledge_base.log'
+        self.ratio_compaction = ratio_compaction
+        self.lignes_min_compaction = lignes_min_compaction
+
+        self._verrou = threading.Lock()
+        self._lignes_journal = 0
+        self._revision = hashlib.sha1()
+
+    @property
+    def revision(self):
+        """Empreinte du contenu persisté (instantané + journal rejoué)"""
+        return self._revision.hexdigest()[:12]
+
+    @staticmethod
+    def _ligne(topic, content):
+        return json.dumps({'topic': topic, 'content': content}, ensure_ascii=False, default=str) + '\n'
+
+    def charger(self):
+        """
+        Charge l'instantané puis rejoue le journal
+
+        Returns:
+            dict: {topic: content}
+        """
+        with self._verrou:
+            base = {}
+            self._revision = hashlib.sha1()
+            if self.fichier_instantane.exists():
+                brut = self.fichier_instantane.read_bytes()
+                base = json.loads(brut.decode('utf-8'))
+                self._revision.update(brut)
+
+            self._lignes_journal = 0
+            if self.fichier_journal.exists():
+                valides = 0
+                with open(self.fichier_journal, 'rb') as f:
+                    for brut in f:
+                        try:
+                            entree = json.loads(brut)
+                            base[entree['topic']] = entree['content']
+                        except (ValueError, KeyError, TypeError):
+                            logger.warning("⚠️ Ligne de journal KB illisible ignorée (écriture interrompue)")
+                            break
+                        valides += len(brut)
+                        self._revision.update(brut)
+                        self._lignes_journal += 1
+                if valides < self.fichier_journal.stat().st_size:
+                    # Retirer la fin corrompue pour que les ajouts suivants restent lisibles
+                    with open(self.fichier_journal, 'r+b') as f:
+                        f.truncate(valides)
+            return base
+
+    def ajouter(self, entrees, base):
+        """
+        Journalise un lot d'entrées (une écriture, un fsync)
+
+        Args:
+            entrees (list): [(topic, content)] déjà appliquées à `base`
+            base (dict): Base complète, utilisée si une compaction est due
+        """
+        if not entrees:
+            return
+        lignes = ''.join(self._ligne(topic, content) for topic, content in entrees).encode('utf-8')
+        with self._verrou:
+            with open(self.fichier_journal, 'ab') as f:
+                f.write(lignes)
+                f.flush()
+                os.fsync(f.fileno())
+            self._revision.update(lignes)
+            self._lignes_journal += len(entrees)
+
+            if self._lignes_journal >= max(self.lignes_min_compaction, self.ratio_compaction * len(base)):
+                self._compacter(base)
+
+    def compacter(self, base):
+        """Réécrit l'instantané et vide le journal"""
+        with self._verrou:
+            self._compacter(base)
+
+    def _compacter(self, base):
+        brut = json.dumps(base, ensure_ascii=False, default=str).encode('utf-8')
+        tmp = self.fichier_instantane.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(brut)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(self.fichier_instantane)
+        # Crash ici: l'instantané contient déjà tout, rejouer le journal est idempotent
+        with open(self.fichier_journal, 'wb'):
+            pass
+        self._lignes_journal = 0
+        self._revision = hashlib.sha1(brut)
+        logger.info(f"🗜️ Base de connaissances compactée: {len(base)} entrées")
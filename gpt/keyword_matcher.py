@@ -0,0 +1,76 @@
+"""
+Détection de mots-clés en une passe (intentions, symptômes, solutions)
+Expression régulière unique compilée, insensible à la casse et aux accents
+"""
+
+import re
+from functools import lru_cache
+
+try:
+    from .kb_index import sans_accents
+except ImportError:
+    from kb_index import sans_accents
+
+
+class KeywordMatcher:
+    """
+    Tables de mots-clés par catégorie, cherchées en un seul parcours du texte
+
+    Même sémantique que `any(mot in texte.lower() for mot in mots)` (sous-chaînes,
+    chevauchements compris), avec en plus le repli des accents: 'probleme'
+    trouve 'problème'. Les étiquettes trouvées sont rendues dans l'ordre de
+    déclaration, qui sert de priorité aux appelants.
+    """
+
+    def __init__(self, categories, taille_cache=1024):
+        """
+        Args:
+            categories (dict): {catégorie: {étiquette: [mots-clés]}}
+            taille_cache (int): Textes récents dont le résultat est gardé (même
+                message analysé par plusieurs étapes du traitement)
+        """
+        self.categories = {categorie: list(etiquettes) for categorie, etiquettes in categories.items()}
+
+        cibles = {}
+        for categorie, etiquettes in categories.items():
+            for etiquette, mots in etiquettes.items():
+                for mot in mots:
+                    mot = sans_accents(mot)
+                    if mot:
+                        cibles.setdefault(mot, set()).add((categorie, etiquette))
+
+        # L'alternative retient le mot le plus long à chaque position: il porte
+        # aussi les étiquettes des mots-clés qu'il contient
+        self._etiquettes = {
+            mot: frozenset().union(*(cibles[autre] for autre in cibles if autre in mot))
+            for mot in cibles
+        }
+        alternatives = '|'.join(re.escape(mot) for mot in sorted(cibles, key=len, reverse=True))
+        # Lookahead: une correspondance possible à chaque position, sans consommer le texte
+        self._regex = re.compile(f'(?=({alternatives}))') if cibles else None
+
+        self.trouver = lru_cache(maxsize=taille_cache)(self._trouver)
+
+    def _trouver(self, texte):
+        """
+        Étiquettes trouvées dans le texte, par catégorie
+
+        Args:
+            texte (str): Message, alerte sérialisée...
+
+        Returns:
+            dict: {catégorie: tuple des étiquettes trouvées, dans l'ordre de déclaration}
+        """
+        trouvees = set()
+        if self._regex is not None:
+            for mot in set(self._regex.findall(sans_accents(texte))):
+                trouvees |= self._etiquettes[mot]
+        return {
+            categorie: tuple(e for e in etiquettes if (categorie, e) in trouvees)
+            for categorie, etiquettes in self.categories.items()
+        }
+
+    def premiere(self, texte, categorie):
+        """Étiquette prioritaire trouvée dans une catégorie (None si aucune)"""
+        etiquettes = self.trouver(texte)[categorie]
+        return etiquettes[0] if etiquettes else None
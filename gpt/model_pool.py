@@ -0,0 +1,177 @@
+"""
+Pool de modèles résidents sous budget mémoire
+Chargement en arrière-plan, éviction LRU, état exposé par /api/models
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class ModelPool:
+    """
+    Modèles chargés à la demande et gardés en mémoire tant que le budget le permet
+
+    `obtenir(nom)` retourne le modèle s'il est résident, sinon lance son
+    chargement dans un thread et retourne None (l'appelant sert la requête
+    autrement en attendant). Avant et après chaque chargement, les modèles
+    les moins récemment utilisés sont évincés jusqu'à repasser sous le
+    budget; un modèle épinglé ou en cours d'utilisation n'est jamais évincé.
+    """
+
+    def __init__(self, charger, budget_octets, taille, liberer=None, estimer=None, delai_reessai=60):
+        """
+        Args:
+            charger (callable): nom -> objet modèle (bloquant, exécuté dans un thread)
+            budget_octets (int): Mémoire maximale des modèles résidents
+            taille (callable): objet -> octets occupés
+            liberer (callable): objet -> None, appelé à l'éviction
+            estimer (callable): nom -> octets estimés avant chargement (ou None)
+            delai_reessai (float): Secondes avant de retenter un chargement échoué
+        """
+        self.charger = charger
+        self.budget = budget_octets
+        self.taille = taille
+        self.liberer = liberer
+        self.estimer = estimer
+        self.delai_reessai = delai_reessai
+
+        self._verrou = threading.Lock()
+        self._residents = OrderedDict()   # nom -> objet, ordre LRU (dernier = plus récent)
+        self._etats = {}                  # nom -> état affiché
+        self._epingles = set()
+        self._utilisations = {}
+
+    # ------------------------------------------------------------------
+    # Accès
+    # ------------------------------------------------------------------
+
+    def epingler(self, nom, objet):
+        """Ajoute un modèle résident non évincable (modèle par défaut, renommé après une bascule)"""
+        with self._verrou:
+            if self._residents.get(nom) is objet:
+                return
+            for ancien in [n for n in self._epingles if self._residents.get(n) is objet]:
+                del self._residents[ancien], self._etats[ancien]
+                self._epingles.discard(ancien)
+            self._residents[nom] = objet
+            self._epingles.add(nom)
+            self._etats[nom] = {'status': 'resident', 'pinned': True, 'loads': 1, 'last_used': time.time()}
+
+    def obtenir(self, nom):
+        """
+        Modèle résident, ou None si son chargement est en cours / vient d'être lancé
+
+        Args:
+            nom (str): Nom du modèle
+
+        Returns:
+            Objet modèle ou None
+        """
+        with self._verrou:
+            objet = self._residents.get(nom)
+            if objet is not None:
+                self._residents.move_to_end(nom)
+                self._etats[nom]['last_used'] = time.time()
+                return objet
+
+            etat = self._etats.get(nom, {})
+            if etat.get('status') == 'loading':
+                return None
+            if etat.get('status') == 'failed' and time.time() - etat['failed_at'] < self.delai_reessai:
+                return None
+            self._etats[nom] = {**etat, 'status': 'loading', 'pinned': False, 'error': None,
+                                'loading_since': time.time()}
+
+        threading.Thread(target=self._charger, args=(nom,), name=f'pool-{nom}', daemon=True).start()
+        return None
+
+    @contextmanager
+    def utiliser(self, nom):
+        """Comme obtenir(), en protégeant le modèle de l'éviction pendant le bloc"""
+        with self._verrou:
+            self._utilisations[nom] = self._utilisations.get(nom, 0) + 1
+        try:
+            yield self.obtenir(nom)
+        finally:
+            with self._verrou:
+                self._utilisations[nom] -= 1
+
+    def etat(self):
+        """État de chaque modèle connu: resident / loading / evicted / failed"""
+        with self._verrou:
+            etats = {}
+            for nom, etat in self._etats.items():
+                etats[nom] = dict(etat)
+                if nom in self._residents:
+                    etats[nom]['size_mb'] = round(self.taille(self._residents[nom]) / 1e6, 1)
+                    etats[nom]['in_use'] = self._utilisations.get(nom, 0)
+            return {
+                'budget_mb': round(self.budget / 1e6, 1),
+                'used_mb': round(self._occupation() / 1e6, 1),
+                'models': etats,
+            }
+
+    # ------------------------------------------------------------------
+    # Chargement / éviction
+    # ------------------------------------------------------------------
+
+    def _occupation(self):
+        return sum(self.taille(objet) for objet in self._residents.values())
+
+    def _faire_place(self, besoin):
+        """Évince les modèles LRU jusqu'à ce que `besoin` octets tiennent dans le budget (sous verrou)"""
+        evinces = []
+        for nom in list(self._residents):
+            if self._occupation() + besoin <= self.budget:
+                break
+            if nom in self._epingles or self._utilisations.get(nom, 0):
+                continue
+            evinces.append((nom, self._residents.pop(nom)))
+            self._etats[nom].update({'status': 'evicted', 'evicted_at': time.time()})
+        return evinces
+
+    def _liberer(self, evinces):
+        for nom, objet in evinces:
+            logger.info(f"♻️ Modèle évincé du pool (LRU): {nom}")
+            if self.liberer is not None:
+                try:
+                    self.liberer(objet)
+                except Exception as e:
+                    logger.warning(f"⚠️ Libération de {nom} incomplète: {e}")
+
+    def _charger(self, nom):
+        estimation = (self.estimer(nom) if self.estimer else None) or 0
+        with self._verrou:
+            evinces = self._faire_place(estimation)
+        self._liberer(evinces)
+
+        debut = time.time()
+        try:
+            objet = self.charger(nom)
+        except Exception as e:
+            logger.error(f"❌ Chargement du modèle {nom} échoué: {e}")
+            with self._verrou:
+                self._etats[nom].update({'status': 'failed', 'error': str(e), 'failed_at': time.time()})
+            return
+
+        with self._verrou:
+            self._residents[nom] = objet
+            self._etats[nom].update({
+                'status': 'resident',
+                'loads': self._etats[nom].get('loads', 0) + 1,
+                'load_s': round(time.time() - debut, 1),
+                'last_used': time.time(),
+            })
+            # Le modèle chargé est le plus récent: l'estimation a pu être trop basse
+            self._utilisations[nom] = self._utilisations.get(nom, 0) + 1
+            evinces = self._faire_place(0)
+            self._utilisations[nom] -= 1
+            if self._occupation() > self.budget:
+                logger.warning(f"⚠️ Budget du pool dépassé ({self._occupation() / 1e6:.0f} Mo), modèles épinglés ou en cours d'utilisation")
+        self._liberer(evinces)
+        logger.info(f"✅ Modèle {nom} résident dans le pool ({time.time() - debut:.1f}s)")
@@ -0,0 +1,91 @@
+"""
+Backend ONNX Runtime (CPU) pour les modèles causaux
+Export via optimum avec entrées KV-cache, graphe exporté mis en cache à côté du modèle
+"""
+
+import os
+import json
+import time
+import logging
+from pathlib import Path
+
+try:
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForCausalLM
+except ImportError:  # Optionnel: backend transformers sinon
+    ort = None
+    ORTModelForCausalLM = None
+
+try:
+    from .quantization import empreinte_source
+except ImportError:
+    from quantization import empreinte_source
+
+logger = logging.getLogger(__name__)
+
+FICHIER_META = 'onnx_export.json'
+
+
+def onnx_disponible():
+    """optimum[onnxruntime] est-il installé ?"""
+    return ORTModelForCausalLM is not None
+
+
+def options_session(threads=None):
+    """Options ONNX Runtime: optimisations de graphe complètes, threads intra-op"""
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = threads or os.cpu_count() or 1
+    return options
+
+
+def charger_onnx(model_id, dossier_export, threads=None, **kwargs_export):
+    """
+    Modèle ONNX Runtime depuis le cache, sinon exporté puis mis en cache
+
+    Args:
+        model_id (str): Chemin local ou identifiant HF du modèle PyTorch
+        dossier_export (Path): Dossier du graphe exporté (ex: models/gpt2-onnx)
+        threads (int): Threads intra-op (défaut: tous les cœurs)
+        **kwargs_export: Arguments supplémentaires de l'export (trust_remote_code, local_files_only...)
+
+    Returns:
+        ORTModelForCausalLM (compatible generate() et pipeline)
+
+    Raises:
+        RuntimeError: Si optimum/onnxruntime n'est pas installé
+        Exception: Erreurs d'export (architecture non supportée...)
+    """
+    if not onnx_disponible():
+        raise RuntimeError("optimum[onnxruntime] non installé")
+
+    dossier_export = Path(dossier_export)
+    fichier_meta = dossier_export / FICHIER_META
+    source = empreinte_source(model_id)
+    source['onnxruntime'] = ort.__version__
+
+    options = dict(provider='CPUExecutionProvider', session_options=options_session(threads), use_cache=True)
+
+    if fichier_meta.exists():
+        try:
+            if json.loads(fichier_meta.read_text(encoding='utf-8')).get('source') == source:
+                debut = time.time()
+                model = ORTModelForCausalLM.from_pretrained(dossier_export, **options)
+                logger.info(f"✅ Graphe ONNX chargé depuis le cache en {time.time() - debut:.1f}s: {dossier_export}")
+                return model
+            logger.info("ℹ Export ONNX obsolète (poids ou versions modifiés), ré-export")
+        except Exception as e:
+            logger.warning(f"⚠️ Export ONNX en cache illisible ({e}), ré-export")
+
+    debut = time.time()
+    logger.info(f"⏳ Export ONNX de {model_id} (avec KV-cache)...")
+    model = ORTModelForCausalLM.from_pretrained(model_id, export=True, **options, **kwargs_export)
+    logger.info(f"✅ Export ONNX terminé en {time.time() - debut:.1f}s")
+
+    try:
+        model.save_pretrained(dossier_export)
+        fichier_meta.write_text(json.dumps({'source': source, 'created_at': time.time()}, indent=2), encoding='utf-8')
+        logger.info(f"💾 Graphe ONNX mis en cache: {dossier_export}")
+    except Exception as e:
+        logger.warning(f"⚠️ Impossible de mettre le graphe ONNX en cache: {e}")
+    return model
@@ -0,0 +1,106 @@
+"""
+Réutilisation du cache KV du préambule système
+Le préambule fixe du prompt est encodé une fois; chaque génération ne calcule que la question
+"""
+
+import logging
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixKVCache:
+    """
+    past_key_values du préambule commun à tous les prompts
+
+    Les prompts d'un lot ont des longueurs différentes: on ne peut pas
+    padder à gauche (le préambule doit rester aux positions 0..P-1 pour
+    correspondre au cache). Le padding est donc placé au milieu:
+
+        [préambule][pad ... pad][question]
+
+    Le masque d'attention ignore les pads et les position_ids dérivés du
+    masque (cumsum) restent continus pour les vrais jetons.
+    """
+
+    def __init__(self, model, tokenizer, prefixe):
+        """
+        Args:
+            model: Modèle causal HuggingFace (supportant past_key_values)
+            tokenizer: Tokenizer associé (pad_token défini)
+            prefixe (str): Préambule commun, idéalement terminé par un saut de ligne
+        """
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefixe = prefixe
+
+        ids = tokenizer(prefixe, return_tensors='pt')['input_ids'].to(model.device)
+        with torch.inference_mode():
+            sortie = model(input_ids=ids, use_cache=True)
+        past = sortie.past_key_values
+        if hasattr(past, 'to_legacy_cache'):
+            past = past.to_legacy_cache()
+
+        self.ids = ids[0]
+        self.past = tuple((k.detach(), v.detach()) for k, v in past)
+        logger.info(f"⚡ Cache KV du préambule: {len(self.ids)} jetons pré-calculés")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def couvre(self, prompt):
+        """Le prompt commence-t-il par le préambule en cache ?"""
+        return prompt.startswith(self.prefixe)
+
+    def entrees(self, prompts):
+        """
+        Arguments de model.generate pour un lot de prompts couverts
+
+        Returns:
+            dict: input_ids, attention_mask, past_key_values (copie étendue au lot)
+        """
+        suffixes = [
+            self.tokenizer(prompt[len(self.prefixe):], add_special_tokens=False)['input_ids']
+            for prompt in prompts
+        ]
+        longueur = max(len(s) for s in suffixes)
+        pad = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else self.tokenizer.eos_token_id
+        p = len(self.ids)
+
+        input_ids = torch.full((len(prompts), p + longueur), pad, dtype=torch.long)
+        attention_mask = torch.zeros_like(input_ids)
+        input_ids[:, :p] = self.ids.cpu()
+        attention_mask[:, :p] = 1
+        for i, suffixe in enumerate(suffixes):
+            if suffixe:
+                input_ids[i, -len(suffixe):] = torch.tensor(suffixe, dtype=torch.long)
+                attention_mask[i, -len(suffixe):] = 1
+
+        # Pads du milieu: le cache couvre le préambule, les pads et la question sont calculés
+        n = len(prompts)
+        past = tuple(
+            (k.expand(n, *k.shape[1:]).contiguous(), v.expand(n, *v.shape[1:]).contiguous())
+            for k, v in self.past
+        )
+        return {
+            'input_ids': input_ids.to(self.model.device),
+            'attention_mask': attention_mask.to(self.model.device),
+            'past_key_values': past,
+        }
+
+    def generer(self, prompts, generation_params, **kwargs):
+        """
+        Générer un lot de prompts couverts par le préambule
+
+        Returns:
+            list: Une sortie par prompt, au format du pipeline
+                  ([{'generated_text': prompt + complétion}])
+        """
+        entrees = self.entrees(prompts)
+        with torch.inference_mode():
+            sequences = self.model.generate(**entrees, **generation_params, **kwargs)
+        completions = self.tokenizer.batch_decode(
+            sequences[:, entrees['input_ids'].shape[1]:], skip_special_tokens=True
+        )
+        return [[{'generated_text': prompt + completion}] for prompt, completion in zip(prompts, completions)]
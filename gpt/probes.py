@@ -0,0 +1,75 @@
+"""
+Sondes réseau mises en cache
+Évite de repayer les timeouts Ollama / huggingface.co à chaque démarrage
+"""
+
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+_verrou = threading.Lock()
+_resultats = {}
+
+
+def sonder(url, timeout=2.0, ttl=600, fichier=None):
+    """
+    Vérifie qu'une URL répond, avec cache mémoire (et disque si `fichier`)
+
+    Args:
+        url (str): URL sondée (GET)
+        timeout (float): Délai maximal de la sonde en secondes
+        ttl (float): Durée de validité d'un résultat en secondes
+        fichier (Path): Fichier JSON partagé entre redémarrages (optionnel)
+
+    Returns:
+        bool: True si l'URL a répondu (quel que soit le code HTTP)
+    """
+    maintenant = time.time()
+    with _verrou:
+        if fichier is not None and not _resultats:
+            _charger(Path(fichier))
+        resultat = _resultats.get(url)
+        if resultat and maintenant - resultat['ts'] < ttl:
+            return resultat['ok']
+
+    try:
+        requests.get(url, timeout=timeout)
+        ok = True
+    except Exception:
+        ok = False
+    logger.info(f"🔎 Sonde {url}: {'OK' if ok else 'injoignable'} (cache {ttl:g}s)")
+
+    with _verrou:
+        _resultats[url] = {'ok': ok, 'ts': maintenant}
+        if fichier is not None:
+            _sauvegarder(Path(fichier))
+    return ok
+
+
+def vider_cache():
+    """Oublie les résultats en mémoire (le fichier éventuel est conservé)"""
+    with _verrou:
+        _resultats.clear()
+
+
+def _charger(fichier):
+    try:
+        if fichier.exists():
+            _resultats.update(json.loads(fichier.read_text(encoding='utf-8')))
+    except Exception as e:
+        logger.warning(f"⚠️ Cache des sondes illisible: {e}")
+
+
+def _sauvegarder(fichier):
+    try:
+        tmp = fichier.with_suffix('.tmp')
+        tmp.write_text(json.dumps(_resultats), encoding='utf-8')
+        tmp.replace(fichier)
+    except Exception as e:
+        logger.warning(f"⚠️ Écriture cache des sondes impossible: {e}")
@@ -0,0 +1,141 @@
+"""
+Quantification dynamique int8 pour l'inférence CPU
+Poids des couches linéaires en int8 (activations quantifiées à la volée), cache disque du modèle quantifié
+"""
+
+import os
+import json
+import time
+import logging
+from pathlib import Path
+
+import torch
+from torch import nn
+
+logger = logging.getLogger(__name__)
+
+try:
+    from transformers.pytorch_utils import Conv1D
+except ImportError:
+    Conv1D = None
+
+FICHIER_MODELE = 'model_int8.pt'
+FICHIER_META = 'quantization.json'
+
+
+def convertir_conv1d(model):
+    """
+    Remplace les Conv1D HuggingFace (GPT-2) par des nn.Linear équivalents
+
+    quantize_dynamic ne cible que nn.Linear: sans cette conversion, les
+    couches d'attention et MLP de GPT-2 resteraient en fp32.
+
+    Returns:
+        int: Nombre de couches converties
+    """
+    if Conv1D is None:
+        return 0
+    convertis = 0
+    for parent in list(model.modules()):
+        for nom, enfant in list(parent.named_children()):
+            if isinstance(enfant, Conv1D):
+                nx, nf = enfant.weight.shape
+                lineaire = nn.Linear(nx, nf, bias=enfant.bias is not None)
+                with torch.no_grad():
+                    lineaire.weight.copy_(enfant.weight.t())
+                    if enfant.bias is not None:
+                        lineaire.bias.copy_(enfant.bias)
+                setattr(parent, nom, lineaire)
+                convertis += 1
+    return convertis
+
+
+def quantifier_int8(model):
+    """
+    Quantification dynamique int8 des couches linéaires (hors tête de sortie)
+
+    La tête lm_head, souvent liée aux embeddings, reste en fp32: c'est elle
+    qui choisit le jeton, et la quantifier coûte le plus en qualité.
+
+    Returns:
+        Modèle quantifié (mode eval)
+    """
+    model = model.float().eval()
+    convertis = convertir_conv1d(model)
+    cibles = {
+        nom for nom, module in model.named_modules()
+        if isinstance(module, nn.Linear) and not nom.endswith('lm_head')
+    }
+    quantifie = torch.ao.quantization.quantize_dynamic(model, cibles, dtype=torch.qint8)
+    logger.info(f"🗜️ Quantification int8: {len(cibles)} couches linéaires ({convertis} Conv1D converties)")
+    return quantifie.eval()
+
+
+def empreinte_source(model_id):
+    """Identifie les poids source + versions (toute différence invalide le cache)"""
+    import transformers
+    source = {'model_id': str(model_id), 'torch': torch.__version__, 'transformers': transformers.__version__}
+    chemin = Path(model_id)
+    if chemin.is_dir():
+        source['fichiers'] = sorted(
+            [f.name, f.stat().st_size, int(f.stat().st_mtime)]
+            for f in chemin.iterdir()
+            if f.suffix in ('.bin', '.safetensors', '.json')
+        )
+    return source
+
+
+def charger_ou_quantifier(model_id, dossier_cache, charger_fp32):
+    """
+    Modèle int8 depuis le cache disque, sinon chargé en fp32, quantifié puis mis en cache
+
+    Args:
+        model_id (str): Chemin local ou identifiant HF des poids fp32
+        dossier_cache (Path): Dossier du modèle quantifié (ex: models/phi-2-int8)
+        charger_fp32 (callable): Charge le modèle fp32 (appelé seulement si le cache est invalide)
+
+    Returns:
+        Modèle quantifié
+    """
+    dossier_cache = Path(dossier_cache)
+    fichier_modele = dossier_cache / FICHIER_MODELE
+    fichier_meta = dossier_cache / FICHIER_META
+    source = empreinte_source(model_id)
+
+    if fichier_modele.exists() and fichier_meta.exists():
+        try:
+            meta = json.loads(fichier_meta.read_text(encoding='utf-8'))
+            if meta.get('source') == source:
+                debut = time.time()
+                # Module complet picklé par ce service (pas de fichier tiers)
+                model = torch.load(fichier_modele, map_location='cpu', weights_only=False)
+                logger.info(f"✅ Modèle int8 chargé depuis le cache en {time.time() - debut:.1f}s: {dossier_cache}")
+                return model.eval()
+            logger.info("ℹ Cache int8 obsolète (poids ou versions modifiés), re-quantification")
+        except Exception as e:
+            logger.warning(f"⚠️ Cache int8 illisible ({e}), re-quantification")
+
+    model = quantifier_int8(charger_fp32())
+    try:
+        dossier_cache.mkdir(parents=True, exist_ok=True)
+        tmp = fichier_modele.with_suffix('.tmp')
+        torch.save(model, tmp)
+        os.replace(tmp, fichier_modele)
+        fichier_meta.write_text(json.dumps({'source': source, 'created_at': time.time()}, indent=2), encoding='utf-8')
+        logger.info(f"💾 Modèle int8 mis en cache: {fichier_modele}")
+    except Exception as e:
+        logger.warning(f"⚠️ Impossible de mettre le modèle int8 en cache: {e}")
+    return model
+
+
+def taille_poids(model):
+    """Octets des poids (paramètres fp32 + poids int8 packés)"""
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    for module in model.modules():
+        packed = getattr(module, '_packed_params', None)
+        if packed is not None:
+            poids, biais = packed._weight_bias()
+            total += poids.numel() * poids.element_size()
+            if biais is not None:
+                total += biais.numel() * biais.element_size()
+    return total
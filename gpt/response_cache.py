@@ -0,0 +1,189 @@
+"""
+Cache des réponses LLM
+LRU en mémoire + persistance disque (gpt/cache), coalescence des requêtes identiques
+"""
+
+import json
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def normaliser_message(message):
+    """Minuscules, espaces compactés, ponctuation finale retirée"""
+    texte = unicodedata.normalize('NFC', message or '').lower()
+    return ' '.join(texte.split()).rstrip(' ?!.')
+
+
+class ResponseCache:
+    """
+    Cache des réponses générées
+
+    La clé combine message normalisé, intention, modèle et paramètres de
+    génération. L'empreinte courante (modèle + révision de la base de
+    connaissances) est stockée avec chaque entrée: la changer invalide tout
+    le cache. Les entrées sont ajoutées à un journal JSONL, compacté quand il
+    dépasse plusieurs fois la capacité.
+    """
+
+    def __init__(self, dossier, capacite=512, ttl=7 * 24 * 3600, empreinte=''):
+        """
+        Args:
+            dossier (Path): Dossier de persistance (IAConfig.CACHE_PATH)
+            capacite (int): Entrées conservées (LRU)
+            ttl (float): Durée de vie d'une entrée en secondes (0 = illimitée)
+            empreinte (str): Empreinte modèle/KB des entrées valides
+        """
+        self.fichier = Path(dossier) / 'responses.jsonl'
+        self.fichier.parent.mkdir(parents=True, exist_ok=True)
+        self.capacite = max(1, int(capacite))
+        self.ttl = ttl
+        self.empreinte = empreinte
+
+        self._verrou = threading.Lock()
+        self._entrees = OrderedDict()
+        self._en_cours = {}
+        self._lignes_journal = 0
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+        self._charger()
+
+    @staticmethod
+    def cle(message, intent, model, params):
+        """Clé de cache d'une requête"""
+        brut = json.dumps(
+            [normaliser_message(message), intent, model, sorted((params or {}).items())],
+            ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(brut.encode('utf-8')).hexdigest()
+
+    def _expiree(self, entree):
+        return bool(self.ttl) and time.time() - entree['ts'] > self.ttl
+
+    def _charger(self):
+        if not self.fichier.exists():
+            return
+        try:
+            with open(self.fichier, 'r', encoding='utf-8') as f:
+                for ligne in f:
+                    self._lignes_journal += 1
+                    try:
+                        entree = json.loads(ligne)
+                    except ValueError:
+                        continue
+                    if entree.get('empreinte') != self.empreinte or self._expiree(entree):
+                        continue
+                    self._entrees[entree['cle']] = entree
+                    self._entrees.move_to_end(entree['cle'])
+                    if len(self._entrees) > self.capacite:
+                        self._entrees.popitem(last=False)
+            logger.info(f"✅ Cache réponses chargé: {len(self._entrees)} entrées")
+        except Exception as e:
+            logger.warning(f"⚠️ Cache réponses illisible: {e}")
+
+    def _compacter(self):
+        """Réécrit le journal avec les seules entrées valides (sous verrou)"""
+        tmp = self.fichier.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for entree in self._entrees.values():
+                f.write(json.dumps(entree, ensure_ascii=False) + '\n')
+        tmp.replace(self.fichier)
+        self._lignes_journal = len(self._entrees)
+
+    def obtenir(self, cle):
+        """Réponse en cache ou None"""
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None or self._expiree(entree):
+                return None
+            self._entrees.move_to_end(cle)
+            return entree['reponse']
+
+    def stocker(self, cle, reponse):
+        """Ajoute une réponse (mémoire + journal disque)"""
+        entree = {'cle': cle, 'reponse': reponse, 'empreinte': self.empreinte, 'ts': time.time()}
+        with self._verrou:
+            self._entrees[cle] = entree
+            self._entrees.move_to_end(cle)
+            if len(self._entrees) > self.capacite:
+                self._entrees.popitem(last=False)
+            try:
+                if self._lignes_journal >= 4 * self.capacite:
+                    self._compacter()
+                else:
+                    with open(self.fichier, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(entree, ensure_ascii=False) + '\n')
+                    self._lignes_journal += 1
+            except Exception as e:
+                logger.warning(f"⚠️ Écriture cache réponses impossible: {e}")
+
+    def obtenir_ou_calculer(self, cle, calculer):
+        """
+        Réponse en cache, sinon calculée une seule fois même si plusieurs
+        requêtes identiques arrivent en même temps
+
+        Args:
+            cle (str): Clé de cache
+            calculer (callable): Génère la réponse (None = ne pas mettre en cache)
+
+        Returns:
+            Réponse
+        """
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None and not self._expiree(entree):
+                self._entrees.move_to_end(cle)
+                self.stats['hits'] += 1
+                return entree['reponse']
+
+            futur = self._en_cours.get(cle)
+            proprietaire = futur is None
+            if proprietaire:
+                futur = self._en_cours[cle] = Future()
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not proprietaire:
+            return futur.result()
+
+        try:
+            reponse = calculer()
+        except Exception as e:
+            futur.set_exception(e)
+            raise
+        finally:
+            with self._verrou:
+                self._en_cours.pop(cle, None)
+
+        if reponse is not None:
+            self.stocker(cle, reponse)
+        futur.set_result(reponse)
+        return reponse
+
+    def invalider(self, empreinte=None):
+        """
+        Vide le cache (changement de modèle ou de base de connaissances)
+
+        Args:
+            empreinte (str): Nouvelle empreinte des entrées valides
+        """
+        with self._verrou:
+            if empreinte is not None:
+                self.empreinte = empreinte
+            self._entrees.clear()
+            try:
+                self._compacter()
+            except Exception as e:
+                logger.warning(f"⚠️ Purge cache réponses impossible: {e}")
+        logger.info("🧹 Cache réponses invalidé")
+
+    def __len__(self):
+        return len(self._entrees)
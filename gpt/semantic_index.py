@@ -0,0 +1,260 @@
+"""
+Index vectoriel de la base de connaissances (recherche sémantique)
+Embeddings float16 en mémoire mappée, top-k cosinus vectorisé, quantifieur grossier optionnel
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # Optionnel: recherche sémantique désactivée sinon
+    SentenceTransformer = None
+
+logger = logging.getLogger(__name__)
+
+MODELE_DEFAUT = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+
+
+def encodeur_sentence_transformers(modele=MODELE_DEFAUT):
+    """
+    Encodeur local basé sur sentence-transformers
+
+    Returns:
+        callable(textes) -> ndarray (n, d), ou None si le module est absent
+    """
+    if SentenceTransformer is None:
+        return None
+    model = SentenceTransformer(modele, device='cpu')
+    return lambda textes: model.encode(list(textes), normalize_embeddings=True, convert_to_numpy=True)
+
+
+class IndexSemantique:
+    """
+    Matrice d'embeddings normalisés (float16, np.memmap) + clés en ordre de ligne
+
+    Chaque insertion encode un seul texte et écrit une ligne: aucun recalcul
+    global. La recherche est un produit matrice-vecteur suivi d'un
+    argpartition. Au-delà de `seuil_quantifieur` entrées, un k-means grossier
+    (IVF) limite le calcul aux `nprobe` cellules les plus proches.
+
+    Fichiers: <dossier>/embeddings.f16 (matrice), embeddings.keys (une clé
+    par ligne, ajout seul), embeddings.json (modèle, dimension).
+    """
+
+    def __init__(self, dossier, encodeur, modele=MODELE_DEFAUT,
+                 seuil_quantifieur=20000, nprobe=8):
+        """
+        Args:
+            dossier (Path): Dossier de l'index
+            encodeur (callable): textes -> ndarray (n, d)
+            modele (str): Nom du modèle (un changement reconstruit l'index)
+            seuil_quantifieur (int): Entrées avant activation du quantifieur
+            nprobe (int): Cellules explorées par requête avec quantifieur
+        """
+        self.dossier = Path(dossier)
+        self.dossier.mkdir(parents=True, exist_ok=True)
+        self.encodeur = encodeur
+        self.modele = modele
+        self.seuil_quantifieur = seuil_quantifieur
+        self.nprobe = nprobe
+
+        self._fichier_matrice = self.dossier / 'embeddings.f16'
+        self._fichier_cles = self.dossier / 'embeddings.keys'
+        self._fichier_meta = self.dossier / 'embeddings.json'
+
+        self._verrou = threading.Lock()
+        self._cles = []
+        self._lignes = {}
+        self._matrice = None
+        self.dimension = None
+
+        self._centroides = None
+        self._cellules = None
+
+        self._ouvrir()
+
+    def __len__(self):
+        return len(self._cles)
+
+    def __contains__(self, cle):
+        return cle in self._lignes
+
+    # ------------------------------------------------------------------
+    # Stockage
+    # ------------------------------------------------------------------
+
+    def _ouvrir(self):
+        meta = {}
+        if self._fichier_meta.exists():
+            meta = json.loads(self._fichier_meta.read_text(encoding='utf-8'))
+        if meta.get('modele') != self.modele:
+            # Autre modèle: les anciens vecteurs ne sont pas comparables
+            for fichier in (self._fichier_matrice, self._fichier_cles):
+                if fichier.exists():
+                    fichier.unlink()
+            return
+
+        self.dimension = meta['dimension']
+        if self._fichier_cles.exists():
+            self._cles = self._fichier_cles.read_text(encoding='utf-8').splitlines()
+        capacite = self._fichier_matrice.stat().st_size // (2 * self.dimension) if self._fichier_matrice.exists() else 0
+        self._cles = self._cles[:capacite]
+        self._lignes = {cle: i for i, cle in enumerate(self._cles)}
+        if capacite:
+            self._matrice = np.memmap(self._fichier_matrice, dtype=np.float16, mode='r+',
+                                      shape=(capacite, self.dimension))
+        logger.info(f"✅ Index sémantique chargé: {len(self._cles)} entrées")
+
+        # Quantifieur non persisté: réentraîné au rechargement d'un grand index
+        if len(self._cles) >= self.seuil_quantifieur:
+            self._entrainer_quantifieur()
+
+    def _capacite(self):
+        return 0 if self._matrice is None else self._matrice.shape[0]
+
+    def _agrandir(self, minimum):
+        """Double la capacité du fichier mappé (zéros ajoutés en fin de fichier)"""
+        capacite = max(minimum, 2 * self._capacite(), 256)
+        if self._matrice is not None:
+            self._matrice.flush()
+            self._matrice = None
+        with open(self._fichier_matrice, 'ab') as f:
+            f.truncate(capacite * self.dimension * 2)
+        self._matrice = np.memmap(self._fichier_matrice, dtype=np.float16, mode='r+',
+                                  shape=(capacite, self.dimension))
+
+    @staticmethod
+    def _normaliser(vecteurs):
+        vecteurs = np.asarray(vecteurs, dtype=np.float32)
+        normes = np.linalg.norm(vecteurs, axis=-1, keepdims=True)
+        return vecteurs / np.maximum(normes, 1e-12)
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def ajouter(self, cle, texte):
+        """Encode et indexe (ou remplace) une entrée"""
+        self.ajouter_lot([(cle, texte)])
+
+    def ajouter_lot(self, entrees):
+        """
+        Encode et indexe plusieurs entrées en un appel à l'encodeur
+
+        Args:
+            entrees (list): [(cle, texte)]
+        """
+        entrees = list(entrees)
+        if not entrees:
+            return
+        vecteurs = self._normaliser(self.encodeur([texte for _, texte in entrees])).astype(np.float16)
+
+        with self._verrou:
+            if self.dimension is None:
+                self.dimension = int(vecteurs.shape[1])
+                self._fichier_meta.write_text(
+                    json.dumps({'modele': self.modele, 'dimension': self.dimension}), encoding='utf-8'
+                )
+
+            nouvelles = [cle for cle, _ in entrees if cle not in self._lignes]
+            if len(self._cles) + len(nouvelles) > self._capacite():
+                self._agrandir(len(self._cles) + len(nouvelles))
+
+            ajoutees = []
+            for (cle, _), vecteur in zip(entrees, vecteurs):
+                ligne = self._lignes.get(cle)
+                if ligne is None:
+                    ligne = self._lignes[cle] = len(self._cles)
+                    self._cles.append(cle)
+                    ajoutees.append(cle)
+                self._matrice[ligne] = vecteur
+                if self._cellules is not None:
+                    self._affecter(ligne)
+            self._matrice.flush()
+
+            # Clé écrite après le vecteur: une ligne sans clé est ignorée au rechargement
+            if ajoutees:
+                with open(self._fichier_cles, 'a', encoding='utf-8') as f:
+                    f.write(''.join(cle.replace('\n', ' ') + '\n' for cle in ajoutees))
+
+            if self._centroides is None and len(self._cles) >= self.seuil_quantifieur:
+                self._entrainer_quantifieur()
+
+    # ------------------------------------------------------------------
+    # Quantifieur grossier (IVF)
+    # ------------------------------------------------------------------
+
+    def _entrainer_quantifieur(self, iterations=10, graine=0):
+        n = len(self._cles)
+        nb_cellules = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(graine)
+        echantillon = np.asarray(self._matrice[rng.choice(n, size=min(n, 50 * nb_cellules), replace=False)],
+                                 dtype=np.float32)
+        centroides = echantillon[rng.choice(len(echantillon), size=nb_cellules, replace=False)]
+        for _ in range(iterations):
+            affectation = (echantillon @ centroides.T).argmax(axis=1)
+            for c in range(nb_cellules):
+                membres = echantillon[affectation == c]
+                if len(membres):
+                    centroides[c] = membres.mean(axis=0)
+            centroides = self._normaliser(centroides)
+
+        self._centroides = centroides
+        self._cellules = np.empty(0, dtype=np.int32)
+        for debut in range(0, n, 8192):
+            bloc = np.asarray(self._matrice[debut:min(n, debut + 8192)], dtype=np.float32)
+            self._cellules = np.concatenate([self._cellules, (bloc @ centroides.T).argmax(axis=1).astype(np.int32)])
+        logger.info(f"🧭 Quantifieur sémantique: {nb_cellules} cellules pour {n} entrées")
+
+    def _affecter(self, ligne):
+        cellule = int((self._centroides @ np.asarray(self._matrice[ligne], dtype=np.float32)).argmax())
+        if ligne < len(self._cellules):
+            self._cellules[ligne] = cellule
+        else:
+            self._cellules = np.append(self._cellules, np.int32(cellule))
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def rechercher(self, requete, k=3, score_min=0.0):
+        """
+        Entrées les plus proches (cosinus) d'une requête
+
+        Args:
+            requete (str): Texte de la requête
+            k (int): Nombre de résultats
+            score_min (float): Similarité minimale
+
+        Returns:
+            list: [(cle, similarité)] par similarité décroissante
+        """
+        with self._verrou:
+            n = len(self._cles)
+        if not n:
+            return []
+        q = self._normaliser(self.encodeur([requete]))[0]
+
+        with self._verrou:
+            if self._centroides is not None:
+                cellules = np.argsort(-(self._centroides @ q))[:self.nprobe]
+                candidats = np.flatnonzero(np.isin(self._cellules[:n], cellules))
+                scores = np.asarray(self._matrice[candidats], dtype=np.float32) @ q
+            else:
+                candidats = np.arange(n)
+                scores = np.asarray(self._matrice[:n], dtype=np.float32) @ q
+
+            k = min(k, len(scores))
+            if not k:
+                return []
+            meilleurs = np.argpartition(-scores, k - 1)[:k]
+            meilleurs = meilleurs[np.argsort(-scores[meilleurs])]
+            return [
+                (self._cles[candidats[i]], float(scores[i]))
+                for i in meilleurs if scores[i] >= score_min
+            ]
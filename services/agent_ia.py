@@ -124,13 +124,15 @@ class AgentIAService:
             'error': error_type
         }
     
-    def retrain(self, dataset_path: str = None, compteur: int = 0) -> Dict:
+    def retrain(self, dataset_path: str = None, compteur: int = 0,
+                dataset_content: Optional[str] = None) -> Dict:
         """
         Lance un réentraînement des modèles
         
         Args:
-            dataset_path: Chemin du dataset
+            dataset_path: Chemin du dataset (si l'agent lit le fichier lui-même)
             compteur: Nombre total de diagnostics
+            dataset_content: Jeu d'entraînement CSV (échantillon équilibré borné)
             
         Returns:
             Résultat du réentraînement
@@ -138,12 +140,17 @@ class AgentIAService:
         try:
             logger.info(f"Lancement réentraînement (compteur: {compteur})")
             
+            payload = {
+                'dataset_path': dataset_path or './dataset_apprentissage.csv',
+                'compteur': compteur
+            }
+            if dataset_content is not None:
+                payload['dataset_content'] = dataset_content
+                payload['sample_count'] = max(dataset_content.count('\n') - 1, 0)
+            
             response = requests.post(
                 f"{self.agent_url}/retrain",
-                json={
-                    'dataset_path': dataset_path or './dataset_apprentissage.csv',
-                    'compteur': compteur
-                },
+                json=payload,
                 timeout=120
             )
             response.raise_for_status()
@@ -2,14 +2,24 @@
 Service d'Apprentissage Continu - Gestion du machine learning adaptatif
 """
 
+import copy
 import json
 import logging
-import pandas as pd
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
 from collections import Counter
 
+from services.archive_diagnostics import ArchiveDiagnostics
+from services.dataset_segments import DatasetSegmente, convertir_ligne
+from services.decouverte_pannes import DecouvertePannes
+from services.echantillonnage import ReservoirParClasse
+from services.statistiques_service import AgregateurStatistiques, DUREE_MAX
+from services.surveillance_derive import MoniteurDerive
+from utils.persistance import SnapshotDiffere
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,18 +29,58 @@ class ApprentissageService:
     def __init__(self, 
                  compteur_file: str = './data/compteur_apprentissage.json',
                  dataset_file: str = './data/dataset_apprentissage.csv',
+                 dataset_dir: str = './data/dataset',
+                 dataset_lignes_par_segment: int = 10000,
+                 dataset_max_segments: int = 0,
                  dernier_diagnostic_file: str = './data/dernier_diagnostic.json',
+                 archive_file: str = './data/archive_diagnostics.bin',
+                 statistiques_file: str = './data/statistiques_apprentissage.json',
+                 decouverte_file: str = './data/decouverte_pannes.json',
+                 derive_file: str = './data/derive_reference.json',
+                 reservoir_file: str = './data/reservoir_entrainement.json',
+                 archive_capacite: int = 1000,
                  seuil_retraining: int = 1000,
-                 seuil_nouvelle_panne: int = 50):
+                 seuil_nouvelle_panne: int = 50,
+                 decouverte_rayon: float = 0.1,
+                 decouverte_seuil_confiance: float = 60.0,
+                 derive_seuil_psi: float = 0.2,
+                 derive_intervalle: int = 100,
+                 derive_cooldown: float = 6 * 3600,
+                 derive_fenetre: int = 1000,
+                 reservoir_quota_normal: int = 5000,
+                 reservoir_quota_panne: int = 1000,
+                 reservoir_quotas: Optional[Dict[str, int]] = None,
+                 flush_every: int = 50,
+                 flush_interval: float = 10.0):
         """
         Initialise le service d'apprentissage
         
         Args:
             compteur_file: Chemin du fichier compteur d'apprentissage
-            dataset_file: Chemin du dataset d'apprentissage
+            dataset_file: Ancien dataset CSV monolithique (importé dans les segments)
+            dataset_dir: Dossier du dataset segmenté et compressé
+            dataset_lignes_par_segment: Lignes avant compression d'un segment
+            dataset_max_segments: Segments compressés conservés (0 = illimité)
             dernier_diagnostic_file: Chemin du dernier diagnostic
-            seuil_retraining: Nombre de diagnostics avant réentraînement
-            seuil_nouvelle_panne: Nombre d'occurrences avant considérer comme "nouvelle panne"
+            archive_file: Chemin de l'archive circulaire des derniers diagnostics
+            archive_capacite: Nombre de diagnostics conservés dans l'archive
+            statistiques_file: Snapshot des agrégats minute/heure/jour (repris depuis le dataset)
+            decouverte_file: Snapshot des clusters de relevés inconnus
+            derive_file: Snapshot de la référence et de la fenêtre de dérive
+            reservoir_file: Snapshot du jeu d'entraînement échantillonné
+            seuil_retraining: Ancien seuil fixe de réentraînement (remplacé par la détection de dérive)
+            seuil_nouvelle_panne: Taille d'un cluster de relevés inconnus avant de le considérer comme "nouvelle panne"
+            decouverte_rayon: Rayon (distance normalisée) d'un cluster de relevés inconnus
+            decouverte_seuil_confiance: Score (%) en dessous duquel une prédiction est candidate au clustering
+            derive_seuil_psi: PSI d'un capteur ou du mélange de labels déclenchant le réentraînement
+            derive_intervalle: Diagnostics entre deux vérifications de dérive
+            derive_cooldown: Délai minimal (secondes) entre deux réentraînements
+            derive_fenetre: Taille de la fenêtre glissante comparée au jeu d'entraînement
+            reservoir_quota_normal: Lignes sans panne conservées pour l'entraînement
+            reservoir_quota_panne: Lignes conservées par type de panne pour l'entraînement
+            reservoir_quotas: Quotas spécifiques par classe
+            flush_every: Nombre de diagnostics avant réécriture du compteur sur disque
+            flush_interval: Délai max (secondes) avant réécriture du compteur sur disque
         """
         self.compteur_file = compteur_file
         self.dataset_file = dataset_file
@@ -41,7 +91,25 @@ class ApprentissageService:
         # Créer les répertoires s'ils n'existent pas
         Path(self.compteur_file).parent.mkdir(parents=True, exist_ok=True)
         
+        # Compteur persisté en write-behind (journal + snapshot atomique)
+        self._verrou = threading.RLock()
+        # Ordre des lignes du journal; jamais pris par le flush du snapshot
+        # (qui prend son propre verrou puis self._verrou via _etat_compteur)
+        self._verrou_journal = threading.Lock()
+        self._persistance = SnapshotDiffere(
+            self.compteur_file,
+            self._etat_compteur,
+            flush_every=flush_every,
+            flush_interval=flush_interval
+        )
         self.compteur = self._charger_compteur()
+        self.archive = ArchiveDiagnostics(archive_file, capacite=archive_capacite)
+        self.dataset = DatasetSegmente(
+            dataset_dir,
+            lignes_par_segment=dataset_lignes_par_segment,
+            max_segments=dataset_max_segments,
+            fichier_legacy=dataset_file
+        )
         
         # Assurer que les clés nécessaires existent
         if 'pannes_par_type' not in self.compteur:
@@ -51,6 +119,85 @@ class ApprentissageService:
         if 'total' not in self.compteur:
             self.compteur['total'] = 0
             
+        # Agrégats glissants pour /stats, dérivés du dataset (snapshot périodique sans journal)
+        self.statistiques = AgregateurStatistiques()
+        self._persistance_stats = SnapshotDiffere(
+            statistiques_file,
+            self.statistiques.exporter,
+            flush_every=flush_every,
+            flush_interval=flush_interval,
+            journal=False
+        )
+        etat_stats = self._persistance_stats.charger()
+        if etat_stats and 'position' in etat_stats:
+            self.statistiques.importer(etat_stats)
+        self._rattraper_statistiques()
+        
+        # Clustering en ligne des relevés inconnus / peu fiables
+        self.decouverte = DecouvertePannes(
+            taille_min=seuil_nouvelle_panne,
+            rayon=decouverte_rayon,
+            seuil_confiance=decouverte_seuil_confiance
+        )
+        self._persistance_decouverte = SnapshotDiffere(
+            decouverte_file,
+            self.decouverte.exporter,
+            flush_every=flush_every,
+            flush_interval=flush_interval,
+            journal=False
+        )
+        etat_decouverte = self._persistance_decouverte.charger()
+        if etat_decouverte:
+            self.decouverte.importer(etat_decouverte)
+        
+        # Dérive des capteurs / prédictions par rapport au jeu d'entraînement
+        self.derive = MoniteurDerive(
+            taille_fenetre=derive_fenetre,
+            intervalle=derive_intervalle,
+            seuil_psi=derive_seuil_psi,
+            seuil_psi_labels=derive_seuil_psi,
+            cooldown=derive_cooldown,
+            source_reference=self._releves_entrainement
+        )
+        self._persistance_derive = SnapshotDiffere(
+            derive_file,
+            self.derive.exporter,
+            flush_every=max(flush_every, derive_intervalle),
+            flush_interval=flush_interval,
+            journal=False
+        )
+        etat_derive = self._persistance_derive.charger()
+        if etat_derive:
+            self.derive.importer(etat_derive)
+        
+        # Jeu d'entraînement borné: un réservoir par classe
+        self.reservoir = ReservoirParClasse(
+            quota_normal=reservoir_quota_normal,
+            quota_panne=reservoir_quota_panne,
+            quotas=reservoir_quotas
+        )
+        self._persistance_reservoir = SnapshotDiffere(
+            reservoir_file,
+            self.reservoir.exporter,
+            flush_every=max(flush_every, 500),
+            flush_interval=max(flush_interval, 60.0),
+            journal=False
+        )
+        etat_reservoir = self._persistance_reservoir.charger()
+        if etat_reservoir:
+            self.reservoir.importer(etat_reservoir)
+        elif self.dataset.nombre_lignes:
+            # Premier démarrage: échantillonner l'historique existant (une seule passe)
+            for ligne in self.dataset.lire():
+                self.reservoir.ajouter(convertir_ligne(ligne))
+            self._persistance_reservoir.enregistrer()
+            logger.info(f"🎯 Jeu d'entraînement initialisé depuis le dataset: {len(self.reservoir)} lignes")
+        
+        self._persistance.demarrer()
+        self._persistance_stats.demarrer()
+        self._persistance_decouverte.demarrer()
+        self._persistance_derive.demarrer()
+        self._persistance_reservoir.demarrer()
         logger.info(f"Service apprentissage initialisé - Compteur: {self.compteur['total']}")
     
     def traiter_diagnostic(self, diagnostic_data: Dict) -> Dict:
@@ -69,54 +216,64 @@ class ApprentissageService:
             # 1. Extraire les infos de la prédiction
             panne_detectee = diagnostic_data.get('panne_detectee', False)
             type_panne = diagnostic_data.get('prediction_ia', {}).get('panne_detectee')
-            score_confiance = diagnostic_data.get('prediction_ia', {}).get('score', 0)
-            
-            # 2. Incrémenter compteur
-            self.compteur['total'] += 1
-            self.compteur['last_update'] = datetime.now().isoformat()
             
-            apprentissage_result = {
-                'compteur_total': self.compteur['total'],
-                'panne_detectee': panne_detectee,
-                'type_panne': type_panne,
-                'retraining_requis': False,
-                'nouvelle_panne_detectee': False,
-                'nouvelles_pannes_a_entrainer': []
-            }
+            # 2. Dérive de la fenêtre glissante par rapport à la référence
+            rapport_derive = self.derive.observer(
+                diagnostic_data.get('donnees_capteurs', {}) or {},
+                type_panne if panne_detectee else None
+            )
+            self._persistance_derive.enregistrer()
             
-            # 3. Si panne détectée, mettre à jour stats
-            if panne_detectee and type_panne:
-                if type_panne not in self.compteur['pannes_par_type']:
-                    self.compteur['pannes_par_type'][type_panne] = 0
+            with self._verrou:
+                # 3. Incrémenter compteur
+                self.compteur['total'] += 1
+                self.compteur['last_update'] = datetime.now().isoformat()
+                modifications = ['total', 'last_update']
+                
+                apprentissage_result = {
+                    'compteur_total': self.compteur['total'],
+                    'panne_detectee': panne_detectee,
+                    'type_panne': type_panne,
+                    'retraining_requis': False,
+                    'nouvelle_panne_detectee': False,
+                    'nouvelles_pannes_a_entrainer': []
+                }
                 
-                self.compteur['pannes_par_type'][type_panne] += 1
+                # 4. Si panne détectée, mettre à jour stats
+                if panne_detectee and type_panne:
+                    if type_panne not in self.compteur['pannes_par_type']:
+                        self.compteur['pannes_par_type'][type_panne] = 0
+                    
+                    self.compteur['pannes_par_type'][type_panne] += 1
+                    modifications.append('pannes_par_type')
                 
-                # Vérifier si c'est une nouvelle panne
-                if self.compteur['pannes_par_type'][type_panne] == self.seuil_nouvelle_panne:
-                    logger.info(f"🆕 Nouvelle panne identifiée: {type_panne}")
-                    apprentissage_result['nouvelle_panne_detectee'] = True
-                    apprentissage_result['nouvelles_pannes_a_entrainer'].append({
-                        'type': type_panne,
-                        'confiance': score_confiance,
-                        'capteurs_affectes': list(diagnostic_data.get('donnees_capteurs', {}).keys())
+                # 5. Réentraînement uniquement sur dérive réelle (hors cooldown)
+                if rapport_derive and rapport_derive['derive']:
+                    logger.info(f"📊 Dérive détectée - réentraînement requis ({self.compteur['total']} diagnostics)")
+                    apprentissage_result['retraining_requis'] = True
+                    apprentissage_result['derive'] = rapport_derive['raisons']
+                    apprentissage_result['panne_plus_frequente'] = self._get_panne_plus_frequente()
+                    
+                    # Réinitialiser compteur après retraining
+                    self.compteur['derniers_retraining'].append({
+                        'timestamp': datetime.now().isoformat(),
+                        'diagnostics_traites': self.compteur['total'],
+                        'derive': rapport_derive['raisons']
                     })
+                    modifications.append('derniers_retraining')
             
-            # 4. Vérifier si réentraînement requis
-            if self.compteur['total'] % self.seuil_retraining == 0:
-                logger.info(f"📊 Seuil réentraînement atteint: {self.compteur['total']}/{self.seuil_retraining}")
-                apprentissage_result['retraining_requis'] = True
-                apprentissage_result['panne_plus_frequente'] = self._get_panne_plus_frequente()
-                
-                # Réinitialiser compteur après retraining
-                self.compteur['derniers_retraining'].append({
-                    'timestamp': datetime.now().isoformat(),
-                    'diagnostics_traites': self.compteur['total']
-                })
+            # 6. Journaliser les mises à jour (snapshot écrit en différé), hors
+            # de self._verrou comme les autres persistances
+            self._sauvegarder_compteur(modifications)
             
-            # 5. Sauvegarder les mises à jour
-            self._sauvegarder_compteur()
+            # 7. Relevés inconnus / peu fiables: clustering pour découvrir de nouvelles pannes
+            nouvelles_pannes = self.decouverte.observer(diagnostic_data)
+            if nouvelles_pannes:
+                apprentissage_result['nouvelle_panne_detectee'] = True
+                apprentissage_result['nouvelles_pannes_a_entrainer'] = nouvelles_pannes
+            self._persistance_decouverte.enregistrer()
             
-            # 6. Ajouter au dataset
+            # 8. Ajouter au dataset (et aux agrégats glissants, O(1) par diagnostic)
             self._ajouter_au_dataset(diagnostic_data, apprentissage_result)
             
             logger.info(f"Apprentissage traité - Total: {self.compteur['total']}")
@@ -143,6 +300,9 @@ class ApprentissageService:
             True si succès
         """
         try:
+            # Archive circulaire (consultable par ID / par équipement)
+            self.archive.ajouter(diagnostic_data)
+            
             # Sauvegarder le dernier diagnostic
             with open(self.dernier_diagnostic_file, 'w', encoding='utf-8') as f:
                 json.dump(diagnostic_data, f, indent=2, ensure_ascii=False, default=str)
@@ -154,33 +314,59 @@ class ApprentissageService:
             logger.error(f"Erreur archivage diagnostic: {e}")
             return False
     
-    def get_statistiques(self) -> Dict:
+    def obtenir_diagnostic(self, diagnostic_id: str) -> Optional[Dict]:
         """
-        Retourne les statistiques d'apprentissage (version synchrone)
+        Retourne un diagnostic archivé par son ID
         
+        Args:
+            diagnostic_id: ID du diagnostic
+            
         Returns:
-            Dict avec stats
+            Diagnostic complet ou None s'il n'est plus dans l'archive
         """
-        try:
-            panne_plus_frequente = max(self.compteur['pannes_par_type'].items(), 
-                                     key=lambda x: x[1])[0] if self.compteur['pannes_par_type'] else 'Aucune'
+        return self.archive.obtenir(diagnostic_id)
+    
+    def derniers_diagnostics(self, source: Optional[str] = None, limite: int = 10) -> List[Dict]:
+        """
+        Retourne les derniers diagnostics archivés (plus récent d'abord)
+        
+        Args:
+            source: Équipement/capteur à filtrer (défaut: tous)
+            limite: Nombre max de diagnostics
             
-            return {
-                'compteur_total': self.compteur['total'],
-                'pannes_par_type': self.compteur['pannes_par_type'],
-                'panne_plus_frequente': panne_plus_frequente,
-                'dernier_retraining': self.compteur['derniers_retraining'][-1] if self.compteur['derniers_retraining'] else None
-            }
-        except Exception as e:
-            logger.error(f"Erreur récupération stats: {e}")
-            return {}
+        Returns:
+            Liste de diagnostics complets
+        """
+        return self.archive.derniers(source, limite)
+    
+    def lire_dataset(self, debut: Optional[str] = None, fin: Optional[str] = None):
+        """
+        Itère sur les lignes du dataset dans une plage de timestamps
+        
+        Args:
+            debut: Timestamp ISO minimal (inclus)
+            fin: Timestamp ISO maximal (inclus)
+            
+        Returns:
+            Itérateur de lignes (dict colonne -> valeur texte)
+        """
+        return self.dataset.lire(debut, fin)
+    
+    def jeu_entrainement(self) -> str:
+        """
+        Jeu d'entraînement borné et équilibré par classe (réservoirs)
+        
+        Returns:
+            Contenu CSV envoyé à l'agent IA pour le réentraînement
+        """
+        return self.reservoir.contenu_csv(self.dataset.colonnes)
     
     def _charger_compteur(self) -> Dict:
-        """Charge ou crée le compteur d'apprentissage"""
+        """Charge (snapshot + journal) ou crée le compteur d'apprentissage"""
         try:
-            if Path(self.compteur_file).exists():
-                with open(self.compteur_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            compteur = self._persistance.charger()
+            if compteur is not None:
+                return compteur
         except Exception as e:
             logger.warning(f"⚠️ Erreur chargement compteur: {e}")
         
@@ -193,16 +379,58 @@ class ApprentissageService:
             'last_update': datetime.now().isoformat()
         }
     
-    def _sauvegarder_compteur(self) -> bool:
-        """Sauvegarde le compteur d'apprentissage"""
+    def _etat_compteur(self) -> Dict:
+        """Copie cohérente du compteur pour le snapshot"""
+        with self._verrou:
+            return copy.deepcopy(self.compteur)
+    
+    def _sauvegarder_compteur(self, cles: Optional[List[str]] = None) -> bool:
+        """
+        Journalise le compteur d'apprentissage (écriture du snapshot différée)
+        
+        Args:
+            cles: Clés modifiées à journaliser (défaut: tout le compteur)
+        """
         try:
-            with open(self.compteur_file, 'w', encoding='utf-8') as f:
-                json.dump(self.compteur, f, indent=2, ensure_ascii=False, default=str)
+            # Copie et écriture sous le même verrou: les valeurs absolues
+            # arrivent au journal dans l'ordre où elles ont été lues
+            with self._verrou_journal:
+                with self._verrou:
+                    cles = cles or list(self.compteur.keys())
+                    modifications = {cle: copy.deepcopy(self.compteur[cle]) for cle in cles}
+                self._persistance.enregistrer(modifications)
             return True
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde compteur: {e}")
             return False
     
+    def flush(self) -> bool:
+        """Force l'écriture du snapshot du compteur sur disque"""
+        return self._persistance.flush()
+    
+    def _releves_entrainement(self) -> List:
+        """Jeu d'entraînement (réservoir) pour la référence de dérive: (capteurs, label, poids)"""
+        return [
+            (ligne, ligne.get('type_panne') if ligne.get('panne_detectee') else None, poids)
+            for ligne, poids in self.reservoir.lignes_ponderees()
+        ]
+    
+    def _rattraper_statistiques(self):
+        """
+        Complète les agrégats avec les lignes du dataset postérieures au snapshot
+        
+        Sans snapshot, les agrégats sont reconstruits depuis tout l'historique
+        couvert (lignes écrites avant la mise en place de /stats, par un autre
+        worker, ou perdues par un arrêt avant le dernier flush).
+        """
+        debut = datetime.fromtimestamp(time.time() - DUREE_MAX).isoformat()
+        lignes = 0
+        for position, ligne in self.dataset.parcourir(debut, apres=self.statistiques.position):
+            lignes += self.statistiques.ajouter_ligne(ligne, position)
+        if lignes:
+            self._persistance_stats.enregistrer()
+            logger.info(f"📊 Statistiques complétées depuis le dataset: {lignes} diagnostics")
+    
     def _ajouter_au_dataset(self, diagnostic_data: Dict, apprentissage_info: Dict) -> bool:
         """
         Ajoute un diagnostic au dataset d'apprentissage (version synchrone)
@@ -230,25 +458,15 @@ class ApprentissageService:
                 **donnees_capteurs  # Ajouter tous les capteurs
             }
             
-            # Charger ou créer le dataset
-            if Path(self.dataset_file).exists():
-                try:
-                    # Essayer UTF-8 d'abord
-                    df = pd.read_csv(self.dataset_file, encoding='utf-8')
-                except UnicodeDecodeError:
-                    # Si UTF-8 échoue, essayer latin-1
-                    logger.warning("UTF-8 échoué, essai avec latin-1")
-                    df = pd.read_csv(self.dataset_file, encoding='latin-1')
-                
-                # Ajouter la nouvelle ligne
-                new_row = pd.DataFrame([row])
-                df = pd.concat([df, new_row], ignore_index=True, sort=False)
-            else:
-                df = pd.DataFrame([row])
+            # Ajout au segment actif (compressé une fois plein)
+            position = self.dataset.ajouter(row)
+            self.statistiques.ajouter_ligne(row, position)
+            self._persistance_stats.enregistrer()
             
-            # Sauvegarder avec encoding UTF-8
-            df.to_csv(self.dataset_file, index=False, encoding='utf-8-sig')
-            logger.info(f"Diagnostic ajouté au dataset - Total: {len(df)} lignes")
+            # Échantillon équilibré pour le réentraînement
+            self.reservoir.ajouter(row)
+            self._persistance_reservoir.enregistrer()
+            logger.info(f"Diagnostic ajouté au dataset - Total: {self.dataset.nombre_lignes} lignes")
             
             return True
             
@@ -267,19 +485,67 @@ class ApprentissageService:
         )
         return f"{panne_max[0]} ({panne_max[1]} occurrences)"
     
-    def get_statistiques(self) -> Dict:
-        """Retourne les statistiques d'apprentissage"""
-        total_pannes = sum(self.compteur['pannes_par_type'].values())
+    def historique_diagnostics(self,
+                               debut: Optional[str] = None,
+                               fin: Optional[str] = None,
+                               filtres: Optional[Dict[str, str]] = None,
+                               apres: Optional[tuple] = None):
+        """
+        Itère sur l'historique des diagnostics dans l'ordre chronologique d'écriture
         
-        return {
-            'total_diagnostics': self.compteur['total'],
+        Args:
+            debut: Timestamp ISO minimal (inclus)
+            fin: Timestamp ISO maximal (inclus)
+            filtres: Égalités colonne -> valeur (localisation, type_panne, source)
+            apres: Position de reprise (curseur de pagination décodé)
+            
+        Yields:
+            (position, ligne typée)
+        """
+        filtres = filtres or {}
+        for position, ligne in self.dataset.parcourir(debut, fin, apres):
+            if all(ligne.get(colonne) == valeur for colonne, valeur in filtres.items()):
+                yield position, convertir_ligne(ligne)
+    
+    def get_statistiques(self, fenetre: Optional[int] = None, group_by: Optional[str] = None) -> Dict:
+        """
+        Retourne les statistiques d'apprentissage
+        
+        Args:
+            fenetre: Fenêtre glissante en secondes (défaut: totaux globaux seulement)
+            group_by: Regroupement de la fenêtre (type_panne, localisation, source)
+            
+        Returns:
+            Dict avec stats globales, et agrégats de la fenêtre si demandée
+            
+        Raises:
+            ValueError: Si la fenêtre ou le regroupement est invalide
+        """
+        with self._verrou:
+            total = self.compteur['total']
+            pannes_par_type = dict(self.compteur['pannes_par_type'])
+            derniers_retraining = list(self.compteur['derniers_retraining'])
+            last_update = self.compteur.get('last_update')
+        
+        total_pannes = sum(pannes_par_type.values())
+        stats = {
+            'total_diagnostics': total,
             'total_pannes_detectees': total_pannes,
-            'taux_pannes': (total_pannes / self.compteur['total'] * 100) if self.compteur['total'] > 0 else 0,
-            'pannes_par_type': self.compteur['pannes_par_type'],
-            'retrainings_effectues': len(self.compteur['derniers_retraining']),
-            'compteur_depuis_dernier_retraining': self.compteur['total'] % self.seuil_retraining,
-            'last_update': self.compteur['last_update']
+            'taux_pannes': (total_pannes / total * 100) if total > 0 else 0,
+            'pannes_par_type': pannes_par_type,
+            'panne_plus_frequente': max(pannes_par_type, key=pannes_par_type.get) if pannes_par_type else 'Aucune',
+            'retrainings_effectues': len(derniers_retraining),
+            'dernier_retraining': derniers_retraining[-1] if derniers_retraining else None,
+            'compteur_depuis_dernier_retraining': total - (derniers_retraining[-1].get('diagnostics_traites', 0) if derniers_retraining else 0),
+            'derive': self.derive.dernier_rapport,
+            'jeu_entrainement': self.reservoir.repartition(),
+            'last_update': last_update
         }
+        
+        if fenetre is not None or group_by is not None:
+            stats['fenetre'] = self.statistiques.requete(fenetre or 86400, group_by)
+        
+        return stats
     
     async def reset_compteur(self) -> bool:
         """Réinitialise le compteur après réentraînement"""
@@ -291,14 +557,16 @@ class ApprentissageService:
                 'pannes_detectees': sum(self.compteur['pannes_par_type'].values())
             }
             
-            self.compteur['derniers_retraining'].append(retraining_record)
-            
-            # Réinitialiser compteur (garder l'historique)
-            self.compteur['total'] = 0
-            self.compteur['pannes_par_type'] = {}
-            self.compteur['last_update'] = datetime.now().isoformat()
+            with self._verrou:
+                self.compteur['derniers_retraining'].append(retraining_record)
+                
+                # Réinitialiser compteur (garder l'historique)
+                self.compteur['total'] = 0
+                self.compteur['pannes_par_type'] = {}
+                self.compteur['last_update'] = datetime.now().isoformat()
             
             self._sauvegarder_compteur()
+            self.flush()
             logger.info(f"🔄 Compteur réinitialisé - Retraining #{len(self.compteur['derniers_retraining'])}")
             
             return True
@@ -0,0 +1,290 @@
+"""
+Archive circulaire des diagnostics - Fichier mmap à slots fixes
+"""
+
+import os
+import json
+import mmap
+import struct
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: un seul processus écrivain
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# En-tête fichier: magic, capacité, taille de slot, prochain numéro de séquence
+_MAGIC = b'FRGARCH1'
+_ENTETE = struct.Struct('<8sIIQ')
+_TAILLE_ENTETE = 64
+
+# En-tête de slot: numéro de séquence (0 = vide), longueur du JSON
+_SLOT = struct.Struct('<QI')
+
+# Champs conservés quand un diagnostic trop volumineux est tronqué
+_CHAMPS_PROTEGES = ('diagnostic_id', 'source', 'timestamp')
+
+
+class ArchiveDiagnostics:
+    """
+    Archive bornée des N derniers diagnostics complets
+
+    Le fichier contient `capacite` slots de `taille_slot` octets, écrits en
+    anneau et lus via mmap. Un index mémoire diagnostic_id → slot permet une
+    lecture O(1) par ID, et un index par source (capteur) donne les K
+    derniers diagnostics d'un équipement sans parcourir l'archive.
+
+    Plusieurs processus (workers gunicorn) peuvent partager le fichier: le
+    numéro de séquence est alloué sous verrou `fcntl` en relisant l'en-tête,
+    et chaque processus complète ses index avec les slots écrits par les
+    autres (parcours des seules séquences nouvelles) avant une lecture.
+    """
+
+    def __init__(self, fichier: str, capacite: int = 1000, taille_slot: int = 8192):
+        """
+        Ouvre (ou crée) l'archive
+
+        Args:
+            fichier: Chemin du fichier d'archive
+            capacite: Nombre de diagnostics conservés
+            taille_slot: Taille max d'un diagnostic sérialisé (octets)
+        """
+        self.fichier = Path(fichier)
+        self.fichier.parent.mkdir(parents=True, exist_ok=True)
+
+        self._verrou = threading.Lock()
+        self._pid = os.getpid()
+        self._ouvrir(capacite, taille_slot)
+        self._reconstruire_index()
+
+        logger.info(f"Archive diagnostics ouverte - {len(self._index)}/{self.capacite} entrées")
+
+    def _ouvrir(self, capacite: int, taille_slot: int):
+        """Ouvre le fichier mmap, en le (re)créant si le format a changé"""
+        taille = _TAILLE_ENTETE + capacite * taille_slot
+
+        if self.fichier.exists():
+            with open(self.fichier, 'rb') as f:
+                entete = f.read(_ENTETE.size)
+            if len(entete) == _ENTETE.size:
+                magic, cap, slot, _ = _ENTETE.unpack(entete)
+                if magic == _MAGIC and (cap, slot) == (capacite, taille_slot):
+                    taille = None
+                else:
+                    logger.warning(f"⚠️ Format d'archive différent ({cap}x{slot}), archive réinitialisée")
+
+        if taille is not None:
+            with open(self.fichier, 'wb') as f:
+                f.truncate(taille)
+                f.write(_ENTETE.pack(_MAGIC, capacite, taille_slot, 1))
+
+        self.capacite = capacite
+        self.taille_slot = taille_slot
+        self._mapper()
+
+    def _mapper(self):
+        self._f = open(self.fichier, 'r+b')
+        self._mm = mmap.mmap(self._f.fileno(), 0)
+
+    def _verifier_processus(self):
+        """Après un fork: propre descripteur (le flock d'un descripteur hérité est partagé)"""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._verrou = threading.Lock()
+        self._mapper()
+
+    @contextmanager
+    def _verrou_fichier(self, exclusif=False):
+        """Verrou inter-processus sur le fichier (exclusif pour écrire, partagé pour lire)"""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._f.fileno(), fcntl.LOCK_EX if exclusif else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+
+    def _prochain_seq(self) -> int:
+        return _ENTETE.unpack_from(self._mm, 0)[3]
+
+    def _offset(self, slot: int) -> int:
+        return _TAILLE_ENTETE + slot * self.taille_slot
+
+    def _lire_slot(self, slot: int) -> Optional[Dict]:
+        offset = self._offset(slot)
+        seq, longueur = _SLOT.unpack_from(self._mm, offset)
+        if seq == 0 or longueur == 0:
+            return None
+        debut = offset + _SLOT.size
+        return json.loads(self._mm[debut:debut + longueur])
+
+    def _reconstruire_index(self):
+        """Reconstruit les index mémoire en parcourant les slots"""
+        self._index: Dict[str, int] = {}
+        self._slots: List[Optional[tuple]] = [None] * self.capacite
+        self._par_source: Dict[str, deque] = {}
+        self._vu = 1  # prochaine séquence à indexer
+        with self._verrou_fichier():
+            self._rafraichir()
+
+    def _rafraichir(self):
+        """Indexe les séquences écrites depuis le dernier passage, par ce processus ou un autre"""
+        prochain = self._prochain_seq()
+        for seq in range(max(self._vu, prochain - self.capacite), prochain):
+            slot = seq % self.capacite
+            seq_slot, longueur = _SLOT.unpack_from(self._mm, self._offset(slot))
+            if seq_slot != seq or longueur == 0:
+                continue
+            try:
+                diagnostic = self._lire_slot(slot)
+            except ValueError:
+                logger.warning(f"⚠️ Slot {slot} illisible ignoré")
+                continue
+            self._indexer(seq, slot, diagnostic.get('diagnostic_id'), diagnostic.get('source'))
+        self._vu = max(self._vu, prochain)
+
+    def _indexer(self, seq: int, slot: int, diagnostic_id: str, source: str):
+        ancien = self._slots[slot]
+        if ancien is not None and self._index.get(ancien[1]) == slot:
+            del self._index[ancien[1]]
+
+        self._slots[slot] = (seq, diagnostic_id, source)
+        if diagnostic_id:
+            self._index[diagnostic_id] = slot
+        self._par_source.setdefault(source, deque(maxlen=self.capacite)).append((seq, slot))
+
+    def ajouter(self, diagnostic_data: Dict) -> bool:
+        """
+        Ajoute un diagnostic complet à l'archive (écrase le plus ancien)
+
+        Args:
+            diagnostic_data: Diagnostic à archiver
+
+        Returns:
+            True si archivé (tronqué si trop volumineux pour un slot), False sinon
+        """
+        contenu = self._serialiser(diagnostic_data)
+        if contenu is None:
+            return False
+
+        with self._verrou:
+            self._verifier_processus()
+            with self._verrou_fichier(exclusif=True):
+                # En-tête relu sous verrou: un autre processus a pu écrire
+                seq = self._prochain_seq()
+                slot = seq % self.capacite
+                offset = self._offset(slot)
+
+                # Invalider le slot pendant l'écriture, puis publier l'en-tête
+                _SLOT.pack_into(self._mm, offset, 0, 0)
+                self._mm[offset + _SLOT.size:offset + _SLOT.size + len(contenu)] = contenu
+                _SLOT.pack_into(self._mm, offset, seq, len(contenu))
+
+                _ENTETE.pack_into(self._mm, 0, _MAGIC, self.capacite, self.taille_slot, seq + 1)
+
+                self._rafraichir()
+        return True
+
+    def _serialiser(self, diagnostic_data: Dict) -> Optional[bytes]:
+        """
+        JSON compact du diagnostic; au-delà d'un slot, les champs les plus
+        volumineux sont retirés (listés dans `_tronque`) plutôt que de perdre
+        le diagnostic
+        """
+        def encoder(donnees):
+            return json.dumps(donnees, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+        contenu = encoder(diagnostic_data)
+        limite = self.taille_slot - _SLOT.size
+        if len(contenu) <= limite:
+            return contenu
+
+        reduit = dict(diagnostic_data)
+        retires = []
+        candidats = sorted((k for k in reduit if k not in _CHAMPS_PROTEGES),
+                           key=lambda k: len(encoder(reduit[k])), reverse=True)
+        for cle in candidats:
+            del reduit[cle]
+            retires.append(cle)
+            contenu = encoder({**reduit, '_tronque': retires})
+            if len(contenu) <= limite:
+                logger.warning(f"⚠️ Diagnostic {diagnostic_data.get('diagnostic_id')} tronqué pour l'archive "
+                               f"(champs retirés: {', '.join(retires)})")
+                return contenu
+
+        logger.error(f"❌ Diagnostic {diagnostic_data.get('diagnostic_id')} non archivé: "
+                     f"champs essentiels trop volumineux ({len(contenu)} octets)")
+        return None
+
+    def obtenir(self, diagnostic_id: str) -> Optional[Dict]:
+        """
+        Retourne un diagnostic par son ID (O(1))
+
+        Args:
+            diagnostic_id: ID du diagnostic
+
+        Returns:
+            Diagnostic complet ou None s'il est sorti de l'archive
+        """
+        with self._verrou:
+            self._verifier_processus()
+            with self._verrou_fichier():
+                self._rafraichir()
+                slot = self._index.get(diagnostic_id)
+                if slot is None:
+                    return None
+                return self._lire_slot(slot)
+
+    def derniers(self, source: Optional[str] = None, limite: int = 10) -> List[Dict]:
+        """
+        Retourne les derniers diagnostics, du plus récent au plus ancien
+
+        Args:
+            source: Filtrer sur un équipement (défaut: tous)
+            limite: Nombre max de diagnostics
+
+        Returns:
+            Liste de diagnostics complets
+        """
+        resultats = []
+        with self._verrou:
+            self._verifier_processus()
+            with self._verrou_fichier():
+                self._rafraichir()
+                if source is None:
+                    prochain = self._prochain_seq()
+                    seq = prochain - 1
+                    while seq > 0 and len(resultats) < limite and prochain - seq <= self.capacite:
+                        diagnostic = self._lire_slot(seq % self.capacite)
+                        if diagnostic is not None:
+                            resultats.append(diagnostic)
+                        seq -= 1
+                    return resultats
+
+                for seq, slot in reversed(self._par_source.get(source, ())):
+                    if len(resultats) >= limite:
+                        break
+                    # Entrée périmée si le slot a été réécrit depuis
+                    if self._slots[slot] is None or self._slots[slot][0] != seq:
+                        continue
+                    resultats.append(self._lire_slot(slot))
+        return resultats
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def fermer(self):
+        """Synchronise et ferme le fichier"""
+        with self._verrou:
+            self._mm.flush()
+            self._mm.close()
+            self._f.close()
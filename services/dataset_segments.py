@@ -0,0 +1,536 @@
+"""
+Dataset d'apprentissage segmenté - Segments CSV compressés + index temporel
+"""
+
+import io
+import os
+import csv
+import gzip
+import json
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.persistance import ecrire_json_atomique
+from utils.validation import SEUILS_VALIDES
+
+try:
+    import zstandard
+except ImportError:  # Optionnel: gzip sinon
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: un seul processus par dossier
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COLONNES_DATASET = [
+    'timestamp', 'diagnostic_id', 'source', 'localisation',
+    'panne_detectee', 'type_panne', 'score_confiance',
+    *SEUILS_VALIDES.keys()
+]
+
+
+def convertir_ligne(ligne: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Convertit une ligne texte du dataset en valeurs typées (JSON)
+
+    Args:
+        ligne: Ligne lue depuis un segment
+
+    Returns:
+        Ligne avec capteurs/score en float, panne_detectee en bool, vides en None
+    """
+    resultat = {}
+    for colonne, valeur in ligne.items():
+        if valeur == '':
+            resultat[colonne] = None
+        elif colonne == 'panne_detectee':
+            resultat[colonne] = valeur == 'True'
+        elif colonne == 'score_confiance' or colonne in SEUILS_VALIDES:
+            try:
+                resultat[colonne] = float(valeur)
+            except ValueError:
+                resultat[colonne] = None
+        else:
+            resultat[colonne] = valeur
+    return resultat
+
+
+def encoder_position(position: Tuple[int, int, int]) -> str:
+    """Encode une position (segment, bloc, ligne) en curseur de pagination"""
+    return '-'.join(str(p) for p in position)
+
+
+def decoder_position(curseur: str) -> Tuple[int, int, int]:
+    """
+    Décode un curseur de pagination
+
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    try:
+        segment_id, bloc, ligne = (int(p) for p in curseur.split('-'))
+    except (ValueError, AttributeError):
+        raise ValueError(f"Curseur invalide: {curseur}")
+    return segment_id, bloc, ligne
+
+
+def _compresser(donnees: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=6).compress(donnees)
+    return gzip.compress(donnees, compresslevel=6)
+
+
+def _decompresser(donnees: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(donnees)
+    return gzip.decompress(donnees)
+
+
+class DatasetSegmente:
+    """
+    Dataset d'apprentissage écrit en segments de taille fixe
+
+    Les lignes sont ajoutées au segment actif (CSV non compressé). Quand il
+    atteint `lignes_par_segment`, il est scellé: réécrit en blocs compressés
+    indépendants (membres gzip ou frames zstd) de `lignes_par_bloc` lignes.
+    L'index (`index.json`) garde, par segment et par bloc, la plage de
+    timestamps et l'offset/taille du bloc: une lecture `debut`/`fin` ne
+    décompresse que les blocs qui recouvrent la plage.
+
+    Plusieurs processus (workers gunicorn) peuvent partager le dossier:
+    écritures et scellement se font sous verrou `fcntl` exclusif sur
+    `.verrou`, et chaque processus relit l'index et les lignes ajoutées au
+    segment actif par les autres avant d'agir.
+    """
+
+    def __init__(self,
+                 dossier: str,
+                 lignes_par_segment: int = 10000,
+                 lignes_par_bloc: int = 500,
+                 max_segments: int = 0,
+                 codec: Optional[str] = None,
+                 fichier_legacy: Optional[str] = None):
+        """
+        Ouvre (ou crée) le dataset segmenté
+
+        Args:
+            dossier: Dossier des segments et de l'index
+            lignes_par_segment: Lignes avant scellement du segment actif
+            lignes_par_bloc: Lignes par bloc compressé (granularité de l'index)
+            max_segments: Segments scellés conservés (0 = illimité)
+            codec: 'zstd' ou 'gzip' (défaut: zstd si disponible)
+            fichier_legacy: Ancien CSV monolithique à importer au premier démarrage
+        """
+        self.dossier = Path(dossier)
+        self.dossier.mkdir(parents=True, exist_ok=True)
+        self.lignes_par_segment = lignes_par_segment
+        self.lignes_par_bloc = lignes_par_bloc
+        self.max_segments = max_segments
+        self.codec = codec or ('zstd' if zstandard is not None else 'gzip')
+        if self.codec == 'zstd' and zstandard is None:
+            logger.warning("⚠️ zstandard non installé, compression gzip utilisée")
+            self.codec = 'gzip'
+
+        self._verrou = threading.RLock()
+        self._fichier_index = self.dossier / 'index.json'
+        self._fichier_verrou = self.dossier / '.verrou'
+        self._pid = None
+        self._f_actif = None
+
+        with self._verrou_dossier(exclusif=True):
+            if fichier_legacy and Path(fichier_legacy).exists() and self.nombre_lignes == 0:
+                self._importer_legacy(Path(fichier_legacy))
+
+        logger.info(f"Dataset segmenté ouvert - {len(self._index['segments'])} segment(s) scellé(s), "
+                    f"{self.nombre_lignes} lignes")
+
+    # ------------------------------------------------------------------
+    # Index et segment actif
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _verrou_dossier(self, exclusif=False):
+        """
+        Verrou inter-processus du dossier (exclusif pour écrire), puis
+        resynchronisation de l'index et du segment actif
+        """
+        with self._verrou:
+            if self._pid != os.getpid():
+                # Premier accès ou processus forké: descripteur de verrou propre
+                self._pid = os.getpid()
+                self._f_verrou = open(self._fichier_verrou, 'a+b')
+                self._profondeur = 0
+                self._signature_index = False
+            if self._profondeur:
+                # Verrou déjà tenu par ce thread (ajouter -> sceller)
+                self._profondeur += 1
+                try:
+                    yield
+                finally:
+                    self._profondeur -= 1
+                return
+
+            if fcntl is not None:
+                fcntl.flock(self._f_verrou.fileno(), fcntl.LOCK_EX if exclusif else fcntl.LOCK_SH)
+            self._profondeur = 1
+            try:
+                self._synchroniser()
+                yield
+            finally:
+                self._profondeur = 0
+                if fcntl is not None:
+                    fcntl.flock(self._f_verrou.fileno(), fcntl.LOCK_UN)
+
+    def _signature(self):
+        try:
+            etat = os.stat(self._fichier_index)
+        except FileNotFoundError:
+            return None
+        return etat.st_ino, etat.st_size, etat.st_mtime_ns
+
+    def _synchroniser(self):
+        """Relit l'index s'il a été réécrit, et les lignes ajoutées au segment actif par d'autres"""
+        signature = self._signature()
+        if signature != self._signature_index:
+            self._recharger()
+            return
+        chemin = self._chemin_actif()
+        taille = chemin.stat().st_size if chemin.exists() else 0
+        if taille != self._octets_actif:
+            self._lire_actif(chemin)
+
+    def _recharger(self):
+        """Recharge l'index et rouvre le segment actif"""
+        self._signature_index = self._signature()
+        self._index = self._charger_index()
+        if self._f_actif is not None:
+            self._f_actif.close()
+        self._actif = {'lignes': 0, 't_min': None, 't_max': None}
+        self._octets_actif = 0
+        chemin = self._chemin_actif()
+        self._lire_actif(chemin)
+        self._f_actif = open(chemin, 'a', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._f_actif)
+
+    def _lire_actif(self, chemin: Path):
+        """Suit les lignes du segment actif au-delà de celles déjà comptées"""
+        if not chemin.exists():
+            return
+        with open(chemin, 'rb') as f:
+            if f.seek(0, os.SEEK_END) < self._octets_actif:
+                # Fichier recréé: recompter depuis le début
+                self._actif = {'lignes': 0, 't_min': None, 't_max': None}
+                self._octets_actif = 0
+            f.seek(self._octets_actif)
+            contenu = f.read()
+        self._octets_actif += len(contenu)
+        for ligne in csv.reader(io.StringIO(contenu.decode('utf-8'), newline='')):
+            if ligne:
+                self._suivre_actif(ligne[0])
+
+    def _charger_index(self) -> Dict:
+        if self._fichier_index.exists():
+            with open(self._fichier_index, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'version': 1, 'colonnes': COLONNES_DATASET, 'prochain_id': 1, 'segments': []}
+
+    def _chemin_actif(self) -> Path:
+        return self.dossier / f"segment_{self._index['prochain_id']:06d}.csv"
+
+    def _suivre_actif(self, timestamp: str):
+        self._actif['lignes'] += 1
+        if timestamp:
+            if self._actif['t_min'] is None or timestamp < self._actif['t_min']:
+                self._actif['t_min'] = timestamp
+            if self._actif['t_max'] is None or timestamp > self._actif['t_max']:
+                self._actif['t_max'] = timestamp
+
+    @property
+    def colonnes(self) -> List[str]:
+        return self._index['colonnes']
+
+    @property
+    def nombre_lignes(self) -> int:
+        with self._verrou_dossier():
+            return sum(s['lignes'] for s in self._index['segments']) + self._actif['lignes']
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def ajouter(self, ligne: Dict) -> Tuple[int, int, int]:
+        """
+        Ajoute une ligne au segment actif (scelle le segment s'il est plein)
+
+        Args:
+            ligne: Valeurs par colonne (colonnes inconnues ignorées)
+
+        Returns:
+            Position (segment, bloc, ligne) de la ligne, comme dans parcourir()
+        """
+        valeurs = ['' if ligne.get(c) is None else ligne.get(c) for c in self.colonnes]
+        with self._verrou_dossier(exclusif=True):
+            self._writer.writerow(valeurs)
+            self._f_actif.flush()
+            self._octets_actif = os.fstat(self._f_actif.fileno()).st_size
+            self._suivre_actif(str(valeurs[0]))
+
+            rang = self._actif['lignes'] - 1
+            position = (self._index['prochain_id'], rang // self.lignes_par_bloc, rang % self.lignes_par_bloc)
+            if self._actif['lignes'] >= self.lignes_par_segment:
+                self.sceller()
+            return position
+
+    def sceller(self) -> Optional[Dict]:
+        """
+        Compresse le segment actif en blocs indexés et ouvre un nouveau segment
+
+        Returns:
+            Métadonnées du segment scellé (None si le segment actif est vide)
+        """
+        with self._verrou_dossier(exclusif=True):
+            if self._actif['lignes'] == 0:
+                return None
+
+            chemin_actif = self._chemin_actif()
+            self._f_actif.close()
+
+            segment_id = self._index['prochain_id']
+            nom = f"segment_{segment_id:06d}.csv.{'zst' if self.codec == 'zstd' else 'gz'}"
+            chemin = self.dossier / nom
+            tmp = chemin.with_name(nom + '.tmp')
+
+            blocs = []
+            with open(chemin_actif, 'r', encoding='utf-8', newline='') as src, open(tmp, 'wb') as dst:
+                lignes = [l for l in csv.reader(src) if l]
+                for i in range(0, len(lignes), self.lignes_par_bloc):
+                    bloc = lignes[i:i + self.lignes_par_bloc]
+                    tampon = io.StringIO()
+                    csv.writer(tampon).writerows(bloc)
+                    compresse = _compresser(tampon.getvalue().encode('utf-8'), self.codec)
+                    horodatages = [l[0] for l in bloc if l[0]]
+                    blocs.append({
+                        't_min': min(horodatages) if horodatages else None,
+                        't_max': max(horodatages) if horodatages else None,
+                        'offset': dst.tell(),
+                        'taille': len(compresse),
+                        'lignes': len(bloc)
+                    })
+                    dst.write(compresse)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp, chemin)
+
+            segment = {
+                'id': segment_id,
+                'fichier': nom,
+                'codec': self.codec,
+                'lignes': len(lignes),
+                't_min': self._actif['t_min'],
+                't_max': self._actif['t_max'],
+                'blocs': blocs
+            }
+            self._index['segments'].append(segment)
+            self._index['prochain_id'] = segment_id + 1
+
+            if self.max_segments and len(self._index['segments']) > self.max_segments:
+                for ancien in self._index['segments'][:-self.max_segments]:
+                    (self.dossier / ancien['fichier']).unlink(missing_ok=True)
+                    logger.info(f"🗑️ Segment {ancien['fichier']} supprimé (rétention)")
+                self._index['segments'] = self._index['segments'][-self.max_segments:]
+
+            # L'index référence le segment scellé avant suppression du CSV actif
+            ecrire_json_atomique(self._fichier_index, self._index, indent=None)
+            chemin_actif.unlink()
+            self._recharger()
+
+            logger.info(f"📦 Segment {nom} scellé - {segment['lignes']} lignes, "
+                        f"{sum(b['taille'] for b in blocs) / 1024:.1f} Ko")
+            return segment
+
+    def _importer_legacy(self, fichier: Path):
+        """
+        Importe l'ancien CSV monolithique puis le renomme
+
+        L'import est écrit dans un dossier temporaire et ne remplace le dataset
+        (vide) qu'une fois le fichier entièrement lu: un import interrompu est
+        recommencé au démarrage suivant.
+        """
+        logger.info(f"🔁 Import du dataset existant {fichier}...")
+        temporaire = self.dossier / '.import'
+        for encodage in ('utf-8-sig', 'latin-1'):
+            shutil.rmtree(temporaire, ignore_errors=True)
+            importe = DatasetSegmente(temporaire, self.lignes_par_segment, self.lignes_par_bloc,
+                                      self.max_segments, self.codec)
+            try:
+                with open(fichier, 'r', encoding=encodage, newline='') as f:
+                    for ligne in csv.DictReader(f):
+                        importe.ajouter(ligne)
+                break
+            except UnicodeDecodeError:
+                logger.warning("UTF-8 échoué, essai avec latin-1")
+            finally:
+                importe.fermer()
+
+        with self._verrou_dossier(exclusif=True):
+            # Segments scellés puis segment actif, l'index en dernier: tant qu'il
+            # n'est pas remplacé, les fichiers déplacés ne sont pas référencés
+            self._f_actif.close()
+            ancien_actif = self._chemin_actif()
+            for segment in importe._index['segments']:
+                os.replace(temporaire / segment['fichier'], self.dossier / segment['fichier'])
+            actif = importe._chemin_actif()
+            if actif.exists():
+                os.replace(actif, self.dossier / actif.name)
+            if importe._fichier_index.exists():
+                os.replace(importe._fichier_index, self._fichier_index)
+            shutil.rmtree(temporaire, ignore_errors=True)
+
+            self._f_actif = None
+            self._recharger()
+            if self._chemin_actif() != ancien_actif:
+                ancien_actif.unlink(missing_ok=True)
+
+        fichier.rename(fichier.with_name(fichier.name + '.migre'))
+        logger.info(f"✅ Dataset existant importé - {self.nombre_lignes} lignes")
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _recouvre(t_min: Optional[str], t_max: Optional[str],
+                  debut: Optional[str], fin: Optional[str]) -> bool:
+        if t_min is None or t_max is None:
+            return True
+        if debut and t_max < debut:
+            return False
+        if fin and t_min > fin:
+            return False
+        return True
+
+    def _blocs(self, debut: Optional[str], fin: Optional[str],
+               depuis: Tuple[int, int] = (0, 0)) -> Iterator[Tuple[int, int, List[List[str]]]]:
+        """
+        Lignes brutes bloc par bloc, en ne décompressant que les blocs utiles
+
+        Yields:
+            (id du segment, numéro du bloc, lignes du bloc), dans l'ordre d'écriture
+        """
+        with self._verrou_dossier():
+            segments = list(self._index['segments'])
+            actif_id = self._index['prochain_id']
+            chemin_actif = self._chemin_actif()
+            actif = dict(self._actif)
+
+        for segment in segments:
+            if segment['id'] < depuis[0]:
+                continue
+            if not self._recouvre(segment['t_min'], segment['t_max'], debut, fin):
+                continue
+            try:
+                with open(self.dossier / segment['fichier'], 'rb') as f:
+                    for numero, bloc in enumerate(segment['blocs']):
+                        if (segment['id'], numero) < depuis:
+                            continue
+                        if not self._recouvre(bloc['t_min'], bloc['t_max'], debut, fin):
+                            continue
+                        f.seek(bloc['offset'])
+                        contenu = _decompresser(f.read(bloc['taille']), segment['codec'])
+                        yield segment['id'], numero, list(csv.reader(io.StringIO(contenu.decode('utf-8'))))
+            except FileNotFoundError:
+                # Segment supprimé par la rétention pendant la lecture
+                continue
+
+        if actif_id < depuis[0] or not actif['lignes']:
+            return
+        if not self._recouvre(actif['t_min'], actif['t_max'], debut, fin):
+            return
+        try:
+            with open(chemin_actif, 'r', encoding='utf-8', newline='') as f:
+                # Mêmes frontières de blocs qu'au scellement: positions stables
+                numero, lignes = 0, []
+                for ligne in csv.reader(f):
+                    if ligne:
+                        lignes.append(ligne)
+                    if len(lignes) >= self.lignes_par_bloc:
+                        if (actif_id, numero) >= depuis:
+                            yield actif_id, numero, lignes
+                        numero, lignes = numero + 1, []
+                if lignes and (actif_id, numero) >= depuis:
+                    yield actif_id, numero, lignes
+        except FileNotFoundError:
+            # Segment scellé pendant la lecture
+            return
+
+    def parcourir(self, debut: Optional[str] = None, fin: Optional[str] = None,
+                  apres: Optional[Tuple[int, int, int]] = None) -> Iterator[Tuple[Tuple[int, int, int], Dict[str, str]]]:
+        """
+        Itère sur les lignes de [debut, fin] avec leur position, reprise possible
+
+        Args:
+            debut: Timestamp ISO minimal (inclus)
+            fin: Timestamp ISO maximal (inclus)
+            apres: Position (segment, bloc, ligne) après laquelle reprendre
+
+        Yields:
+            (position, ligne) dans l'ordre d'écriture
+        """
+        colonnes = self.colonnes
+        depuis = apres[:2] if apres else (0, 0)
+        for segment_id, numero, bloc in self._blocs(debut, fin, depuis):
+            for rang, valeurs in enumerate(bloc):
+                position = (segment_id, numero, rang)
+                if apres and position <= apres:
+                    continue
+                timestamp = valeurs[0]
+                if debut and timestamp < debut:
+                    continue
+                if fin and timestamp > fin:
+                    continue
+                yield position, dict(zip(colonnes, valeurs))
+
+    def lire(self, debut: Optional[str] = None, fin: Optional[str] = None) -> Iterator[Dict[str, str]]:
+        """
+        Itère sur les lignes dont le timestamp est dans [debut, fin]
+
+        Args:
+            debut: Timestamp ISO minimal (inclus)
+            fin: Timestamp ISO maximal (inclus)
+
+        Yields:
+            Lignes du dataset (valeurs texte, par colonne)
+        """
+        for _, ligne in self.parcourir(debut, fin):
+            yield ligne
+
+    def statistiques(self) -> Dict:
+        """Taille et nombre de segments du dataset"""
+        with self._verrou_dossier():
+            taille = sum(
+                (self.dossier / s['fichier']).stat().st_size
+                for s in self._index['segments'] if (self.dossier / s['fichier']).exists()
+            )
+            return {
+                'segments_scelles': len(self._index['segments']),
+                'lignes': self.nombre_lignes,
+                'lignes_segment_actif': self._actif['lignes'],
+                'taille_compressee_octets': taille,
+                'codec': self.codec
+            }
+
+    def fermer(self):
+        """Ferme le segment actif"""
+        with self._verrou:
+            if self._f_actif is not None:
+                self._f_actif.close()
+            if self._pid is not None:
+                self._f_verrou.close()
+                self._pid = None
@@ -0,0 +1,260 @@
+"""
+Découverte de pannes - Clustering en ligne des relevés inconnus ou peu fiables
+"""
+
+import io
+import csv
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.validation import CAPTEURS, SEUILS_VALIDES
+
+logger = logging.getLogger(__name__)
+
+_MIN = np.array([SEUILS_VALIDES[c]['min'] for c in CAPTEURS], dtype=np.float64)
+_ETENDUE = np.array([SEUILS_VALIDES[c]['max'] - SEUILS_VALIDES[c]['min'] for c in CAPTEURS], dtype=np.float64)
+
+# Libellés renvoyés par l'agent quand il ne reconnaît pas la panne
+TYPES_INCONNUS = {'inconnue', 'inconnu', 'unknown', 'anomalie'}
+
+
+def normaliser_capteurs(donnees_capteurs: Dict) -> np.ndarray:
+    """
+    Vecteur des capteurs ramené à [0, 1] sur les plages de SEUILS_VALIDES
+
+    Args:
+        donnees_capteurs: Valeurs des capteurs
+
+    Returns:
+        Vecteur (NaN pour les capteurs absents)
+    """
+    brut = np.array([
+        donnees_capteurs.get(c) if donnees_capteurs.get(c) is not None else np.nan
+        for c in CAPTEURS
+    ], dtype=np.float64)
+    return (brut - _MIN) / _ETENDUE
+
+
+class DecouvertePannes:
+    """
+    Clustering en ligne (k-means mini-batch à rayon) des relevés que l'agent
+    classe comme inconnus ou avec une confiance faible
+
+    Les candidats sont accumulés puis traités par lots: distances à tous les
+    centroïdes en une opération numpy, mise à jour des centroïdes par moyenne
+    incrémentale, nouveaux clusters pour les points hors rayon. Un cluster qui
+    atteint `taille_min` relevés est émis une seule fois avec ses échantillons.
+    """
+
+    def __init__(self,
+                 taille_min: int = 50,
+                 rayon: float = 0.1,
+                 seuil_confiance: float = 60.0,
+                 taille_lot: int = 16,
+                 max_clusters: int = 50,
+                 max_echantillons: int = 200):
+        """
+        Initialise le clustering
+
+        Args:
+            taille_min: Relevés dans un cluster avant de l'émettre comme nouvelle panne
+            rayon: Distance RMS normalisée max entre un relevé et son centroïde
+            seuil_confiance: Score (%) en dessous duquel une panne prédite est candidate
+            taille_lot: Candidats accumulés avant un passage de clustering
+            max_clusters: Clusters suivis (le plus petit non émis est évincé au-delà)
+            max_echantillons: Lignes conservées par cluster pour l'entraînement
+        """
+        self.taille_min = taille_min
+        self.rayon = rayon
+        self.seuil_confiance = seuil_confiance
+        self.taille_lot = max(1, taille_lot)
+        self.max_clusters = max_clusters
+        self.max_echantillons = max_echantillons
+
+        self._verrou = threading.Lock()
+        self._lot_vecteurs: List[np.ndarray] = []
+        self._lot_lignes: List[Dict] = []
+
+        dimension = len(CAPTEURS)
+        self._centroides = np.empty((0, dimension))
+        self._effectifs = np.empty(0, dtype=np.int64)
+        self._clusters: List[Dict] = []  # id, emis, echantillons
+        self._prochain_id = 1
+
+        # Moyenne des relevés reconnus: référence pour nommer les signatures
+        self._somme_reference = np.zeros(dimension)
+        self._nb_reference = 0
+
+    def est_candidat(self, panne_detectee: bool, type_panne: Optional[str], score: float) -> bool:
+        """Relevé étiqueté inconnu, ou panne prédite avec une confiance faible"""
+        if not panne_detectee:
+            return False
+        if not type_panne or str(type_panne).strip().lower() in TYPES_INCONNUS:
+            return True
+        try:
+            return float(score or 0) < self.seuil_confiance
+        except (TypeError, ValueError):
+            return True
+
+    def observer(self, diagnostic_data: Dict) -> List[Dict]:
+        """
+        Prend en compte un diagnostic
+
+        Args:
+            diagnostic_data: Diagnostic complet (capteurs + prédiction)
+
+        Returns:
+            Nouvelles pannes à entraîner (signature, name, count, csv_content)
+        """
+        prediction = diagnostic_data.get('prediction_ia', {}) or {}
+        donnees_capteurs = diagnostic_data.get('donnees_capteurs', {}) or {}
+        vecteur = normaliser_capteurs(donnees_capteurs)
+
+        with self._verrou:
+            if not self.est_candidat(diagnostic_data.get('panne_detectee', False),
+                                     prediction.get('panne_detectee'),
+                                     prediction.get('score', 0)):
+                if not np.isnan(vecteur).any():
+                    self._somme_reference += vecteur
+                    self._nb_reference += 1
+                return []
+
+            self._lot_vecteurs.append(vecteur)
+            self._lot_lignes.append({
+                'timestamp': diagnostic_data.get('timestamp'),
+                'diagnostic_id': diagnostic_data.get('diagnostic_id'),
+                **{c: donnees_capteurs.get(c) for c in CAPTEURS}
+            })
+            if len(self._lot_vecteurs) < self.taille_lot:
+                return []
+            return self._traiter_lot()
+
+    def vider(self) -> List[Dict]:
+        """Traite immédiatement les candidats en attente"""
+        with self._verrou:
+            return self._traiter_lot() if self._lot_vecteurs else []
+
+    def _reference(self) -> np.ndarray:
+        if self._nb_reference:
+            return self._somme_reference / self._nb_reference
+        return np.full(len(CAPTEURS), 0.5)
+
+    def _traiter_lot(self) -> List[Dict]:
+        lot = np.vstack(self._lot_vecteurs)
+        lignes = self._lot_lignes
+        self._lot_vecteurs, self._lot_lignes = [], []
+
+        # Capteurs manquants: valeur de référence
+        manquants = np.isnan(lot)
+        if manquants.any():
+            lot[manquants] = np.broadcast_to(self._reference(), lot.shape)[manquants]
+
+        # Affectation vectorisée au centroïde le plus proche
+        affectations = np.full(len(lot), -1, dtype=np.int64)
+        if len(self._centroides):
+            distances = np.sqrt(((lot[:, None, :] - self._centroides[None, :, :]) ** 2).mean(axis=2))
+            plus_proche = distances.argmin(axis=1)
+            dans_rayon = distances[np.arange(len(lot)), plus_proche] <= self.rayon
+            affectations[dans_rayon] = plus_proche[dans_rayon]
+
+        # Points hors rayon: graines de nouveaux clusters (leader clustering)
+        nb_existants = len(self._centroides)
+        for i in np.flatnonzero(affectations < 0):
+            if len(self._centroides) > nb_existants:
+                d = np.sqrt(((self._centroides[nb_existants:] - lot[i]) ** 2).mean(axis=1))
+                if d.min() <= self.rayon:
+                    affectations[i] = nb_existants + d.argmin()
+                    continue
+            affectations[i] = self._creer_cluster(lot[i])
+
+        # Mise à jour des centroïdes: moyenne incrémentale par cluster
+        indices, comptes = np.unique(affectations, return_counts=True)
+        sommes = np.zeros((len(indices), lot.shape[1]))
+        np.add.at(sommes, np.searchsorted(indices, affectations), lot)
+        anciens = self._effectifs[indices]
+        self._centroides[indices] = (self._centroides[indices] * anciens[:, None] + sommes) / (anciens + comptes)[:, None]
+        self._effectifs[indices] = anciens + comptes
+
+        for ligne, k in zip(lignes, affectations):
+            echantillons = self._clusters[k]['echantillons']
+            if len(echantillons) < self.max_echantillons:
+                echantillons.append(ligne)
+
+        nouvelles = []
+        for k in indices:
+            cluster = self._clusters[k]
+            if not cluster['emis'] and self._effectifs[k] >= self.taille_min:
+                cluster['emis'] = True
+                nouvelles.append(self._decrire(k))
+                logger.info(f"🆕 Nouvelle signature de panne: {nouvelles[-1]['name']} ({self._effectifs[k]} relevés)")
+
+        self._evincer()
+        return nouvelles
+
+    def _creer_cluster(self, vecteur: np.ndarray) -> int:
+        self._centroides = np.vstack([self._centroides, vecteur])
+        self._effectifs = np.append(self._effectifs, 0)
+        self._clusters.append({'id': self._prochain_id, 'emis': False, 'echantillons': []})
+        self._prochain_id += 1
+        return len(self._clusters) - 1
+
+    def _evincer(self):
+        """Retire les plus petits clusters non émis au-delà de max_clusters"""
+        excedent = len(self._clusters) - self.max_clusters
+        if excedent <= 0:
+            return
+        non_emis = [k for k, c in enumerate(self._clusters) if not c['emis']]
+        retires = set(sorted(non_emis, key=lambda k: self._effectifs[k])[:excedent])
+        gardes = [k for k in range(len(self._clusters)) if k not in retires]
+        self._centroides = self._centroides[gardes]
+        self._effectifs = self._effectifs[gardes]
+        self._clusters = [self._clusters[k] for k in gardes]
+
+    def _decrire(self, k: int) -> Dict:
+        """Signature, nom lisible et échantillons CSV d'un cluster"""
+        cluster = self._clusters[k]
+        ecarts = self._centroides[k] - self._reference()
+        principaux = np.argsort(-np.abs(ecarts))[:2]
+        tendances = ', '.join(f"{CAPTEURS[i]} {'↑' if ecarts[i] > 0 else '↓'}" for i in principaux)
+
+        tampon = io.StringIO()
+        writer = csv.DictWriter(tampon, fieldnames=['timestamp', 'diagnostic_id', *CAPTEURS])
+        writer.writeheader()
+        writer.writerows(cluster['echantillons'])
+
+        return {
+            'signature': f"cluster_{cluster['id']:04d}",
+            'name': f"Signature inconnue #{cluster['id']} ({tendances})",
+            'count': int(self._effectifs[k]),
+            'csv_content': tampon.getvalue(),
+            'capteurs_affectes': [CAPTEURS[i] for i in principaux],
+            'centroide': {c: round(float(_MIN[i] + self._centroides[k][i] * _ETENDUE[i]), 2)
+                          for i, c in enumerate(CAPTEURS)}
+        }
+
+    def exporter(self) -> Dict:
+        """Etat sérialisable en JSON (le lot en attente n'est pas persisté)"""
+        with self._verrou:
+            return {
+                'centroides': self._centroides.tolist(),
+                'effectifs': self._effectifs.tolist(),
+                'clusters': self._clusters,
+                'prochain_id': self._prochain_id,
+                'somme_reference': self._somme_reference.tolist(),
+                'nb_reference': self._nb_reference
+            }
+
+    def importer(self, etat: Dict):
+        """Recharge un état produit par `exporter()`"""
+        with self._verrou:
+            if etat.get('clusters'):
+                self._centroides = np.array(etat['centroides'], dtype=np.float64).reshape(-1, len(CAPTEURS))
+                self._effectifs = np.array(etat['effectifs'], dtype=np.int64)
+                self._clusters = etat['clusters']
+            self._prochain_id = etat.get('prochain_id', self._prochain_id)
+            if etat.get('somme_reference'):
+                self._somme_reference = np.array(etat['somme_reference'], dtype=np.float64)
+                self._nb_reference = etat.get('nb_reference', 0)
@@ -0,0 +1,154 @@
+"""
+Échantillonnage du jeu d'entraînement - Réservoirs équilibrés par classe
+"""
+
+import io
+import csv
+import random
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from services.dataset_segments import COLONNES_DATASET
+
+logger = logging.getLogger(__name__)
+
+CLASSE_NORMALE = 'Aucune'
+
+
+def parser_quotas(texte: str) -> Dict[str, int]:
+    """
+    Convertit "classe:quota,classe:quota" en dict
+
+    Exemple: parser_quotas('Aucune:5000,fuite_fluide:2000')
+
+    Raises:
+        ValueError: Si le format est invalide
+    """
+    quotas = {}
+    for morceau in filter(None, (m.strip() for m in (texte or '').split(','))):
+        classe, _, quota = morceau.rpartition(':')
+        try:
+            quotas[classe.strip()] = int(quota)
+        except ValueError:
+            raise ValueError(f"Quota invalide: {morceau} (attendu: classe:nombre)")
+        if not classe.strip():
+            raise ValueError(f"Quota invalide: {morceau} (classe manquante)")
+    return quotas
+
+
+class ReservoirParClasse:
+    """
+    Un réservoir (algorithme R) par classe de panne
+
+    Chaque classe garde au plus son quota de lignes, tirées uniformément parmi
+    toutes celles vues: le jeu d'entraînement reste borné et équilibré quelle
+    que soit la taille du parc, sans relire l'historique. Mise à jour en O(1).
+    """
+
+    def __init__(self,
+                 quota_normal: int = 5000,
+                 quota_panne: int = 1000,
+                 quotas: Optional[Dict[str, int]] = None,
+                 graine: Optional[int] = None):
+        """
+        Initialise les réservoirs
+
+        Args:
+            quota_normal: Lignes conservées pour les relevés sans panne
+            quota_panne: Lignes conservées par type de panne (défaut)
+            quotas: Quotas spécifiques par classe (prioritaires)
+            graine: Graine du tirage (tests)
+        """
+        self.quotas = {CLASSE_NORMALE: quota_normal, **(quotas or {})}
+        self.quota_panne = quota_panne
+
+        self._verrou = threading.Lock()
+        self._aleatoire = random.Random(graine)
+        self._reservoirs: Dict[str, List[Dict]] = {}
+        self._vus: Dict[str, int] = {}
+
+    def quota(self, classe: str) -> int:
+        """Quota de lignes d'une classe"""
+        return self.quotas.get(classe, self.quota_panne)
+
+    def ajouter(self, ligne: Dict) -> None:
+        """
+        Propose une ligne du dataset au réservoir de sa classe
+
+        Args:
+            ligne: Ligne du dataset (panne_detectee, type_panne, capteurs...)
+        """
+        classe = ligne.get('type_panne') if ligne.get('panne_detectee') else None
+        classe = classe or CLASSE_NORMALE
+        quota = self.quota(classe)
+
+        with self._verrou:
+            reservoir = self._reservoirs.setdefault(classe, [])
+            vus = self._vus[classe] = self._vus.get(classe, 0) + 1
+            if len(reservoir) < quota:
+                reservoir.append(ligne)
+            else:
+                j = self._aleatoire.randrange(vus)
+                if j < quota:
+                    reservoir[j] = ligne
+
+    def __len__(self) -> int:
+        with self._verrou:
+            return sum(len(r) for r in self._reservoirs.values())
+
+    def repartition(self) -> Dict[str, Dict[str, int]]:
+        """Lignes conservées / vues par classe"""
+        with self._verrou:
+            return {
+                classe: {'conservees': len(reservoir), 'vues': self._vus.get(classe, 0), 'quota': self.quota(classe)}
+                for classe, reservoir in self._reservoirs.items()
+            }
+
+    def lignes_ponderees(self) -> List[Tuple[Dict, float]]:
+        """
+        Lignes des réservoirs avec leur poids (vues / conservées de leur classe)
+
+        Returns:
+            Liste (ligne, poids): la somme pondérée reflète le mélange réel
+            des classes plutôt que l'équilibrage des quotas
+        """
+        with self._verrou:
+            return [
+                (ligne, self._vus.get(classe, len(reservoir)) / len(reservoir))
+                for classe, reservoir in self._reservoirs.items() if reservoir
+                for ligne in reservoir
+            ]
+
+    def contenu_csv(self, colonnes: Optional[List[str]] = None) -> str:
+        """
+        Jeu d'entraînement borné au format CSV
+
+        Args:
+            colonnes: Colonnes exportées (défaut: colonnes du dataset)
+
+        Returns:
+            Contenu CSV (en-tête + toutes les lignes des réservoirs)
+        """
+        with self._verrou:
+            lignes = [ligne for reservoir in self._reservoirs.values() for ligne in reservoir]
+
+        tampon = io.StringIO()
+        writer = csv.DictWriter(tampon, fieldnames=colonnes or COLONNES_DATASET, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(lignes)
+        return tampon.getvalue()
+
+    def exporter(self) -> Dict:
+        """Etat sérialisable en JSON"""
+        with self._verrou:
+            return {'reservoirs': {c: list(r) for c, r in self._reservoirs.items()}, 'vus': dict(self._vus)}
+
+    def importer(self, etat: Dict):
+        """Recharge un état produit par `exporter()` (quotas courants appliqués)"""
+        with self._verrou:
+            self._vus = dict(etat.get('vus', {}))
+            self._reservoirs = {
+                classe: lignes[:self.quota(classe)]
+                for classe, lignes in etat.get('reservoirs', {}).items()
+            }
@@ -0,0 +1,145 @@
+"""
+Export du dataset d'apprentissage - Flux CSV / NDJSON / Parquet par morceaux
+"""
+
+import io
+import csv
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List
+
+from services.dataset_segments import convertir_ligne
+from utils.validation import SEUILS_VALIDES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optionnel: export Parquet indisponible
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+FORMATS_EXPORT = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def _par_morceaux(lignes: Iterable[Dict], taille: int) -> Iterator[List[Dict]]:
+    morceau = []
+    for ligne in lignes:
+        morceau.append(ligne)
+        if len(morceau) >= taille:
+            yield morceau
+            morceau = []
+    if morceau:
+        yield morceau
+
+
+def exporter_csv(lignes: Iterable[Dict[str, str]], colonnes: List[str],
+                 taille_morceau: int = 1000) -> Iterator[bytes]:
+    """
+    Flux CSV (en-tête puis un morceau de `taille_morceau` lignes à la fois)
+
+    Args:
+        lignes: Lignes texte du dataset
+        colonnes: Colonnes à exporter (projection)
+        taille_morceau: Lignes par morceau émis
+    """
+    tampon = io.StringIO()
+    writer = csv.writer(tampon)
+    writer.writerow(colonnes)
+    yield ('﻿' + tampon.getvalue()).encode('utf-8')
+
+    for morceau in _par_morceaux(lignes, taille_morceau):
+        tampon.seek(0)
+        tampon.truncate()
+        writer.writerows([ligne.get(c, '') for c in colonnes] for ligne in morceau)
+        yield tampon.getvalue().encode('utf-8')
+
+
+def exporter_ndjson(lignes: Iterable[Dict[str, str]], colonnes: List[str],
+                    taille_morceau: int = 1000) -> Iterator[bytes]:
+    """
+    Flux NDJSON typé (un objet JSON par ligne)
+
+    Args:
+        lignes: Lignes texte du dataset
+        colonnes: Colonnes à exporter (projection)
+        taille_morceau: Lignes par morceau émis
+    """
+    for morceau in _par_morceaux(lignes, taille_morceau):
+        yield ''.join(
+            json.dumps(convertir_ligne({c: ligne.get(c, '') for c in colonnes}), ensure_ascii=False) + '\n'
+            for ligne in morceau
+        ).encode('utf-8')
+
+
+class _TamponFlux:
+    """Fichier en écriture seule vidé à chaque morceau (sink pour ParquetWriter)"""
+
+    def __init__(self):
+        self._morceaux = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, donnees) -> int:
+        donnees = bytes(donnees)
+        self._morceaux.append(donnees)
+        self._position += len(donnees)
+        return len(donnees)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vider(self) -> bytes:
+        donnees = b''.join(self._morceaux)
+        self._morceaux = []
+        return donnees
+
+
+def exporter_parquet(lignes: Iterable[Dict[str, str]], colonnes: List[str],
+                     taille_morceau: int = 10000) -> Iterator[bytes]:
+    """
+    Flux Parquet: un row group par morceau, émis dès qu'il est écrit
+
+    Args:
+        lignes: Lignes texte du dataset
+        colonnes: Colonnes à exporter (projection)
+        taille_morceau: Lignes par row group
+
+    Raises:
+        RuntimeError: Si pyarrow n'est pas installé
+    """
+    if pa is None:
+        raise RuntimeError("Export Parquet indisponible: pyarrow non installé")
+
+    def type_colonne(colonne):
+        if colonne == 'panne_detectee':
+            return pa.bool_()
+        if colonne == 'score_confiance' or colonne in SEUILS_VALIDES:
+            return pa.float64()
+        return pa.string()
+
+    schema = pa.schema([(c, type_colonne(c)) for c in colonnes])
+
+    sink = _TamponFlux()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for morceau in _par_morceaux(lignes, taille_morceau):
+            typees = [convertir_ligne({c: ligne.get(c, '') for c in colonnes}) for ligne in morceau]
+            table = pa.Table.from_pylist(typees, schema=schema)
+            writer.write_table(table)
+            yield sink.vider()
+    finally:
+        writer.close()
+    yield sink.vider()
+
@@ -0,0 +1,226 @@
+"""
+Statistiques incrémentales - Agrégats par minute / heure / jour
+"""
+
+import math
+import time
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Granularités: (nom, durée d'un bucket en secondes, nombre de buckets conservés)
+GRANULARITES = (
+    ('minute', 60, 180),       # 3 heures
+    ('heure', 3600, 24 * 8),   # 8 jours
+    ('jour', 86400, 400),      # ~13 mois
+)
+
+DIMENSIONS = ('type_panne', 'localisation', 'source')
+
+# Historique couvert par la granularité la plus longue
+DUREE_MAX = max(duree * taille for _, duree, taille in GRANULARITES)
+
+
+def _bucket_vide(debut: int) -> Dict:
+    return {
+        'debut': debut,
+        'total': 0,
+        'pannes': 0,
+        'par_dimension': {dim: {'total': Counter(), 'pannes': Counter()} for dim in DIMENSIONS}
+    }
+
+
+class AgregateurStatistiques:
+    """
+    Agrégats glissants des diagnostics par type de panne, localisation et source
+
+    Chaque diagnostic met à jour en O(1) un bucket par granularité (anneau de
+    buckets indexé par temps). Une requête sur une fenêtre lit au plus
+    quelques centaines de buckets, quel que soit le volume de diagnostics.
+
+    Les agrégats sont dérivés du dataset: `position` est la dernière ligne
+    du dataset comptabilisée, d'où reprendre après un redémarrage.
+
+    Les horodatages viennent des équipements et peuvent arriver en retard:
+    un relevé plus ancien que la période couverte par l'anneau (ou que le
+    bucket qui occupe son slot) est ignoré pour cette granularité, sans
+    effacer les buckets récents.
+    """
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._anneaux = {nom: [None] * taille for nom, _, taille in GRANULARITES}
+        self._plus_recent = {nom: None for nom, _, _ in GRANULARITES}  # début du bucket le plus récent
+        self.position: Optional[Tuple[int, int, int]] = None
+
+    def ajouter(self, type_panne: Optional[str], localisation: Optional[str],
+                source: Optional[str], panne_detectee: bool, horodatage: Optional[float] = None):
+        """
+        Comptabilise un diagnostic
+
+        Args:
+            type_panne: Type de panne prédit (None si aucune)
+            localisation: Localisation de l'équipement
+            source: Capteur / équipement source
+            panne_detectee: Panne détectée ou non
+            horodatage: Epoch du diagnostic (défaut: maintenant)
+        """
+        horodatage = time.time() if horodatage is None else horodatage
+        valeurs = {
+            'type_panne': type_panne or 'Aucune',
+            'localisation': localisation or 'Zone non spécifiée',
+            'source': source or 'inconnue'
+        }
+
+        with self._verrou:
+            for nom, duree, taille in GRANULARITES:
+                debut = int(horodatage // duree) * duree
+                anneau = self._anneaux[nom]
+                position = (debut // duree) % taille
+
+                recent = self._plus_recent[nom]
+                if recent is not None and debut <= recent - duree * taille:
+                    continue  # hors de la période couverte
+
+                bucket = anneau[position]
+                if bucket is not None and debut < bucket['debut']:
+                    continue  # slot déjà repris par un bucket plus récent
+                if bucket is None or debut > bucket['debut']:
+                    bucket = anneau[position] = _bucket_vide(debut)
+                    if recent is None or debut > recent:
+                        self._plus_recent[nom] = debut
+
+                bucket['total'] += 1
+                if panne_detectee:
+                    bucket['pannes'] += 1
+                for dim, valeur in valeurs.items():
+                    bucket['par_dimension'][dim]['total'][valeur] += 1
+                    if panne_detectee:
+                        bucket['par_dimension'][dim]['pannes'][valeur] += 1
+
+    def ajouter_ligne(self, ligne: Dict, position: Optional[Tuple[int, int, int]] = None) -> bool:
+        """
+        Comptabilise une ligne du dataset
+
+        Args:
+            ligne: Ligne du dataset (valeurs typées ou texte)
+            position: Position de la ligne dans le dataset
+
+        Returns:
+            False si la ligne n'a pas de timestamp exploitable
+        """
+        try:
+            horodatage = datetime.fromisoformat(str(ligne.get('timestamp'))).timestamp()
+        except ValueError:
+            return False
+
+        panne_detectee = ligne.get('panne_detectee') in (True, 'True')
+        self.ajouter(
+            ligne.get('type_panne') if panne_detectee else None,
+            ligne.get('localisation'),
+            ligne.get('source'),
+            panne_detectee,
+            horodatage
+        )
+        if position is not None:
+            with self._verrou:
+                self.position = max(self.position or position, tuple(position))
+        return True
+
+    def requete(self, fenetre: int, group_by: Optional[str] = None,
+                maintenant: Optional[float] = None) -> Dict:
+        """
+        Agrège les diagnostics des `fenetre` dernières secondes
+
+        Args:
+            fenetre: Durée de la fenêtre en secondes
+            group_by: Dimension de regroupement (type_panne, localisation, source)
+            maintenant: Epoch de fin de fenêtre (défaut: maintenant)
+
+        Returns:
+            Totaux de la fenêtre, et par groupe si demandé
+
+        Raises:
+            ValueError: Si group_by ou la fenêtre est invalide
+        """
+        if group_by is not None and group_by not in DIMENSIONS:
+            raise ValueError(f"group_by invalide: {group_by} (attendu: {', '.join(DIMENSIONS)})")
+
+        maintenant = time.time() if maintenant is None else maintenant
+
+        # Granularité la plus fine qui couvre toute la fenêtre
+        for nom, duree, taille in GRANULARITES:
+            if fenetre <= duree * taille:
+                break
+        else:
+            raise ValueError(f"Fenêtre trop longue: {fenetre}s (max {duree * taille}s)")
+
+        nb_buckets = math.ceil(fenetre / duree)
+        dernier = int(maintenant // duree) * duree
+        premier = dernier - (nb_buckets - 1) * duree
+
+        total = pannes = 0
+        groupes_total, groupes_pannes = Counter(), Counter()
+
+        with self._verrou:
+            anneau = self._anneaux[nom]
+            for debut in range(premier, dernier + 1, duree):
+                bucket = anneau[(debut // duree) % taille]
+                if bucket is None or bucket['debut'] != debut:
+                    continue
+                total += bucket['total']
+                pannes += bucket['pannes']
+                if group_by:
+                    groupes_total.update(bucket['par_dimension'][group_by]['total'])
+                    groupes_pannes.update(bucket['par_dimension'][group_by]['pannes'])
+
+        resultat = {
+            'fenetre_secondes': fenetre,
+            'granularite': nom,
+            'debut': premier,
+            'total_diagnostics': total,
+            'total_pannes_detectees': pannes,
+            'taux_pannes': (pannes / total * 100) if total > 0 else 0
+        }
+
+        if group_by:
+            resultat['group_by'] = group_by
+            resultat['groupes'] = {
+                cle: {
+                    'total_diagnostics': n,
+                    'total_pannes_detectees': groupes_pannes.get(cle, 0),
+                    'taux_pannes': groupes_pannes.get(cle, 0) / n * 100
+                }
+                for cle, n in groupes_total.most_common()
+            }
+
+        return resultat
+
+    def exporter(self) -> Dict:
+        """Etat sérialisable en JSON (buckets non vides et position dans le dataset)"""
+        with self._verrou:
+            return {
+                **{nom: [b for b in anneau if b is not None] for nom, anneau in self._anneaux.items()},
+                'position': self.position
+            }
+
+    def importer(self, etat: Dict):
+        """Recharge un état produit par `exporter()`"""
+        with self._verrou:
+            self.position = tuple(etat['position']) if etat.get('position') else None
+            for nom, duree, taille in GRANULARITES:
+                for bucket in etat.get(nom, []):
+                    bucket['par_dimension'] = {
+                        dim: {
+                            'total': Counter(bucket['par_dimension'].get(dim, {}).get('total', {})),
+                            'pannes': Counter(bucket['par_dimension'].get(dim, {}).get('pannes', {}))
+                        }
+                        for dim in DIMENSIONS
+                    }
+                    self._anneaux[nom][(bucket['debut'] // duree) % taille] = bucket
+                debuts = [b['debut'] for b in self._anneaux[nom] if b is not None]
+                self._plus_recent[nom] = max(debuts) if debuts else None
@@ -0,0 +1,266 @@
+"""
+Surveillance de dérive - Déclenche le réentraînement sur changement réel des données
+"""
+
+import time
+import logging
+import threading
+from collections import Counter, deque
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from services.decouverte_pannes import CAPTEURS, normaliser_capteurs
+
+logger = logging.getLogger(__name__)
+
+NB_CLASSES_HISTO = 20
+_EPSILON = 1e-4
+
+
+def indice_psi(observe: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """
+    Population Stability Index entre histogrammes (sur le dernier axe)
+
+    Args:
+        observe: Effectifs de la fenêtre courante
+        reference: Effectifs de la référence
+
+    Returns:
+        PSI (< 0.1 stable, 0.1-0.25 modéré, > 0.25 dérive forte)
+    """
+    p = observe / np.maximum(observe.sum(axis=-1, keepdims=True), 1)
+    q = reference / np.maximum(reference.sum(axis=-1, keepdims=True), 1)
+    p, q = np.maximum(p, _EPSILON), np.maximum(q, _EPSILON)
+    return ((p - q) * np.log(p / q)).sum(axis=-1)
+
+
+def statistique_ks(observe: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """Distance de Kolmogorov-Smirnov entre histogrammes (écart max des CDF)"""
+    p = observe.cumsum(axis=-1) / np.maximum(observe.sum(axis=-1, keepdims=True), 1)
+    q = reference.cumsum(axis=-1) / np.maximum(reference.sum(axis=-1, keepdims=True), 1)
+    return np.abs(p - q).max(axis=-1)
+
+
+class MoniteurDerive:
+    """
+    Compare une fenêtre glissante des capteurs et des prédictions à la
+    distribution de référence du dernier entraînement
+
+    Chaque relevé met à jour en O(capteurs) les histogrammes de la fenêtre
+    (valeurs discrétisées sur les plages de SEUILS_VALIDES). Toutes les
+    `intervalle` mesures, PSI et KS par capteur et PSI du mélange de labels
+    sont calculés. Un capteur dérive si son PSI (ampleur) dépasse le seuil et
+    que son KS est significatif (le PSI seul est bruité sur petite fenêtre).
+    Le réentraînement n'est demandé qu'en cas de dérive, au
+    plus une fois par `cooldown` secondes.
+
+    La référence est construite à partir du jeu d'entraînement fourni par
+    `source_reference` (relevés pondérés), à la première fenêtre complète
+    puis à chaque réentraînement. Sans jeu d'entraînement suffisant, la
+    fenêtre courante sert de référence.
+    """
+
+    def __init__(self,
+                 taille_fenetre: int = 1000,
+                 intervalle: int = 100,
+                 seuil_psi: float = 0.2,
+                 seuil_ks: float = 0.1,
+                 seuil_psi_labels: float = 0.2,
+                 cooldown: float = 6 * 3600,
+                 source_reference: Optional[Callable[[], Iterable[Tuple[Dict, Optional[str], float]]]] = None):
+        """
+        Initialise le moniteur
+
+        Args:
+            taille_fenetre: Relevés de la fenêtre glissante (et minimum du jeu de référence)
+            intervalle: Relevés entre deux vérifications
+            seuil_psi: PSI d'un capteur au-delà duquel il y a dérive
+            seuil_ks: Distance KS minimale (en plus du seuil statistique) pour une dérive capteur
+            seuil_psi_labels: PSI du mélange de labels prédits au-delà duquel il y a dérive
+            cooldown: Délai minimal (secondes) entre deux réentraînements
+            source_reference: Fonction -> [(capteurs, label, poids)] du jeu d'entraînement
+        """
+        self.taille_fenetre = max(10, int(taille_fenetre))
+        self.intervalle = max(1, int(intervalle))
+        self.seuil_psi = seuil_psi
+        self.seuil_ks = seuil_ks
+        self.seuil_psi_labels = seuil_psi_labels
+        self.cooldown = cooldown
+        self.source_reference = source_reference
+
+        self._verrou = threading.Lock()
+        dimension = len(CAPTEURS)
+        self._lignes = np.arange(dimension)
+        self._fenetre = deque()
+        self._histo = np.zeros((dimension, NB_CLASSES_HISTO), dtype=np.int64)
+        self._labels = Counter()
+        self._histo_reference: Optional[np.ndarray] = None  # effectifs (pondérés) en float
+        self._labels_reference = Counter()
+        self._depuis_verification = 0
+        self._dernier_retraining = 0.0
+        self.dernier_rapport: Optional[Dict] = None
+
+    def observer(self, donnees_capteurs: Dict, label: Optional[str],
+                 maintenant: Optional[float] = None) -> Optional[Dict]:
+        """
+        Ajoute un relevé à la fenêtre et vérifie la dérive si c'est le moment
+
+        Args:
+            donnees_capteurs: Valeurs des capteurs
+            label: Type de panne prédit (None si aucune)
+            maintenant: Epoch courant (défaut: maintenant)
+
+        Returns:
+            Rapport de dérive si une vérification a eu lieu, sinon None
+        """
+        maintenant = time.time() if maintenant is None else maintenant
+        classes = self._classes(donnees_capteurs)
+        presents = classes >= 0
+        label = label or 'Aucune'
+
+        with self._verrou:
+            self._fenetre.append((classes, label))
+            self._histo[self._lignes[presents], classes[presents]] += 1
+            self._labels[label] += 1
+
+            if len(self._fenetre) > self.taille_fenetre:
+                anciennes, ancien_label = self._fenetre.popleft()
+                valides = anciennes >= 0
+                self._histo[self._lignes[valides], anciennes[valides]] -= 1
+                self._labels[ancien_label] -= 1
+                if not self._labels[ancien_label]:
+                    del self._labels[ancien_label]
+
+            if len(self._fenetre) < self.taille_fenetre:
+                return None
+
+            if self._histo_reference is None:
+                self._definir_reference(maintenant, retraining=False)
+                return None
+
+            self._depuis_verification += 1
+            if self._depuis_verification < self.intervalle:
+                return None
+            self._depuis_verification = 0
+
+            rapport = self._comparer()
+            if rapport['derive']:
+                attente = self._dernier_retraining + self.cooldown - maintenant
+                if attente > 0:
+                    rapport['derive'] = False
+                    rapport['cooldown_restant'] = round(attente)
+                else:
+                    logger.info(f"📉 Dérive détectée: {', '.join(rapport['raisons'])}")
+                    self._definir_reference(maintenant, retraining=True)
+            self.dernier_rapport = rapport
+            return rapport
+
+    def _comparer(self) -> Dict:
+        psi = indice_psi(self._histo, self._histo_reference)
+        ks = statistique_ks(self._histo, self._histo_reference)
+
+        # Seuil KS à alpha = 0.001, relevé par le minimum pratique seuil_ks
+        n = np.maximum(self._histo.sum(axis=1), 1)
+        m = np.maximum(self._histo_reference.sum(axis=1), 1)
+        ks_critique = np.maximum(1.95 * np.sqrt((n + m) / (n * m)), self.seuil_ks)
+
+        labels = sorted(set(self._labels) | set(self._labels_reference))
+        psi_labels = float(indice_psi(
+            np.array([self._labels.get(l, 0) for l in labels], dtype=np.float64),
+            np.array([self._labels_reference.get(l, 0) for l in labels], dtype=np.float64)
+        )) if labels else 0.0
+
+        raisons = [
+            f"{c} (PSI {psi[i]:.2f}, KS {ks[i]:.2f})"
+            for i, c in enumerate(CAPTEURS)
+            if psi[i] > self.seuil_psi and ks[i] > ks_critique[i]
+        ]
+        if psi_labels > self.seuil_psi_labels:
+            raisons.append(f"labels (PSI {psi_labels:.2f})")
+
+        return {
+            'derive': bool(raisons),
+            'raisons': raisons,
+            'capteurs': {
+                c: {'psi': round(float(psi[i]), 4), 'ks': round(float(ks[i]), 4)}
+                for i, c in enumerate(CAPTEURS)
+            },
+            'psi_labels': round(psi_labels, 4),
+            'labels_fenetre': dict(self._labels)
+        }
+
+    @staticmethod
+    def _classes(donnees_capteurs: Dict) -> np.ndarray:
+        """Classe d'histogramme de chaque capteur (-1 si absent)"""
+        position = normaliser_capteurs(donnees_capteurs)
+        classes = np.clip(np.nan_to_num(position) * NB_CLASSES_HISTO, 0, NB_CLASSES_HISTO - 1).astype(np.int64)
+        classes[np.isnan(position)] = -1
+        return classes
+
+    def _reference_entrainement(self) -> Optional[Tuple[np.ndarray, Counter]]:
+        """
+        Histogrammes du jeu d'entraînement, ramenés à son nombre de relevés
+        (les poids corrigent l'équilibrage par classe)
+        """
+        if self.source_reference is None:
+            return None
+        try:
+            releves = list(self.source_reference())
+        except Exception as e:
+            logger.warning(f"⚠️ Jeu d'entraînement indisponible pour la référence de dérive: {e}")
+            return None
+        if len(releves) < self.taille_fenetre:
+            return None
+
+        histo = np.zeros(self._histo.shape, dtype=np.float64)
+        labels = Counter()
+        for donnees_capteurs, label, poids in releves:
+            classes = self._classes(donnees_capteurs)
+            presents = classes >= 0
+            histo[self._lignes[presents], classes[presents]] += poids
+            labels[label or 'Aucune'] += poids
+
+        echelle = len(releves) / max(sum(labels.values()), _EPSILON)
+        return histo * echelle, Counter({l: n * echelle for l, n in labels.items()})
+
+    def _definir_reference(self, maintenant: float, retraining: bool):
+        reference = self._reference_entrainement()
+        if reference is not None:
+            self._histo_reference, self._labels_reference = reference
+            origine = f"jeu d'entraînement, {round(sum(self._labels_reference.values()))} relevés"
+        else:
+            self._histo_reference = self._histo.astype(np.float64)
+            self._labels_reference = Counter(self._labels)
+            origine = f"fenêtre courante, {len(self._fenetre)} relevés"
+        logger.info(f"📐 Référence de dérive définie ({origine})")
+        self._depuis_verification = 0
+        if retraining:
+            self._dernier_retraining = maintenant
+
+    def exporter(self) -> Dict:
+        """Etat sérialisable en JSON (référence + fenêtre)"""
+        with self._verrou:
+            return {
+                'fenetre': [[classes.tolist(), label] for classes, label in self._fenetre],
+                'histo_reference': None if self._histo_reference is None else self._histo_reference.tolist(),
+                'labels_reference': dict(self._labels_reference),
+                'dernier_retraining': self._dernier_retraining
+            }
+
+    def importer(self, etat: Dict):
+        """Recharge un état produit par `exporter()`"""
+        with self._verrou:
+            self._fenetre.clear()
+            self._histo[:] = 0
+            self._labels.clear()
+            for classes, label in etat.get('fenetre', [])[-self.taille_fenetre:]:
+                classes = np.array(classes, dtype=np.int64)
+                valides = classes >= 0
+                self._fenetre.append((classes, label))
+                self._histo[self._lignes[valides], classes[valides]] += 1
+                self._labels[label] += 1
+            if etat.get('histo_reference') is not None:
+                self._histo_reference = np.array(etat['histo_reference'], dtype=np.float64)
+            self._labels_reference = Counter(etat.get('labels_reference', {}))
+            self._dernier_retraining = etat.get('dernier_retraining', 0.0)
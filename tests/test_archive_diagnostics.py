@@ -0,0 +1,70 @@
+"""
+Tests de l'archive circulaire des diagnostics
+"""
+
+import os
+
+from services.archive_diagnostics import ArchiveDiagnostics
+
+
+def test_archive_circulaire_et_index(tmp_path):
+    """Test écrasement des plus anciens et lecture par ID / par source"""
+    archive = ArchiveDiagnostics(tmp_path / 'archive.bin', capacite=4, taille_slot=512)
+    for i in range(6):
+        archive.ajouter({'diagnostic_id': f'DIAG_{i}', 'source': f'frigo_{i % 2}'})
+
+    assert len(archive) == 4
+    assert archive.obtenir('DIAG_1') is None
+    assert archive.obtenir('DIAG_5')['source'] == 'frigo_1'
+    assert [d['diagnostic_id'] for d in archive.derniers('frigo_0')] == ['DIAG_4', 'DIAG_2']
+    assert [d['diagnostic_id'] for d in archive.derniers(limite=2)] == ['DIAG_5', 'DIAG_4']
+
+
+def test_archive_reouverture(tmp_path):
+    """Test reconstruction de l'index à la réouverture du fichier"""
+    fichier = tmp_path / 'archive.bin'
+    archive = ArchiveDiagnostics(fichier, capacite=3, taille_slot=512)
+    for i in range(5):
+        archive.ajouter({'diagnostic_id': f'DIAG_{i}', 'source': 'frigo', 'Température': -18 + i})
+    archive.fermer()
+
+    archive = ArchiveDiagnostics(fichier, capacite=3, taille_slot=512)
+    assert archive.obtenir('DIAG_3')['Température'] == -15
+    assert [d['diagnostic_id'] for d in archive.derniers('frigo')] == ['DIAG_4', 'DIAG_3', 'DIAG_2']
+
+
+def test_archive_partagee_entre_processus(tmp_path):
+    """Test séquences distinctes et lectures croisées entre deux processus"""
+    fichier = tmp_path / 'archive.bin'
+    archive = ArchiveDiagnostics(fichier, capacite=8, taille_slot=512)
+    archive.ajouter({'diagnostic_id': 'DIAG_parent_0', 'source': 'frigo'})
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            archive.ajouter({'diagnostic_id': 'DIAG_enfant', 'source': 'frigo'})
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    archive.ajouter({'diagnostic_id': 'DIAG_parent_1', 'source': 'frigo'})
+    assert archive.obtenir('DIAG_enfant')['source'] == 'frigo'
+    assert [d['diagnostic_id'] for d in archive.derniers('frigo')] == \
+        ['DIAG_parent_1', 'DIAG_enfant', 'DIAG_parent_0']
+
+    autre = ArchiveDiagnostics(fichier, capacite=8, taille_slot=512)
+    autre.ajouter({'diagnostic_id': 'DIAG_autre', 'source': 'frigo'})
+    assert archive.obtenir('DIAG_autre') is not None
+    assert len(archive) == 4
+
+
+def test_archive_diagnostic_trop_volumineux_tronque(tmp_path):
+    """Test un diagnostic plus grand qu'un slot est archivé sans ses champs volumineux"""
+    archive = ArchiveDiagnostics(tmp_path / 'archive.bin', capacite=4, taille_slot=512)
+    assert archive.ajouter({'diagnostic_id': 'DIAG_0', 'source': 'frigo', 'type_panne': 'givrage',
+                            'explication': 'x' * 2000})
+
+    diagnostic = archive.obtenir('DIAG_0')
+    assert diagnostic['type_panne'] == 'givrage'
+    assert diagnostic['_tronque'] == ['explication']
+    assert 'explication' not in diagnostic
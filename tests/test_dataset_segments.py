@@ -0,0 +1,104 @@
+"""
+Tests du dataset segmenté et compressé
+"""
+
+import os
+
+from services.dataset_segments import DatasetSegmente, decoder_position, encoder_position
+
+
+def _timestamp(i):
+    return f"2025-01-01T10:{i // 60:02d}:{i % 60:02d}"
+
+
+def test_scellement_et_lecture_par_plage(tmp_path):
+    """Test compression des segments pleins et lecture d'une plage de temps"""
+    dataset = DatasetSegmente(tmp_path, lignes_par_segment=50, lignes_par_bloc=10, codec='gzip')
+    for i in range(120):
+        dataset.ajouter({'timestamp': _timestamp(i), 'diagnostic_id': f'DIAG_{i}', 'Température': -18})
+
+    stats = dataset.statistiques()
+    assert stats['segments_scelles'] == 2
+    assert stats['lignes'] == 120
+    assert len(list(tmp_path.glob('*.csv.gz'))) == 2
+
+    lignes = list(dataset.lire(_timestamp(45), _timestamp(55)))
+    assert [l['diagnostic_id'] for l in lignes] == [f'DIAG_{i}' for i in range(45, 56)]
+    assert lignes[0]['Température'] == '-18'
+
+
+def test_retention_des_segments(tmp_path):
+    """Test suppression des segments les plus anciens au-delà de max_segments"""
+    dataset = DatasetSegmente(tmp_path, lignes_par_segment=10, lignes_par_bloc=5,
+                              max_segments=2, codec='gzip')
+    for i in range(45):
+        dataset.ajouter({'timestamp': _timestamp(i), 'diagnostic_id': f'DIAG_{i}'})
+    dataset.fermer()
+
+    dataset = DatasetSegmente(tmp_path, lignes_par_segment=10, lignes_par_bloc=5,
+                              max_segments=2, codec='gzip')
+    ids = [l['diagnostic_id'] for l in dataset.lire()]
+    assert ids == [f'DIAG_{i}' for i in range(20, 45)]
+
+
+def test_reprise_par_curseur(tmp_path):
+    """Test pagination: reprise après une position, y compris après scellement"""
+    dataset = DatasetSegmente(tmp_path, lignes_par_segment=20, lignes_par_bloc=5, codec='gzip')
+    for i in range(15):
+        dataset.ajouter({'timestamp': _timestamp(i), 'diagnostic_id': f'DIAG_{i}'})
+
+    page = [p for p, _ in zip(dataset.parcourir(), range(7))]
+    position = decoder_position(encoder_position(page[-1][0]))
+
+    # Le segment actif est scellé entre deux pages
+    for i in range(15, 25):
+        dataset.ajouter({'timestamp': _timestamp(i), 'diagnostic_id': f'DIAG_{i}'})
+
+    suite = [l['diagnostic_id'] for _, l in dataset.parcourir(apres=position)]
+    assert suite == [f'DIAG_{i}' for i in range(7, 25)]
+
+
+def test_import_legacy_latin1(tmp_path):
+    """Test import d'un ancien CSV latin-1 hors du dataset, puis renommage"""
+    legacy = tmp_path / 'dataset.csv'
+    lignes = ['timestamp,diagnostic_id,localisation'] + \
+        [f'{_timestamp(i)},DIAG_{i},Chambre froide n°{i}' for i in range(25)]
+    legacy.write_bytes('\n'.join(lignes).encode('latin-1'))
+
+    dataset = DatasetSegmente(tmp_path / 'segments', lignes_par_segment=10, lignes_par_bloc=5,
+                              codec='gzip', fichier_legacy=str(legacy))
+    assert dataset.nombre_lignes == 25
+    assert not (tmp_path / 'segments' / '.import').exists()
+    assert (tmp_path / 'dataset.csv.migre').exists()
+    assert list(dataset.lire())[24]['localisation'] == 'Chambre froide n°24'
+
+    dataset.ajouter({'timestamp': _timestamp(30), 'diagnostic_id': 'DIAG_30'})
+    dataset.fermer()
+    assert DatasetSegmente(tmp_path / 'segments', lignes_par_segment=10, lignes_par_bloc=5,
+                           codec='gzip').nombre_lignes == 26
+
+
+def test_ecritures_concurrentes_de_plusieurs_processus(tmp_path):
+    """Test workers forkés: aucune ligne ni segment perdu au scellement"""
+    dataset = DatasetSegmente(tmp_path, lignes_par_segment=7, lignes_par_bloc=3, codec='gzip')
+    dataset.ajouter({'timestamp': _timestamp(0), 'diagnostic_id': 'DIAG_parent'})
+
+    enfants = []
+    for w in range(4):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                for i in range(25):
+                    dataset.ajouter({'timestamp': _timestamp(i), 'diagnostic_id': f'DIAG_{w}_{i}'})
+            finally:
+                os._exit(0)
+        enfants.append(pid)
+    for pid in enfants:
+        assert os.waitpid(pid, 0)[1] == 0
+
+    identifiants = [ligne['diagnostic_id'] for ligne in dataset.lire()]
+    assert dataset.nombre_lignes == 101
+    assert sorted(identifiants) == sorted(['DIAG_parent'] + [f'DIAG_{w}_{i}' for w in range(4) for i in range(25)])
+
+    rouvert = DatasetSegmente(tmp_path, lignes_par_segment=7, lignes_par_bloc=3, codec='gzip')
+    assert rouvert.nombre_lignes == 101
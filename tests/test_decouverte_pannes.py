@@ -0,0 +1,55 @@
+"""
+Tests du clustering en ligne des relevés inconnus
+"""
+
+import numpy as np
+
+from services.decouverte_pannes import DecouvertePannes
+
+NORMAL = {'Température': -18, 'Pression_BP': 2.5, 'Pression_HP': 12, 'Courant': 6,
+          'Tension': 220, 'Vibration': 10, 'Humidité': 55, 'Débit_air': 250}
+
+
+def _diagnostic(i, capteurs, type_panne='Inconnue', score=30):
+    return {
+        'diagnostic_id': f'DIAG_{i}',
+        'timestamp': f'2025-01-01T00:{i // 60:02d}:{i % 60:02d}',
+        'panne_detectee': type_panne is not None,
+        'prediction_ia': {'panne_detectee': type_panne, 'score': score},
+        'donnees_capteurs': capteurs
+    }
+
+
+def test_cluster_emis_une_seule_fois():
+    """Test émission d'une signature compacte et ignorance des relevés reconnus"""
+    rng = np.random.default_rng(0)
+    decouverte = DecouvertePannes(taille_min=20, taille_lot=8)
+    for i in range(40):
+        assert decouverte.observer(_diagnostic(i, NORMAL, type_panne=None)) == []
+        assert decouverte.observer(_diagnostic(i, NORMAL, type_panne='fuite_fluide', score=95)) == []
+
+    emises = []
+    for i in range(48):
+        capteurs = dict(NORMAL, Vibration=80 + rng.normal(0, 1), Courant=30 + rng.normal(0, 0.5))
+        emises += decouverte.observer(_diagnostic(i, capteurs))
+
+    assert len(emises) == 1
+    panne = emises[0]
+    assert panne['count'] >= 20
+    assert set(panne['capteurs_affectes']) == {'Vibration', 'Courant'}
+    assert panne['csv_content'].splitlines()[0].startswith('timestamp,diagnostic_id,Température')
+    assert len(panne['csv_content'].splitlines()) == panne['count'] + 1
+
+
+def test_export_import():
+    """Test rechargement des clusters depuis leur snapshot"""
+    decouverte = DecouvertePannes(taille_min=10, taille_lot=4)
+    for i in range(8):
+        decouverte.observer(_diagnostic(i, dict(NORMAL, Tension=400)))
+
+    recharge = DecouvertePannes(taille_min=10, taille_lot=4)
+    recharge.importer(decouverte.exporter())
+    emises = []
+    for i in range(4):
+        emises += recharge.observer(_diagnostic(i, dict(NORMAL, Tension=400)))
+    assert [p['count'] for p in emises] == [12]
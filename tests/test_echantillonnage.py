@@ -0,0 +1,52 @@
+"""
+Tests des réservoirs d'entraînement par classe
+"""
+
+import pytest
+
+from services.echantillonnage import ReservoirParClasse, parser_quotas
+
+
+def test_quotas_et_equilibre():
+    """Test jeu borné par classe, tiré sur tout l'historique"""
+    reservoir = ReservoirParClasse(quota_normal=100, quota_panne=20, quotas={'givrage': 5}, graine=0)
+    for i in range(10000):
+        reservoir.ajouter({'diagnostic_id': f'N{i}', 'panne_detectee': False, 'type_panne': None})
+    for i in range(300):
+        reservoir.ajouter({'diagnostic_id': f'F{i}', 'panne_detectee': True, 'type_panne': 'fuite_fluide'})
+        reservoir.ajouter({'diagnostic_id': f'G{i}', 'panne_detectee': True, 'type_panne': 'givrage'})
+
+    repartition = reservoir.repartition()
+    assert repartition['Aucune'] == {'conservees': 100, 'vues': 10000, 'quota': 100}
+    assert repartition['fuite_fluide']['conservees'] == 20
+    assert repartition['givrage']['conservees'] == 5
+
+    # Échantillon uniforme: pas seulement les premières lignes vues
+    ids = {int(l['diagnostic_id'][1:]) for l in reservoir.exporter()['reservoirs']['Aucune']}
+    assert max(ids) > 5000
+
+    lignes = reservoir.contenu_csv().splitlines()
+    assert lignes[0].startswith('timestamp,diagnostic_id')
+    assert len(lignes) == 1 + 125
+
+
+def test_parser_quotas():
+    """Test lecture des quotas configurés"""
+    assert parser_quotas('Aucune:5000, fuite_fluide:2000') == {'Aucune': 5000, 'fuite_fluide': 2000}
+    assert parser_quotas('') == {}
+    with pytest.raises(ValueError):
+        parser_quotas('fuite_fluide')
+
+
+def test_lignes_ponderees_refletent_le_melange_reel():
+    """Test les poids compensent l'équilibrage des quotas"""
+    reservoir = ReservoirParClasse(quota_normal=10, quota_panne=10, graine=0)
+    for i in range(100):
+        reservoir.ajouter({'panne_detectee': False, 'type_panne': 'Aucune', 'Courant': i})
+    for i in range(10):
+        reservoir.ajouter({'panne_detectee': True, 'type_panne': 'givrage', 'Courant': i})
+
+    poids = {}
+    for ligne, p in reservoir.lignes_ponderees():
+        poids[ligne['type_panne']] = poids.get(ligne['type_panne'], 0) + p
+    assert poids == {'Aucune': 100, 'givrage': 10}
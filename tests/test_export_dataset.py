@@ -0,0 +1,38 @@
+"""
+Tests de l'export en flux du dataset
+"""
+
+import io
+import json
+
+import pytest
+
+from services.export_dataset import exporter_csv, exporter_ndjson, exporter_parquet
+
+LIGNES = [
+    {'timestamp': f'2025-01-01T00:00:0{i}', 'panne_detectee': str(i % 2 == 0), 'Température': str(-18 + i)}
+    for i in range(5)
+]
+
+
+def test_export_csv_ndjson_par_morceaux():
+    """Test projection de colonnes et découpage en morceaux"""
+    morceaux = list(exporter_csv(iter(LIGNES), ['timestamp', 'Température'], taille_morceau=2))
+    assert len(morceaux) == 4  # en-tête + 3 morceaux
+    texte = b''.join(morceaux).decode('utf-8-sig').splitlines()
+    assert texte[0] == 'timestamp,Température'
+    assert texte[-1] == '2025-01-01T00:00:04,-14'
+
+    objets = [json.loads(l) for l in b''.join(exporter_ndjson(iter(LIGNES), ['panne_detectee', 'Température'])).splitlines()]
+    assert objets[0] == {'panne_detectee': True, 'Température': -18.0}
+
+
+def test_export_parquet_row_groups():
+    """Test un row group par morceau et colonnes typées"""
+    pq = pytest.importorskip('pyarrow.parquet')
+    donnees = b''.join(exporter_parquet(iter(LIGNES), ['timestamp', 'panne_detectee', 'Température'], taille_morceau=2))
+    fichier = pq.ParquetFile(io.BytesIO(donnees))
+    assert fichier.metadata.num_row_groups == 3
+    table = fichier.read()
+    assert table.column('Température').to_pylist() == [-18.0, -17.0, -16.0, -15.0, -14.0]
+    assert table.column('panne_detectee').to_pylist()[:2] == [True, False]
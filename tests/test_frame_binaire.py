@@ -0,0 +1,43 @@
+"""
+Tests de la trame binaire capteurs
+"""
+
+import numpy as np
+import pytest
+
+from utils.frame_binaire import encoder_frame, decoder_frames, est_frame, TAILLE_FRAME
+from utils.validation import CAPTEURS
+
+
+def test_aller_retour_plusieurs_trames():
+    """Test encodage / décodage de trames concaténées avec capteurs absents"""
+    complet = {'Température': -18.25, 'Pression_BP': 2.5, 'Pression_HP': 12, 'Courant': 5.5,
+               'Tension': 220, 'Vibration': 2, 'Humidité': 55, 'Débit_air': 150}
+    partiel = dict(complet, Vibration=None, Débit_air=None)
+    corps = encoder_frame('frigo_01', complet, 1_700_000_000.5) + encoder_frame('frigo_02', partiel, 1_700_000_001)
+
+    assert TAILLE_FRAME == 60
+    assert len(corps) == 2 * TAILLE_FRAME
+
+    frames = decoder_frames(corps)
+    assert frames['device_id'].tolist() == [b'frigo_01', b'frigo_02']
+    assert frames['timestamp'][0] == 1_700_000_000.5
+    assert frames['valeurs'][0, CAPTEURS.index('Température')] == -18.25
+    assert frames['manquants'][1].sum() == 2
+    assert np.isnan(frames['valeurs'][1, CAPTEURS.index('Débit_air')])
+
+
+def test_trame_invalide():
+    """Test rejet des tailles et magic invalides"""
+    corps = encoder_frame('frigo', {'Température': -18})
+    with pytest.raises(ValueError):
+        decoder_frames(corps[:-1])
+    with pytest.raises(ValueError):
+        decoder_frames(b'XX' + corps[2:])
+
+
+def test_detection_trame_octet_stream():
+    """Test un corps octet-stream JSON n'est pas pris pour une trame"""
+    assert est_frame(encoder_frame('frigo', {'Température': -18}) * 2)
+    assert not est_frame(b'{"Temp\xc3\xa9rature": -18}')
+    assert not est_frame(b'')
@@ -0,0 +1,77 @@
+"""
+Tests du micro-batching de génération
+"""
+
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from gpt.batching import GenerationScheduler
+
+
+def test_requetes_concurrentes_regroupees():
+    """Test regroupement des requêtes concurrentes et retour à chaque appelant"""
+    lots = []
+
+    def generer_lot(prompts, params):
+        lots.append(list(prompts))
+        time.sleep(0.01)
+        return [[{'generated_text': p + ' -> ok'}] for p in prompts]
+
+    scheduler = GenerationScheduler(generer_lot, fenetre_ms=50, taille_max=8)
+    resultats = {}
+
+    def appel(i):
+        resultats[i] = scheduler.generer(f'prompt {i}', {'max_new_tokens': 40}, timeout=5)
+
+    threads = [threading.Thread(target=appel, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    scheduler.arreter()
+
+    assert all(resultats[i][0]['generated_text'] == f'prompt {i} -> ok' for i in range(6))
+    assert len(lots) < 6
+    assert max(len(lot) for lot in lots) > 1
+
+
+def test_parametres_differents_et_erreur():
+    """Test séparation par paramètres et propagation des erreurs"""
+    def generer_lot(prompts, params):
+        if params.get('echec'):
+            raise ValueError('modèle indisponible')
+        return [params['max_new_tokens']] * len(prompts)
+
+    scheduler = GenerationScheduler(generer_lot, fenetre_ms=1)
+    assert scheduler.generer('a', {'max_new_tokens': 10}, timeout=5) == 10
+    with pytest.raises(ValueError, match='indisponible'):
+        scheduler.generer('b', {'max_new_tokens': 10, 'echec': True}, timeout=5)
+    with pytest.raises(TypeError):
+        scheduler.generer('c', {'stop': ['\n']}, timeout=5)
+    assert scheduler.generer('d', {'max_new_tokens': 20}, timeout=5) == 20
+    scheduler.arreter()
+
+
+def test_delai_depasse():
+    """Test un appelant parti en délai dépassé n'est pas généré"""
+    bloque = threading.Event()
+    prompts_generes = []
+
+    def generer_lot(prompts, params):
+        bloque.wait(5)
+        prompts_generes.extend(prompts)
+        return list(prompts)
+
+    scheduler = GenerationScheduler(generer_lot, fenetre_ms=1)
+    premier = threading.Thread(target=scheduler.generer, args=('lent', {}), kwargs={'timeout': 5})
+    premier.start()
+    time.sleep(0.05)
+    with pytest.raises(FutureTimeoutError):
+        scheduler.generer('abandonne', {}, timeout=0.05)
+    bloque.set()
+    premier.join()
+    scheduler.arreter()
+    assert prompts_generes == ['lent']
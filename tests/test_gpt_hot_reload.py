@@ -0,0 +1,91 @@
+"""
+Tests du rechargement à chaud (surveillance de models/, bascule entre requêtes)
+"""
+
+import json
+import threading
+import time
+
+from gpt.hot_reload import SurveillantFinetunes, PorteBascule
+
+
+def creer_finetune(dossier, nom, termine=True):
+    chemin = dossier / nom
+    chemin.mkdir()
+    if termine:
+        (chemin / 'finetuning_metadata.json').write_text(json.dumps({'final_loss': 0.42}))
+    return chemin
+
+
+def test_detection_finetunes_termines(tmp_path):
+    """Test seuls les nouveaux fine-tunes terminés du bon modèle de base sont signalés"""
+    creer_finetune(tmp_path, 'phi2-finetuned-20240101_080000')
+    signales = []
+    surveillant = SurveillantFinetunes(tmp_path, lambda d, meta: signales.append((d.name, meta)) or True,
+                                       filtre=lambda nom: nom.startswith('phi2-'), intervalle=3600)
+    try:
+        assert surveillant.verifier() is None  # existant au démarrage: ignoré
+
+        en_cours = creer_finetune(tmp_path, 'phi2-finetuned-20240108_080000', termine=False)
+        creer_finetune(tmp_path, 'mistral-finetuned-20240108_090000')
+        assert surveillant.verifier() is None
+
+        (en_cours / 'finetuning_metadata.json').write_text(json.dumps({'final_loss': 0.3}))
+        creer_finetune(tmp_path, 'phi2-finetuned-20240115_080000')
+        surveillant.verifier()
+        assert signales == [('phi2-finetuned-20240115_080000', {'final_loss': 0.42})]
+        assert surveillant.verifier() is None
+    finally:
+        surveillant.arreter()
+
+
+def test_finetune_arrive_pendant_un_rechargement(tmp_path):
+    """Test un fine-tune refusé pendant un chargement en cours est retenté ensuite"""
+    en_cours = threading.Event()
+    charges = []
+
+    def recharger(dossier, metadata):
+        # Comme IAService.reload_model: False si un rechargement est déjà en cours
+        if en_cours.is_set():
+            return False
+        en_cours.set()
+        charges.append(dossier.name)
+        return True
+
+    surveillant = SurveillantFinetunes(tmp_path, recharger, intervalle=3600)
+    try:
+        creer_finetune(tmp_path, 'phi2-finetuned-20240108_080000')
+        assert surveillant.verifier().name == 'phi2-finetuned-20240108_080000'
+
+        creer_finetune(tmp_path, 'phi2-finetuned-20240115_080000')
+        assert surveillant.verifier() is None  # premier chargement pas terminé
+
+        en_cours.clear()
+        assert surveillant.verifier().name == 'phi2-finetuned-20240115_080000'
+        assert surveillant.verifier() is None
+        assert charges == ['phi2-finetuned-20240108_080000', 'phi2-finetuned-20240115_080000']
+    finally:
+        surveillant.arreter()
+
+
+def test_bascule_attend_les_requetes():
+    """Test la bascule attend la fin de la requête en cours"""
+    porte = PorteBascule()
+    ordre = []
+    requete_demarree = threading.Event()
+
+    def requete():
+        with porte.requete():
+            requete_demarree.set()
+            time.sleep(0.1)
+            ordre.append('requete')
+
+    thread = threading.Thread(target=requete)
+    thread.start()
+    requete_demarree.wait()
+    with porte.exclusive(timeout=5) as sans_requete:
+        ordre.append('bascule')
+    thread.join()
+
+    assert sans_requete
+    assert ordre == ['requete', 'bascule']
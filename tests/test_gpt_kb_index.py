@@ -0,0 +1,30 @@
+"""
+Tests de l'index BM25 de la base de connaissances
+"""
+
+from gpt.kb_index import IndexBM25, tokeniser, texte_entree
+
+
+def test_tokenisation_sans_accents():
+    """Test normalisation des accents et retrait des mots vides"""
+    assert tokeniser("Le Débit d'air de l'évaporateur") == ['debit', 'air', 'evaporateur']
+
+
+def test_classement_et_mise_a_jour():
+    """Test classement BM25 sur sujet et contenu, puis ré-indexation"""
+    index = IndexBM25()
+    index.ajouter('givrage', texte_entree('givrage', "Évaporateur pris en glace, dégivrage manuel nécessaire"))
+    index.ajouter('compresseur', texte_entree('compresseur', "Compresseur bruyant: vérifier les silentblocs"))
+    index.ajouter('learned_fuite', texte_entree('learned_fuite', {
+        'case': 'Pression BP basse et température qui remonte',
+        'solution': 'Rechercher une fuite de fluide frigorigène'
+    }))
+
+    assert index.rechercher('evaporateur en GLACE')[0][0] == 'givrage'
+    assert index.rechercher('pression basse, fuite ?')[0][0] == 'learned_fuite'
+    assert index.rechercher('rien à voir') == []
+
+    index.ajouter('compresseur', texte_entree('compresseur', "Surchauffe du moteur"))
+    assert index.rechercher('silentblocs') == []
+    assert index.rechercher('surchauffe')[0][0] == 'compresseur'
+    assert len(index) == 3
@@ -0,0 +1,39 @@
+"""
+Tests du stockage journalisé de la base de connaissances
+"""
+
+import json
+
+from gpt.kb_store import KnowledgeStore
+
+
+def test_journal_reprise_et_compaction(tmp_path):
+    """Test rejeu du journal, ligne tronquée ignorée, compaction en instantané"""
+    store = KnowledgeStore(tmp_path, lignes_min_compaction=10)
+    base = store.charger()
+    assert base == {}
+
+    lot = [(f"cas_{i}", {'solution': f"action {i}"}) for i in range(5)]
+    base.update(lot)
+    store.ajouter(lot, base)
+    revision = store.revision
+    assert not (tmp_path / 'knowledge_base.json').exists()
+
+    # Crash pendant une écriture: dernière ligne incomplète
+    with open(tmp_path / 'knowledge_base.log', 'ab') as f:
+        f.write(b'{"topic": "cas_5", "cont')
+
+    reprise = KnowledgeStore(tmp_path, lignes_min_compaction=10)
+    base = reprise.charger()
+    assert len(base) == 5 and base['cas_3'] == {'solution': 'action 3'}
+    assert reprise.revision == revision
+
+    lot = [(f"cas_{i}", f"texte {i}") for i in range(5, 12)]
+    base.update(lot)
+    reprise.ajouter(lot, base)
+    assert (tmp_path / 'knowledge_base.log').stat().st_size == 0
+    assert len(json.loads((tmp_path / 'knowledge_base.json').read_text(encoding='utf-8'))) == 12
+
+    relu = KnowledgeStore(tmp_path)
+    assert relu.charger() == base
+    assert relu.revision == reprise.revision
@@ -0,0 +1,44 @@
+"""
+Tests du moteur de mots-clés (regex unique, repli casse/accents)
+"""
+
+from gpt.keyword_matcher import KeywordMatcher
+
+
+CATEGORIES = {
+    'intent': {
+        'solution': ['fix', 'how to'],
+        'info': ['what', 'how'],
+    },
+    'fallback': {
+        'panne': ['panne', 'problème'],
+        'diagnostic': ['diagnostique', 'diagnostic'],
+        'bruit': ['son'],
+    },
+}
+
+
+def test_equivalent_aux_sous_chaines():
+    """Test mêmes étiquettes que any(mot in texte.lower()), chevauchements compris"""
+    matcher = KeywordMatcher(CATEGORIES)
+    textes = [
+        "How to fix the compressor?",
+        "Diagnostique complet: raison du bruit",
+        "whatever",
+        "rien",
+    ]
+    for texte in textes:
+        attendu = {
+            categorie: tuple(e for e, mots in etiquettes.items() if any(m in texte.lower() for m in mots))
+            for categorie, etiquettes in CATEGORIES.items()
+        }
+        assert matcher.trouver(texte) == attendu
+    assert matcher.premiere("How to fix the compressor?", 'intent') == 'solution'
+    assert matcher.premiere("rien", 'intent') is None
+
+
+def test_replis_accents_et_casse():
+    """Test 'PROBLEME' et 'problème' trouvent le même mot-clé"""
+    matcher = KeywordMatcher(CATEGORIES)
+    assert matcher.trouver("Gros PROBLEME")['fallback'] == ('panne',)
+    assert matcher.trouver("Gros problème")['fallback'] == ('panne',)
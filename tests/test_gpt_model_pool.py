@@ -0,0 +1,64 @@
+"""
+Tests du pool de modèles (chargeurs factices, sans torch)
+"""
+
+import time
+
+from gpt.model_pool import ModelPool
+
+
+TAILLES = {'a': 40, 'b': 40, 'c': 40, 'casse': 10}
+
+
+def charger(nom):
+    if nom == 'casse':
+        raise RuntimeError('poids illisibles')
+    return {'nom': nom}
+
+
+def attendre(pool, nom):
+    for _ in range(200):
+        if pool.obtenir(nom) is not None or pool.etat()['models'][nom]['status'] == 'failed':
+            return pool.obtenir(nom)
+        time.sleep(0.01)
+    raise AssertionError(f'{nom} jamais chargé')
+
+
+def nouveau_pool(liberes):
+    return ModelPool(charger, budget_octets=100, taille=lambda m: TAILLES[m['nom']],
+                     liberer=lambda m: liberes.append(m['nom']), estimer=TAILLES.get)
+
+
+def test_eviction_lru():
+    """Test éviction du moins récemment utilisé, jamais du modèle épinglé"""
+    liberes = []
+    pool = nouveau_pool(liberes)
+    pool.epingler('defaut', {'nom': 'a'})
+
+    assert pool.obtenir('b') is None  # chargement lancé
+    assert attendre(pool, 'b') == {'nom': 'b'}
+    attendre(pool, 'c')  # 40 + 40 + 40 > 100: 'b' évincé
+
+    etat = pool.etat()
+    assert liberes == ['b']
+    assert etat['models']['b']['status'] == 'evicted'
+    assert etat['models']['c']['status'] == 'resident'
+    assert etat['models']['defaut']['pinned']
+    assert etat['used_mb'] == round(80 / 1e6, 1)
+
+
+def test_modele_utilise_et_echec():
+    """Test modèle en cours d'utilisation protégé, chargement échoué signalé"""
+    liberes = []
+    pool = nouveau_pool(liberes)
+    attendre(pool, 'a')
+    attendre(pool, 'b')
+
+    with pool.utiliser('a') as modele:
+        assert modele == {'nom': 'a'}
+        attendre(pool, 'c')  # 'a' est le plus ancien mais utilisé: 'b' évincé
+    assert liberes == ['b']
+
+    assert attendre(pool, 'casse') is None
+    assert pool.etat()['models']['casse']['status'] == 'failed'
+    assert 'poids illisibles' in pool.etat()['models']['casse']['error']
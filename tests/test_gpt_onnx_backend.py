@@ -0,0 +1,36 @@
+"""
+Tests du backend ONNX Runtime (GPT-2 minuscule aléatoire exporté localement)
+"""
+
+import pytest
+
+torch = pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+pytest.importorskip('optimum.onnxruntime')
+
+from gpt.onnx_backend import charger_onnx
+
+
+def test_export_cache_et_generation(tmp_path):
+    """Test export avec KV-cache, réutilisation du graphe, sortie greedy identique"""
+    torch.manual_seed(0)
+    config = transformers.GPT2Config(vocab_size=128, n_positions=64, n_embd=32, n_layer=2, n_head=2)
+    source = tmp_path / 'petit-gpt2'
+    reference = transformers.GPT2LMHeadModel(config).eval()
+    reference.save_pretrained(source)
+
+    model = charger_onnx(str(source), tmp_path / 'petit-gpt2-onnx')
+    exporte = sorted(f.name for f in (tmp_path / 'petit-gpt2-onnx').glob('*.onnx'))
+    assert exporte
+
+    # Second chargement: aucun ré-export (fichiers inchangés)
+    mtimes = {f: (tmp_path / 'petit-gpt2-onnx' / f).stat().st_mtime for f in exporte}
+    model = charger_onnx(str(source), tmp_path / 'petit-gpt2-onnx')
+    assert mtimes == {f: (tmp_path / 'petit-gpt2-onnx' / f).stat().st_mtime for f in exporte}
+
+    ids = torch.randint(0, 128, (1, 8))
+    params = {'max_new_tokens': 6, 'do_sample': False, 'pad_token_id': 0}
+    with torch.inference_mode():
+        attendu = reference.generate(ids, attention_mask=torch.ones_like(ids), **params)
+    obtenu = model.generate(ids, attention_mask=torch.ones_like(ids), **params)
+    assert torch.equal(attendu, obtenu)
@@ -0,0 +1,43 @@
+"""
+Tests du cache KV du préambule (modèle GPT-2 minuscule aléatoire, sans téléchargement)
+"""
+
+import pytest
+
+torch = pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+
+from gpt.prefix_cache import PrefixKVCache
+
+
+class TokenizerOctets:
+    """Tokenizer minimal: un jeton par octet"""
+    pad_token_id = 0
+    eos_token_id = 0
+
+    def __call__(self, texte, return_tensors=None, add_special_tokens=True):
+        ids = list(texte.encode('utf-8'))
+        return {'input_ids': torch.tensor([ids]) if return_tensors == 'pt' else ids}
+
+    def batch_decode(self, sequences, skip_special_tokens=True):
+        return [bytes(int(t) % 256 for t in s).decode('utf-8', errors='replace') for s in sequences]
+
+
+def test_generation_identique_avec_padding_au_milieu():
+    """Test lot de prompts de longueurs différentes: même sortie que sans cache"""
+    torch.manual_seed(0)
+    config = transformers.GPT2Config(vocab_size=256, n_positions=256, n_embd=32, n_layer=2, n_head=2)
+    model = transformers.GPT2LMHeadModel(config).eval()
+    tokenizer = TokenizerOctets()
+    cache = PrefixKVCache(model, tokenizer, "Expert froid.\n\n")
+
+    prompts = ["Expert froid.\n\nQuestion: givre ?\n", "Expert froid.\n\nQuestion: compresseur bruyant ?\n"]
+    params = {'max_new_tokens': 6, 'do_sample': False, 'pad_token_id': 0}
+    sorties = cache.generer(prompts, params)
+
+    for prompt, sortie in zip(prompts, sorties):
+        ids = tokenizer(prompt, return_tensors='pt')['input_ids']
+        with torch.inference_mode():
+            reference = model.generate(ids, attention_mask=torch.ones_like(ids), **params)
+        attendu = prompt + tokenizer.batch_decode(reference[:, ids.shape[1]:])[0]
+        assert sortie[0]['generated_text'] == attendu
@@ -0,0 +1,33 @@
+"""
+Tests des sondes réseau mises en cache
+"""
+
+import requests
+
+from gpt import probes
+
+
+def test_sonde_mise_en_cache(tmp_path, monkeypatch):
+    """Test une seule requête réseau par URL tant que le TTL court, y compris après redémarrage"""
+    appels = []
+
+    def get(url, timeout):
+        appels.append(url)
+        raise requests.ConnectionError('injoignable')
+
+    monkeypatch.setattr(probes.requests, 'get', get)
+    fichier = tmp_path / 'probes.json'
+    probes.vider_cache()
+
+    assert probes.sonder('http://localhost:11434/api/tags', fichier=fichier) is False
+    assert probes.sonder('http://localhost:11434/api/tags', fichier=fichier) is False
+    assert len(appels) == 1
+
+    # Redémarrage: le résultat est relu depuis le fichier
+    probes.vider_cache()
+    assert probes.sonder('http://localhost:11434/api/tags', fichier=fichier) is False
+    assert len(appels) == 1
+
+    # TTL écoulé: nouvelle sonde
+    assert probes.sonder('http://localhost:11434/api/tags', ttl=0, fichier=fichier) is False
+    assert len(appels) == 2
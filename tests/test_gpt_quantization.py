@@ -0,0 +1,45 @@
+"""
+Tests de la quantification int8 CPU (GPT-2 minuscule aléatoire, sans téléchargement)
+"""
+
+import pytest
+
+torch = pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+
+from gpt.quantization import charger_ou_quantifier, convertir_conv1d
+
+
+def petit_gpt2():
+    torch.manual_seed(0)
+    config = transformers.GPT2Config(vocab_size=128, n_positions=64, n_embd=32, n_layer=2, n_head=2)
+    return transformers.GPT2LMHeadModel(config).eval()
+
+
+def test_conversion_conv1d_equivalente():
+    """Test Conv1D -> nn.Linear sans changer les logits"""
+    model = petit_gpt2()
+    ids = torch.randint(0, 128, (1, 10))
+    with torch.inference_mode():
+        avant = model(ids).logits
+        assert convertir_conv1d(model) == 8  # 4 Conv1D par bloc
+        apres = model(ids).logits
+    assert torch.allclose(avant, apres, atol=1e-5)
+
+
+def test_cache_disque(tmp_path):
+    """Test quantification au premier chargement seulement"""
+    appels = []
+
+    def charger():
+        appels.append(1)
+        return petit_gpt2()
+
+    premier = charger_ou_quantifier('petit-gpt2', tmp_path, charger)
+    second = charger_ou_quantifier('petit-gpt2', tmp_path, charger)
+    assert len(appels) == 1
+
+    ids = torch.randint(0, 128, (1, 10))
+    with torch.inference_mode():
+        assert torch.equal(premier(ids).logits, second(ids).logits)
+    assert isinstance(second.transformer.h[0].mlp.c_fc, torch.ao.nn.quantized.dynamic.Linear)
@@ -0,0 +1,53 @@
+"""
+Tests du cache des réponses LLM
+"""
+
+import threading
+import time
+
+from gpt.response_cache import ResponseCache
+
+
+def test_cle_normalisee_et_persistance(tmp_path):
+    """Test clé insensible à la casse/espaces et rechargement depuis le disque"""
+    params = {'max_new_tokens': 40, 'do_sample': False}
+    cle = ResponseCache.cle('Pourquoi le compresseur chauffe ?', 'info', 'phi2', params)
+    assert cle == ResponseCache.cle('  pourquoi le   compresseur chauffe', 'info', 'phi2', params)
+    assert cle != ResponseCache.cle('pourquoi le compresseur chauffe', 'info', 'gpt2', params)
+
+    cache = ResponseCache(tmp_path, empreinte='phi2:kb1')
+    assert cache.obtenir_ou_calculer(cle, lambda: 'Vérifier le condenseur') == 'Vérifier le condenseur'
+
+    assert ResponseCache(tmp_path, empreinte='phi2:kb1').obtenir(cle) == 'Vérifier le condenseur'
+    assert ResponseCache(tmp_path, empreinte='phi2:kb2').obtenir(cle) is None
+
+
+def test_coalescence_et_invalidation(tmp_path):
+    """Test une seule génération pour des requêtes identiques simultanées"""
+    cache = ResponseCache(tmp_path, empreinte='v1')
+    appels = []
+
+    def generer():
+        appels.append(1)
+        time.sleep(0.05)
+        return 'réponse'
+
+    resultats = []
+    threads = [threading.Thread(target=lambda: resultats.append(cache.obtenir_ou_calculer('k', generer)))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert resultats == ['réponse'] * 5
+    assert len(appels) == 1
+    assert cache.stats['coalesced'] == 4
+
+    # Échec de génération (None): rien n'est mis en cache
+    assert cache.obtenir_ou_calculer('vide', lambda: None) is None
+    assert cache.obtenir('vide') is None
+
+    cache.invalider('v2')
+    assert cache.obtenir('k') is None
+    assert len(ResponseCache(tmp_path, empreinte='v2')) == 0
@@ -0,0 +1,57 @@
+"""
+Tests de l'index sémantique (encodeur factice par sac de mots hachés)
+"""
+
+import zlib
+
+import numpy as np
+
+from gpt.kb_index import tokeniser
+from gpt.semantic_index import IndexSemantique
+
+DIMENSION = 64
+
+
+def encodeur_factice(textes):
+    vecteurs = np.zeros((len(textes), DIMENSION), dtype=np.float32)
+    for i, texte in enumerate(textes):
+        for mot in tokeniser(texte):
+            vecteurs[i, zlib.crc32(mot.encode()) % DIMENSION] += 1.0
+    return vecteurs
+
+
+def test_recherche_persistance_et_remplacement(tmp_path):
+    """Test top-k cosinus, rechargement du fichier mappé et ré-encodage d'une clé"""
+    index = IndexSemantique(tmp_path, encodeur_factice, modele='factice')
+    index.ajouter_lot([
+        ('givrage', "évaporateur glace dégivrage"),
+        ('compresseur', "compresseur bruit silentblocs"),
+        ('fuite', "pression basse fuite fluide"),
+    ])
+    assert index.rechercher('fuite de fluide', k=1)[0][0] == 'fuite'
+
+    recharge = IndexSemantique(tmp_path, encodeur_factice, modele='factice')
+    assert len(recharge) == 3
+    assert recharge.rechercher('glace evaporateur', k=1)[0][0] == 'givrage'
+
+    recharge.ajouter('compresseur', "surchauffe moteur")
+    assert len(recharge) == 3
+    assert recharge.rechercher('surchauffe', k=1)[0][0] == 'compresseur'
+
+    # Changement de modèle: vecteurs incomparables, index repart de zéro
+    assert len(IndexSemantique(tmp_path, encodeur_factice, modele='autre')) == 0
+
+
+def test_quantifieur_grossier(tmp_path):
+    """Test recherche via cellules IVF au-delà du seuil"""
+    index = IndexSemantique(tmp_path, encodeur_factice, modele='factice', seuil_quantifieur=100, nprobe=4)
+    index.ajouter_lot([(f"doc{i}", f"mot{i} mot{i % 7} terme{i % 13}") for i in range(150)])
+    index.ajouter('cible', "condenseur encrasse ventilateur")
+
+    assert index._centroides is not None
+    assert index.rechercher('condenseur encrasse ventilateur', k=1)[0][0] == 'cible'
+
+    # Redémarrage: quantifieur réentraîné dès l'ouverture
+    rouvert = IndexSemantique(tmp_path, encodeur_factice, modele='factice', seuil_quantifieur=100, nprobe=4)
+    assert rouvert._centroides is not None
+    assert rouvert.rechercher('condenseur encrasse ventilateur', k=1)[0][0] == 'cible'
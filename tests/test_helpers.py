@@ -0,0 +1,20 @@
+"""
+Tests des bornes de dates de l'historique
+"""
+
+from utils.helpers import normaliser_timestamp
+
+
+def test_borne_de_fin_inclut_la_journee():
+    """Test to=date inclut toute la journée, à la microseconde près"""
+    fin = normaliser_timestamp('2025-01-15', fin=True)
+    assert '2025-01-15T23:59:59.999999' <= fin
+    assert '2025-01-15T18:30:00.123456' <= fin
+    assert not '2025-01-16T00:00:00' <= fin
+    assert normaliser_timestamp('2025-01-15') <= '2025-01-15T00:00:00.000001'
+
+
+def test_borne_de_fin_a_la_precision_donnee():
+    """Test to=heure:minute inclut la minute entière, une fraction explicite est exacte"""
+    assert normaliser_timestamp('2025-01-15T08:00', fin=True) == '2025-01-15T08:00:59.999999'
+    assert normaliser_timestamp('2025-01-15T08:00:00.250', fin=True) == '2025-01-15T08:00:00.250000'
@@ -0,0 +1,51 @@
+"""
+Tests du décodage et de la normalisation des payloads
+"""
+
+import json
+
+import pytest
+
+from utils.payload import decoder_corps, normaliser_payload, PayloadNonSupporte, msgpack
+
+CAPTEURS = {'Température': -18, 'Débit_air': 150}
+
+
+def test_formes_plate_imbriquee_lot():
+    """Test reconnaissance des trois formes de payload"""
+    releves, est_lot = normaliser_payload({**CAPTEURS, 'source': 'frigo_1'})
+    assert not est_lot
+    assert releves[0]['capteurs']['Température'] == -18
+    assert releves[0]['source'] == 'frigo_1'
+
+    releves, est_lot = normaliser_payload({'capteurs': CAPTEURS, 'source': 'simulateur'})
+    assert not est_lot
+    assert releves[0]['capteurs'] == CAPTEURS
+
+    releves, est_lot = normaliser_payload({
+        'source': 'passerelle',
+        'localisation': 'Chambre A',
+        'releves': [CAPTEURS, {'capteurs': CAPTEURS, 'localisation': 'Chambre B'}]
+    })
+    assert est_lot
+    assert [r['localisation'] for r in releves] == ['Chambre A', 'Chambre B']
+    assert releves[1]['source'] == 'passerelle'
+
+    assert normaliser_payload([CAPTEURS])[1] is True
+    with pytest.raises(ValueError):
+        normaliser_payload([1, 2])
+
+
+def test_decodage_json_et_msgpack():
+    """Test décodage JSON (accents) et négociation MessagePack"""
+    corps = json.dumps({'capteurs': CAPTEURS}, ensure_ascii=False).encode('utf-8')
+    assert decoder_corps(corps, 'application/json; charset=utf-8')['capteurs'] == CAPTEURS
+
+    with pytest.raises(ValueError):
+        decoder_corps(b'{pas du json', 'application/json')
+
+    if msgpack is None:
+        with pytest.raises(PayloadNonSupporte):
+            decoder_corps(b'\x80', 'application/msgpack')
+    else:
+        assert decoder_corps(msgpack.packb(CAPTEURS), 'application/msgpack') == CAPTEURS
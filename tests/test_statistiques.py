@@ -0,0 +1,99 @@
+"""
+Tests des agrégats glissants de statistiques
+"""
+
+from datetime import datetime
+
+import pytest
+from services.dataset_segments import DatasetSegmente
+from services.statistiques_service import AgregateurStatistiques
+from utils.helpers import parser_duree
+
+
+def test_fenetre_et_regroupement():
+    """Test fenêtre glissante et regroupement par localisation"""
+    maintenant = 1_700_000_000
+    stats = AgregateurStatistiques()
+    stats.ajouter('fuite_fluide', 'Chambre froide A', 'frigo_1', True, maintenant - 2 * 86400)
+    stats.ajouter('fuite_fluide', 'Chambre froide A', 'frigo_1', True, maintenant - 3600)
+    stats.ajouter(None, 'Chambre froide B', 'frigo_2', False, maintenant - 60)
+
+    resultat = stats.requete(parser_duree('24h'), 'localisation', maintenant=maintenant)
+
+    assert resultat['granularite'] == 'heure'
+    assert resultat['total_diagnostics'] == 2
+    assert resultat['groupes']['Chambre froide A']['total_pannes_detectees'] == 1
+    assert resultat['groupes']['Chambre froide B']['taux_pannes'] == 0
+
+    assert stats.requete(parser_duree('7d'), maintenant=maintenant)['total_diagnostics'] == 3
+
+
+def test_export_import():
+    """Test rechargement des agrégats depuis leur snapshot"""
+    maintenant = 1_700_000_000
+    stats = AgregateurStatistiques()
+    stats.ajouter('givrage_evaporateur', 'Zone 1', 'frigo_1', True, maintenant)
+
+    restaure = AgregateurStatistiques()
+    restaure.importer(stats.exporter())
+
+    resultat = restaure.requete(900, 'type_panne', maintenant=maintenant)
+    assert resultat['groupes']['givrage_evaporateur']['total_diagnostics'] == 1
+
+
+def test_releves_en_retard_sans_effacer_les_buckets_recents():
+    """Test un horodatage ancien (passerelle en retard) ne réinitialise pas le bucket courant"""
+    maintenant = 1_700_000_000
+    stats = AgregateurStatistiques()
+    for _ in range(5):
+        stats.ajouter(None, 'Zone 1', 'frigo_1', False, maintenant)
+
+    # Même slot que maintenant pour les anneaux minute (180) et heure (192)
+    stats.ajouter(None, 'Zone 1', 'frigo_1', False, maintenant - 180 * 60)
+    stats.ajouter(None, 'Zone 1', 'frigo_1', False, maintenant - 192 * 3600)
+
+    assert stats.requete(3600, maintenant=maintenant)['total_diagnostics'] == 5
+    assert stats.requete(900, maintenant=maintenant)['total_diagnostics'] == 5
+    # Granularité jour: le relevé d'il y a 8 jours reste comptabilisé dans son propre bucket
+    assert stats.requete(parser_duree('30d'), maintenant=maintenant)['total_diagnostics'] == 7
+
+    # Un relevé en retard mais dans la période couverte est compté
+    stats.ajouter(None, 'Zone 1', 'frigo_1', False, maintenant - 600)
+    assert stats.requete(3600, maintenant=maintenant)['total_diagnostics'] == 6
+
+
+def test_reprise_depuis_le_dataset(tmp_path):
+    """Test agrégats reconstruits à partir de la position du snapshot dans le dataset"""
+    maintenant = 1_700_000_000
+    dataset = DatasetSegmente(tmp_path, lignes_par_segment=4, lignes_par_bloc=2, codec='gzip')
+    stats = AgregateurStatistiques()
+    for i in range(10):
+        ligne = {
+            'timestamp': datetime.fromtimestamp(maintenant - 60 * i).isoformat(),
+            'localisation': 'Zone 1',
+            'panne_detectee': i % 2 == 0,
+            'type_panne': 'givrage_evaporateur' if i % 2 == 0 else 'Aucune'
+        }
+        position = dataset.ajouter(ligne)
+        if i < 5:
+            stats.ajouter_ligne(ligne, position)
+    snapshot = stats.exporter()
+
+    # Redémarrage: snapshot (5 lignes) + lignes écrites après sa position
+    restaure = AgregateurStatistiques()
+    restaure.importer(snapshot)
+    for position, ligne in dataset.parcourir(apres=restaure.position):
+        restaure.ajouter_ligne(ligne, position)
+
+    resultat = restaure.requete(3600, 'type_panne', maintenant=maintenant)
+    assert resultat['total_diagnostics'] == 10
+    assert resultat['groupes']['givrage_evaporateur']['total_diagnostics'] == 5
+    assert restaure.position == position
+
+
+def test_parametres_invalides():
+    """Test rejet d'un regroupement ou d'une durée invalide"""
+    with pytest.raises(ValueError):
+        AgregateurStatistiques().requete(3600, 'capteur')
+    with pytest.raises(ValueError):
+        parser_duree('demain')
@@ -0,0 +1,57 @@
+"""
+Tests du moniteur de dérive
+"""
+
+import numpy as np
+
+from services.surveillance_derive import MoniteurDerive
+
+NORMAL = {'Température': -18, 'Pression_BP': 2.5, 'Pression_HP': 12, 'Courant': 6,
+          'Tension': 220, 'Vibration': 10, 'Humidité': 55, 'Débit_air': 250}
+
+
+def _releves(rng, n, **decalages):
+    for _ in range(n):
+        yield {c: v + decalages.get(c, 0) + rng.normal(0, abs(v) * 0.05 + 0.5) for c, v in NORMAL.items()}
+
+
+def test_pas_de_retraining_sans_derive():
+    """Test aucune demande de réentraînement sur données stationnaires"""
+    rng = np.random.default_rng(1)
+    moniteur = MoniteurDerive(taille_fenetre=200, intervalle=50, cooldown=0)
+    rapports = [moniteur.observer(r, None, maintenant=0) for r in _releves(rng, 1000)]
+    rapports = [r for r in rapports if r]
+    assert rapports and not any(r['derive'] for r in rapports)
+
+
+def test_derive_et_cooldown():
+    """Test détection d'un décalage capteur, puis cooldown"""
+    rng = np.random.default_rng(2)
+    moniteur = MoniteurDerive(taille_fenetre=200, intervalle=50, cooldown=3600)
+    for r in _releves(rng, 200):
+        moniteur.observer(r, None, maintenant=10_000)
+
+    rapports = [moniteur.observer(r, 'fuite_fluide', maintenant=10_000) for r in _releves(rng, 200, Courant=10)]
+    declenches = [r for r in rapports if r and r['derive']]
+    assert len(declenches) == 1
+    assert any(raison.startswith('Courant') for raison in declenches[0]['raisons'])
+    assert any(raison.startswith('labels') for raison in declenches[0]['raisons'])
+
+    # Nouvelle dérive pendant le cooldown: signalée mais sans réentraînement
+    rapports = [moniteur.observer(r, None, maintenant=10_100) for r in _releves(rng, 200, Tension=-100)]
+    assert not any(r and r['derive'] for r in rapports)
+    assert any(r and r.get('cooldown_restant') for r in rapports)
+
+
+def test_reference_depuis_le_jeu_entrainement():
+    """Test la référence vient du jeu d'entraînement, pas de la première fenêtre"""
+    rng = np.random.default_rng(3)
+    entrainement = [(r, None, 1.0) for r in _releves(rng, 300)]
+    moniteur = MoniteurDerive(taille_fenetre=200, intervalle=50, cooldown=0,
+                              source_reference=lambda: entrainement)
+
+    # Fenêtre initiale déjà décalée: comparée à l'entraînement, la dérive est vue
+    rapports = [moniteur.observer(r, None, maintenant=0) for r in _releves(rng, 300, Courant=10)]
+    declenches = [r for r in rapports if r and r['derive']]
+    assert declenches
+    assert any(raison.startswith('Courant') for raison in declenches[0]['raisons'])
@@ -0,0 +1,66 @@
+"""
+Tests de la validation vectorisée par lot
+"""
+
+import numpy as np
+import pytest
+
+from utils.validation import valider_lot_capteurs, ligne_validee, valider_donnees_capteurs
+
+COMPLET = {'Température': -18, 'Pression_BP': 2.5, 'Pression_HP': 12, 'Courant': 5.5,
+           'Tension': 220, 'Vibration': 2, 'Humidité': 55, 'Débit_air': 150}
+
+
+def test_lot_de_dicts_masques_par_ligne():
+    """Test masques manquant / non numérique / hors limites et complétude"""
+    lot = [
+        COMPLET,
+        dict(COMPLET, Tension='230.456', Courant=99),
+        {'Température': -18, 'Pression_BP': 'abc'},
+    ]
+    resultat = valider_lot_capteurs(lot)
+    capteurs = resultat['capteurs']
+
+    assert resultat['valides'].tolist() == [True, True, False]
+    assert resultat['valeurs'][1, capteurs.index('Tension')] == 230.46
+    assert resultat['hors_limites'][1, capteurs.index('Courant')]
+    assert resultat['non_numeriques'][2, capteurs.index('Pression_BP')]
+    assert resultat['manquants'][2].sum() == 6
+
+    # Même résultat que la validation unitaire
+    assert ligne_validee(resultat, 1) == valider_donnees_capteurs(lot[1])
+
+
+def test_lot_colonnaire_et_tableau():
+    """Test entrée en colonnes et en tableau numpy"""
+    colonnes = {c: [v, v] for c, v in COMPLET.items()}
+    colonnes['Vibration'] = [2, None]
+    resultat = valider_lot_capteurs(colonnes)
+    assert resultat['valides'].all()
+    assert resultat['manquants'][:, resultat['capteurs'].index('Vibration')].tolist() == [False, True]
+
+    tableau = np.array([[COMPLET[c] for c in resultat['capteurs']]] * 3)
+    tableau[2, :4] = np.nan
+    assert valider_lot_capteurs(tableau)['valides'].tolist() == [True, True, False]
+
+
+def test_memes_regles_que_la_validation_unitaire():
+    """Test 'nan' numérique comme float(), comptée dans la complétude"""
+    lot = [dict(COMPLET, Température='nan', Courant='abc', Tension=None, Vibration='nan')]
+    resultat = valider_lot_capteurs(lot)
+    capteurs = resultat['capteurs']
+
+    assert not resultat['non_numeriques'][0, capteurs.index('Température')]
+    assert resultat['non_numeriques'][0, capteurs.index('Courant')]
+    attendu = valider_donnees_capteurs(lot[0])
+    obtenu = ligne_validee(resultat, 0)
+    assert obtenu.keys() == attendu.keys()
+    assert np.isnan(obtenu['Température']) and np.isnan(attendu['Température'])
+
+
+def test_colonnes_de_longueurs_differentes():
+    """Test erreur explicite au lieu d'une erreur de broadcast numpy"""
+    colonnes = {c: [v, v] for c, v in COMPLET.items()}
+    colonnes['Courant'] = [5.5]
+    with pytest.raises(ValueError, match='longueurs différentes'):
+        valider_lot_capteurs(colonnes)
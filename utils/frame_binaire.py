@@ -0,0 +1,111 @@
+"""
+Trame binaire capteurs - Format compact à disposition fixe (passerelles embarquées)
+
+Disposition (little-endian, 60 octets par relevé):
+    magic       2s   b'FR'
+    version     u8   1
+    masque      u8   bit i à 1 = capteur i absent (ordre de SEUILS_VALIDES)
+    device_id   16s  identifiant ASCII/UTF-8 complété par des octets nuls
+    timestamp   u64  epoch en millisecondes
+    capteurs    8 x float32 dans l'ordre de SEUILS_VALIDES
+
+Un corps de requête peut contenir plusieurs trames concaténées.
+"""
+
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from utils.validation import CAPTEURS
+
+MAGIC = b'FR'
+VERSION = 1
+TYPES_MIME_FRAME = ('application/vnd.frigo.frame',)
+
+DTYPE_FRAME = np.dtype([
+    ('magic', 'S2'),
+    ('version', 'u1'),
+    ('masque', 'u1'),
+    ('device_id', 'S16'),
+    ('timestamp_ms', '<u8'),
+    ('capteurs', '<f4', (len(CAPTEURS),)),
+])
+TAILLE_FRAME = DTYPE_FRAME.itemsize  # 60 octets
+
+_BITS = (1 << np.arange(len(CAPTEURS))).astype(np.uint8)
+
+
+def est_frame(corps: bytes) -> bool:
+    """
+    Reconnaît des trames envoyées sans Content-Type dédié (application/octet-stream)
+
+    Un corps JSON ne peut pas commencer par le magic 'FR'.
+    """
+    return bool(corps) and len(corps) % TAILLE_FRAME == 0 and corps[:3] == MAGIC + bytes([VERSION])
+
+
+def encoder_frame(device_id: str, capteurs: Dict[str, float], timestamp: Optional[float] = None) -> bytes:
+    """
+    Encode un relevé en trame binaire
+
+    Args:
+        device_id: Identifiant de l'équipement (16 octets max)
+        capteurs: Valeurs des capteurs (absents = bit de masque à 1)
+        timestamp: Epoch en secondes (défaut: maintenant)
+
+    Returns:
+        Trame de TAILLE_FRAME octets
+    """
+    identifiant = device_id.encode('utf-8')
+    if len(identifiant) > 16:
+        raise ValueError(f"device_id trop long: {len(identifiant)} octets (max 16)")
+
+    frame = np.zeros(1, dtype=DTYPE_FRAME)
+    frame['magic'] = MAGIC
+    frame['version'] = VERSION
+    frame['device_id'] = identifiant
+    frame['timestamp_ms'] = int((time.time() if timestamp is None else timestamp) * 1000)
+
+    masque = 0
+    for i, capteur in enumerate(CAPTEURS):
+        if capteurs.get(capteur) is None:
+            masque |= 1 << i
+        else:
+            frame['capteurs'][0, i] = capteurs[capteur]
+    frame['masque'] = masque
+    return frame.tobytes()
+
+
+def decoder_frames(corps: bytes) -> Dict[str, np.ndarray]:
+    """
+    Décode une ou plusieurs trames concaténées sans copie champ par champ
+
+    Args:
+        corps: Octets reçus (multiple de TAILLE_FRAME)
+
+    Returns:
+        Dict avec device_id (S16), timestamp (float64 epoch secondes),
+        valeurs (n, 8) float64 avec NaN pour les capteurs absents, manquants (n, 8)
+
+    Raises:
+        ValueError: Si la taille, le magic ou la version est invalide
+    """
+    if not corps or len(corps) % TAILLE_FRAME:
+        raise ValueError(f"Trame invalide: {len(corps)} octets (multiple de {TAILLE_FRAME} attendu)")
+
+    frames = np.frombuffer(corps, dtype=DTYPE_FRAME)
+    invalides = np.flatnonzero((frames['magic'] != MAGIC) | (frames['version'] != VERSION))
+    if len(invalides):
+        raise ValueError(f"Trame {invalides[0]} invalide: magic ou version inconnu")
+
+    manquants = (frames['masque'][:, None] & _BITS) != 0
+    valeurs = frames['capteurs'].astype(np.float64)
+    valeurs[manquants] = np.nan
+
+    return {
+        'device_id': frames['device_id'],
+        'timestamp': frames['timestamp_ms'] / 1000.0,
+        'valeurs': valeurs,
+        'manquants': manquants
+    }
@@ -2,10 +2,11 @@
 Helpers utilitaires - Fonctions communes
 """
 
+import re
 import time
 import uuid
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Any, List
 
 logger = logging.getLogger(__name__)
@@ -49,6 +50,71 @@ def formater_datetime(dt: datetime, format_str: str = '%Y-%m-%d %H:%M:%S') -> st
     return dt.strftime(format_str) if dt else ""
 
 
+def normaliser_timestamp(texte: str, fin: bool = False) -> str:
+    """
+    Normalise un timestamp ISO 8601 pour comparaison avec les timestamps stockés
+    
+    Les diagnostics sont horodatés en heure locale naïve (datetime.now()):
+    un timestamp avec fuseau est converti en heure locale. En borne de fin,
+    la date ou l'heure donnée est incluse en entier, à la microseconde.
+    
+    Exemples:
+        normaliser_timestamp('2025-01-15') -> '2025-01-15T00:00:00'
+        normaliser_timestamp('2025-01-15', fin=True) -> '2025-01-15T23:59:59.999999'
+        normaliser_timestamp('2025-01-15T08:00', fin=True) -> '2025-01-15T08:00:59.999999'
+    
+    Args:
+        texte: Date ou date-heure ISO 8601
+        fin: Borne de fin incluse (sinon borne de début)
+        
+    Returns:
+        Timestamp ISO comparable lexicographiquement
+        
+    Raises:
+        ValueError: Si le format est invalide
+    """
+    try:
+        texte = texte.strip()
+        dt = datetime.fromisoformat(texte.replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        raise ValueError(f"Timestamp invalide: {texte} (attendu: ISO 8601, ex. 2025-01-15T08:00:00)")
+    
+    if fin:
+        # Précision donnée: jour, heure, minute, seconde (avant fuseau éventuel)
+        heure = re.split(r'[Zz+-]', texte[11:], maxsplit=1)[0] if len(texte) > 10 else ''
+        if '.' not in heure:
+            unite = (timedelta(days=1), timedelta(hours=1), timedelta(minutes=1),
+                     timedelta(seconds=1))[heure.count(':') + 1 if heure else 0]
+            dt += unite - timedelta(microseconds=1)
+    
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt.isoformat(timespec='microseconds') if fin else dt.isoformat()
+
+
+def horodatage_releve(valeur: Any) -> str:
+    """
+    Timestamp d'un relevé (epoch en secondes ou ISO 8601) au format stocké
+    
+    Un relevé sans horodatage exploitable (absent, nul, invalide) est daté
+    de sa réception.
+    
+    Args:
+        valeur: Timestamp fourni par le capteur / la passerelle
+        
+    Returns:
+        Timestamp ISO en heure locale naïve
+    """
+    try:
+        if isinstance(valeur, (int, float)) and not isinstance(valeur, bool) and valeur > 0:
+            return datetime.fromtimestamp(valeur).isoformat()
+        if isinstance(valeur, str) and valeur.strip():
+            return normaliser_timestamp(valeur)
+    except (ValueError, OverflowError, OSError):
+        logger.warning(f"⚠️ Timestamp de relevé ignoré: {valeur!r}")
+    return datetime.now().isoformat()
+
+
 def calculer_duree(debut: float, fin: float = None) -> float:
     """
     Calcule la durée en secondes
@@ -88,6 +154,40 @@ def formater_duree(secondes: float) -> str:
     return f"{heures}h {minutes}m {secondes:.0f}s"
 
 
+def parser_duree(texte: str) -> int:
+    """
+    Convertit une durée lisible en secondes
+    
+    Exemple: parser_duree('24h') -> 86400
+    
+    Args:
+        texte: Durée au format "<n>s", "<n>m", "<n>h" ou "<n>d"
+        
+    Returns:
+        Durée en secondes
+        
+    Raises:
+        ValueError: Si le format est invalide
+    """
+    unites = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    texte = str(texte).strip().lower()
+    
+    if texte[-1:] in unites:
+        nombre, unite = texte[:-1], texte[-1]
+    else:
+        nombre, unite = texte, 's'
+    
+    try:
+        valeur = int(nombre)
+    except ValueError:
+        raise ValueError(f"Durée invalide: {texte} (attendu: 90s, 15m, 24h, 7d)")
+    
+    if valeur <= 0:
+        raise ValueError(f"Durée invalide: {texte} (doit être positive)")
+    
+    return valeur * unites[unite]
+
+
 def classer_urgence(score_confiance: float) -> str:
     """
     Classe l'urgence basée sur le score de confiance
@@ -0,0 +1,121 @@
+"""
+Décodage des payloads capteurs - JSON rapide / MessagePack, formes plate, imbriquée et lot
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # Optionnel: json standard sinon
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optionnel: MessagePack refusé sinon
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+TYPES_MSGPACK = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+# Clés portant les capteurs (forme imbriquée) et la liste des relevés (forme lot)
+CLES_CAPTEURS = ('capteurs', 'donnees_capteurs')
+CLES_LOT = ('releves', 'readings', 'batch')
+CHAMPS_CONTEXTE = ('source', 'localisation', 'timestamp', 'diagnostic_id')
+
+
+class PayloadNonSupporte(ValueError):
+    """Type de contenu reconnu mais décodeur non installé"""
+
+
+def decoder_corps(corps: bytes, content_type: Optional[str] = None) -> Any:
+    """
+    Décode le corps brut d'une requête selon son Content-Type
+
+    Args:
+        corps: Octets reçus
+        content_type: En-tête Content-Type (JSON par défaut)
+
+    Returns:
+        Objet décodé
+
+    Raises:
+        PayloadNonSupporte: MessagePack demandé mais non installé
+        ValueError: Corps vide ou illisible
+    """
+    if not corps:
+        raise ValueError("Corps de requête vide")
+
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if mimetype in TYPES_MSGPACK:
+        if msgpack is None:
+            raise PayloadNonSupporte("MessagePack non supporté: module msgpack non installé")
+        try:
+            return msgpack.unpackb(corps, raw=False)
+        except Exception as e:
+            raise ValueError(f"MessagePack invalide: {e}")
+
+    try:
+        if orjson is not None:
+            return orjson.loads(corps)
+        return json.loads(corps)
+    except ValueError as e:
+        raise ValueError(f"JSON invalide: {e}")
+
+
+def _releve(element: Dict, contexte: Dict) -> Dict:
+    """Forme normalisée d'un relevé: capteurs + contexte (source, localisation...)"""
+    capteurs = None
+    for cle in CLES_CAPTEURS:
+        if isinstance(element.get(cle), dict):
+            capteurs = element[cle]
+            break
+
+    releve = {champ: element.get(champ, contexte.get(champ)) for champ in CHAMPS_CONTEXTE}
+    releve['capteurs'] = element if capteurs is None else capteurs
+    return releve
+
+
+def normaliser_payload(donnees: Any) -> Tuple[List[Dict], bool]:
+    """
+    Ramène les formes de payload acceptées à une liste de relevés
+
+    Formes reconnues:
+        plate:     {"Température": -18, ..., "source": "..."}
+        imbriquée: {"capteurs": {"Température": -18, ...}, "source": "..."}
+        lot:       [relevé, ...] ou {"releves": [relevé, ...], "source": "..."}
+                   (chaque relevé plat ou imbriqué, le contexte du lot sert de défaut)
+
+    Args:
+        donnees: Payload décodé
+
+    Returns:
+        Tuple (relevés normalisés {capteurs, source, localisation, timestamp, diagnostic_id}, est_lot)
+
+    Raises:
+        ValueError: Si la forme n'est pas reconnue
+    """
+    contexte = {}
+    elements = None
+
+    if isinstance(donnees, list):
+        elements = donnees
+    elif isinstance(donnees, dict):
+        for cle in CLES_LOT:
+            if isinstance(donnees.get(cle), list):
+                elements = donnees[cle]
+                contexte = donnees
+                break
+        if elements is None:
+            return [_releve(donnees, contexte)], False
+    else:
+        raise ValueError(f"Payload non reconnu: {type(donnees).__name__}")
+
+    releves = []
+    for i, element in enumerate(elements):
+        if not isinstance(element, dict):
+            raise ValueError(f"Relevé {i} invalide: objet attendu")
+        releves.append(_releve(element, contexte))
+    return releves, True
@@ -0,0 +1,282 @@
+"""
+Persistance - Écritures atomiques et snapshots différés (write-behind)
+"""
+
+import os
+import json
+import atexit
+import logging
+import tempfile
+import threading
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: un seul processus, pas de verrou de fichier
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Snapshotters vivants, cédés avant chaque fork (workers gunicorn)
+_INSTANCES = weakref.WeakSet()
+
+
+def _avant_fork() -> None:
+    for instance in list(_INSTANCES):
+        instance._ceder()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_avant_fork)
+
+
+def ecrire_json_atomique(chemin: str, donnees: Any, indent: Optional[int] = 2) -> None:
+    """
+    Écrit un fichier JSON de façon atomique (fichier temporaire + rename)
+
+    Un lecteur ou un crash ne voit jamais un fichier à moitié écrit:
+    soit l'ancienne version, soit la nouvelle.
+
+    Args:
+        chemin: Fichier de destination
+        donnees: Données sérialisables en JSON
+        indent: Indentation JSON (None pour compact)
+    """
+    chemin = Path(chemin)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp = tempfile.mkstemp(prefix=f".{chemin.name}.", suffix='.tmp', dir=str(chemin.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(donnees, f, indent=indent, ensure_ascii=False, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, chemin)
+    except Exception:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class SnapshotDiffere:
+    """
+    Persistance write-behind d'un état JSON
+
+    Chaque mise à jour est ajoutée à un petit journal (une ligne JSON compacte
+    contenant les clés modifiées, en valeurs absolues). Le snapshot complet
+    n'est réécrit (temporaire + rename) que toutes les `flush_every` mises à
+    jour ou toutes les `flush_interval` secondes, puis le journal est vidé.
+
+    Au démarrage, `charger()` relit le snapshot puis rejoue le journal: aucune
+    mise à jour journalisée n'est perdue en cas d'arrêt brutal.
+
+    Sans journal (`journal=False`), seul le snapshot périodique est écrit:
+    adapté aux états reconstructibles où perdre le dernier intervalle est
+    acceptable.
+
+    Un seul processus écrit les fichiers (verrou `fcntl` sur `<fichier>.lock`):
+    les autres workers d'un même serveur n'y touchent pas, au lieu de
+    tronquer le journal avec leur propre copie de l'état. Le processus
+    parent cède le verrou avant un fork; dans le processus enfant, journal
+    et flush périodique sont rouverts à la première écriture.
+    """
+
+    def __init__(self,
+                 fichier: str,
+                 fournir_etat: Callable[[], Dict],
+                 flush_every: int = 50,
+                 flush_interval: float = 10.0,
+                 journal: bool = True):
+        """
+        Initialise le snapshotter
+
+        Args:
+            fichier: Chemin du snapshot JSON
+            fournir_etat: Fonction retournant une copie cohérente de l'état complet
+            flush_every: Nombre de mises à jour avant réécriture du snapshot
+            flush_interval: Délai max (secondes) avant réécriture du snapshot
+            journal: Journaliser chaque mise à jour (sinon snapshot seul)
+        """
+        self.fichier = Path(fichier)
+        self.journal_file = self.fichier.with_name(self.fichier.name + '.journal')
+        self.fournir_etat = fournir_etat
+        self.flush_every = max(1, int(flush_every))
+        self.flush_interval = flush_interval
+        self.journal = journal
+
+        self.lock_file = self.fichier.with_name(self.fichier.name + '.lock')
+        self._verrou = threading.Lock()
+        self._en_attente = 0
+        self._journal = None
+        self._arret = threading.Event()
+        self._thread = None
+        self._periodique = False
+        self._atexit = False
+        self._pid = os.getpid()
+        self._proprietaire = None
+        self._avertissement_emis = False
+
+        self.fichier.parent.mkdir(parents=True, exist_ok=True)
+        _INSTANCES.add(self)
+
+    def charger(self) -> Optional[Dict]:
+        """
+        Recharge l'état: snapshot + rejeu du journal
+
+        Returns:
+            État reconstruit, ou None si rien n'a jamais été persisté
+        """
+        etat = None
+
+        if self.fichier.exists():
+            try:
+                with open(self.fichier, 'r', encoding='utf-8') as f:
+                    etat = json.load(f)
+            except Exception as e:
+                logger.warning(f"⚠️ Snapshot illisible {self.fichier}: {e}")
+
+        if self.journal_file.exists():
+            rejouees = 0
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for ligne in f:
+                    try:
+                        modifications = json.loads(ligne)
+                    except ValueError:
+                        # Dernière ligne tronquée par un crash: on l'ignore
+                        logger.warning(f"⚠️ Ligne de journal tronquée ignorée ({self.journal_file.name})")
+                        continue
+                    if etat is None:
+                        etat = {}
+                    etat.update(modifications)
+                    rejouees += 1
+            if rejouees:
+                logger.info(f"🔁 {rejouees} mise(s) à jour rejouée(s) depuis {self.journal_file.name}")
+
+        return etat
+
+    def enregistrer(self, modifications: Optional[Dict] = None) -> None:
+        """
+        Journalise une mise à jour (clés de premier niveau, valeurs absolues)
+
+        Args:
+            modifications: Clés modifiées et leur nouvelle valeur (ignoré sans journal)
+        """
+        self._verifier_processus()
+        with self._verrou:
+            if not self._posseder():
+                return
+            if self.journal and modifications:
+                ligne = json.dumps(modifications, ensure_ascii=False, separators=(',', ':'), default=str)
+                if self._journal is None:
+                    self._journal = open(self.journal_file, 'a', encoding='utf-8')
+                self._journal.write(ligne + '\n')
+                self._journal.flush()
+            self._en_attente += 1
+            flush_requis = self._en_attente >= self.flush_every
+
+        if flush_requis:
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        Réécrit le snapshot complet et vide le journal
+
+        Returns:
+            True si succès
+        """
+        self._verifier_processus()
+        with self._verrou:
+            if not self._posseder():
+                return False
+            return self._flush_verrouille()
+
+    def _flush_verrouille(self) -> bool:
+        if self._en_attente == 0 and self.fichier.exists():
+            return True
+        try:
+            ecrire_json_atomique(self.fichier, self.fournir_etat())
+
+            # Le snapshot contient désormais tout le journal
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self.journal_file.exists():
+                open(self.journal_file, 'w').close()
+
+            self._en_attente = 0
+            return True
+        except Exception as e:
+            logger.error(f"❌ Erreur écriture snapshot {self.fichier}: {e}")
+            return False
+
+    def _posseder(self) -> bool:
+        """Ce processus est-il l'écrivain des fichiers ? (sous self._verrou, nouvel essai à chaque appel)"""
+        if self._proprietaire is not None or fcntl is None:
+            return True
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            if not self._avertissement_emis:
+                logger.warning(f"⚠️ {self.fichier.name} déjà persisté par un autre processus, "
+                               f"mises à jour de ce worker non persistées (pid {os.getpid()})")
+                self._avertissement_emis = True
+            return False
+        self._proprietaire = fd
+        return True
+
+    def _ceder(self) -> None:
+        """Avant un fork: persister l'état, fermer le journal et libérer le verrou de fichier"""
+        with self._verrou:
+            if self._proprietaire is None:
+                return
+            self._flush_verrouille()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            os.close(self._proprietaire)  # libère le flock
+            self._proprietaire = None
+
+    def _verifier_processus(self) -> None:
+        """Après un fork: repartir sans verrou, journal ni thread hérités du parent"""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._verrou = threading.Lock()
+        self._journal = None
+        self._proprietaire = None
+        self._avertissement_emis = False
+        self._arret = threading.Event()
+        self._thread = None
+        if self._periodique:
+            self.demarrer()
+
+    def demarrer(self) -> None:
+        """Démarre le flush périodique en arrière-plan (relancé dans chaque processus enfant)"""
+        self._verifier_processus()
+        self._periodique = True
+        if self._thread is not None:
+            return
+
+        def boucle():
+            while not self._arret.wait(self.flush_interval):
+                if self._en_attente:
+                    self.flush()
+
+        self._thread = threading.Thread(target=boucle, name=f"snapshot-{self.fichier.name}", daemon=True)
+        self._thread.start()
+        if not self._atexit:  # hérité par les processus enfants
+            atexit.register(self.arreter)
+            self._atexit = True
+
+    def arreter(self) -> None:
+        """Arrête le flush périodique et persiste ce qui reste"""
+        self._arret.set()
+        self.flush()
+        with self._verrou:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
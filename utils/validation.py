@@ -3,7 +3,9 @@ Validation des données - Vérification et sanitization des inputs
 """
 
 import logging
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Tuple, Union
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +21,11 @@ SEUILS_VALIDES = {
     'Débit_air': {'min': 0, 'max': 500, 'type': 'float'}
 }
 
+CAPTEURS = tuple(SEUILS_VALIDES)
+_SEUIL_MIN = np.array([SEUILS_VALIDES[c]['min'] for c in CAPTEURS], dtype=np.float64)
+_SEUIL_MAX = np.array([SEUILS_VALIDES[c]['max'] for c in CAPTEURS], dtype=np.float64)
+TAUX_COMPLETUDE = 0.7
+
 
 def valider_donnees_capteurs(donnees: Dict[str, Any]) -> Dict[str, float]:
     """
@@ -78,6 +85,118 @@ def valider_donnees_capteurs(donnees: Dict[str, Any]) -> Dict[str, float]:
         raise ValueError(f"Validation échouée: {e}")
 
 
+def _colonne_float(valeurs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convertit une colonne objet en float64
+
+    Mêmes règles que float() dans valider_donnees_capteurs: 'nan' ou 'inf'
+    sont numériques, seules les valeurs non convertibles sont signalées.
+
+    Returns:
+        Tuple (valeurs float avec NaN si absent/invalide, masque des valeurs non numériques)
+    """
+    non_numeriques = np.zeros(len(valeurs), dtype=bool)
+    try:
+        # Chemin rapide: toute la colonne est convertible d'un coup (None -> NaN)
+        resultat = valeurs.astype(np.float64)
+    except (ValueError, TypeError):
+        resultat = np.full(len(valeurs), np.nan)
+        for i in np.flatnonzero(~np.equal(valeurs, None)):
+            try:
+                resultat[i] = float(valeurs[i])
+            except (ValueError, TypeError):
+                non_numeriques[i] = True
+    return resultat, non_numeriques
+
+
+def valider_lot_capteurs(lot: Union[List[Dict[str, Any]], Dict[str, Any], np.ndarray]) -> Dict[str, Any]:
+    """
+    Valide un lot de relevés en une seule passe vectorisée
+    
+    Mêmes règles que valider_donnees_capteurs (conversion float, plages
+    SEUILS_VALIDES signalées sans rejet, 70% des capteurs requis), mais sans
+    lever d'exception: chaque ligne reçoit ses masques d'erreurs.
+    
+    Args:
+        lot: Liste de relevés (dicts), colonnes {capteur: séquence},
+             ou tableau (n, 8) dans l'ordre de SEUILS_VALIDES
+        
+    Returns:
+        Dict avec:
+            capteurs: Ordre des colonnes
+            valeurs: Tableau (n, 8) float64 arrondi, NaN si absent ou invalide
+            manquants / non_numeriques / hors_limites: Masques (n, 8)
+            presents: Masque (n, 8) des valeurs retenues (comme valider_donnees_capteurs)
+            valides: Masque (n,) des lignes suffisamment complètes
+    
+    Raises:
+        ValueError: Tableau ou colonnes de dimensions incohérentes
+    """
+    if isinstance(lot, np.ndarray):
+        valeurs = np.array(lot, dtype=np.float64, ndmin=2)
+        if valeurs.shape[1] != len(CAPTEURS):
+            raise ValueError(f"Tableau invalide: {valeurs.shape[1]} colonnes (attendu: {len(CAPTEURS)})")
+        manquants = np.isnan(valeurs)
+        non_numeriques = np.zeros_like(manquants)
+    else:
+        if isinstance(lot, dict):
+            try:
+                longueurs = {c: len(lot[c]) for c in CAPTEURS if c in lot}
+            except TypeError:
+                raise ValueError("Colonnes invalides: une séquence de valeurs attendue par capteur")
+            if len(set(longueurs.values())) > 1:
+                detail = ', '.join(f"{c}={n}" for c, n in longueurs.items())
+                raise ValueError(f"Colonnes de longueurs différentes: {detail}")
+            nb_lignes = next(iter(longueurs.values()), 0)
+            colonnes = [lot.get(c, [None] * nb_lignes) for c in CAPTEURS]
+        else:
+            nb_lignes = len(lot)
+            colonnes = [[releve.get(c) for releve in lot] for c in CAPTEURS]
+        
+        valeurs = np.full((nb_lignes, len(CAPTEURS)), np.nan)
+        manquants = np.ones((nb_lignes, len(CAPTEURS)), dtype=bool)
+        non_numeriques = np.zeros((nb_lignes, len(CAPTEURS)), dtype=bool)
+        for j, colonne in enumerate(colonnes):
+            objets = np.empty(nb_lignes, dtype=object)
+            objets[:] = list(colonne)
+            valeurs[:, j], non_numeriques[:, j] = _colonne_float(objets)
+            manquants[:, j] = np.equal(objets, None)
+    
+    presents = ~manquants & ~non_numeriques
+    with np.errstate(invalid='ignore'):
+        hors_limites = presents & ((valeurs < _SEUIL_MIN) | (valeurs > _SEUIL_MAX))
+    valides = presents.sum(axis=1) >= len(CAPTEURS) * TAUX_COMPLETUDE
+    
+    if not valides.all():
+        logger.warning(f"⚠️  Lot: {int((~valides).sum())}/{len(valides)} relevé(s) incomplet(s)")
+    
+    return {
+        'capteurs': list(CAPTEURS),
+        'valeurs': np.round(valeurs, 2),
+        'manquants': manquants,
+        'non_numeriques': non_numeriques,
+        'hors_limites': hors_limites,
+        'presents': presents,
+        'valides': valides
+    }
+
+
+def ligne_validee(resultat: Dict[str, Any], index: int) -> Dict[str, float]:
+    """
+    Reconstruit le dict {capteur: valeur} d'une ligne de valider_lot_capteurs
+    
+    Args:
+        resultat: Résultat de valider_lot_capteurs
+        index: Ligne du lot
+        
+    Returns:
+        Capteurs présents et valides (format de valider_donnees_capteurs)
+    """
+    valeurs = resultat['valeurs'][index]
+    presents = resultat['presents'][index]
+    return {c: float(valeurs[j]) for j, c in enumerate(resultat['capteurs']) if presents[j]}
+
+
 def valider_donnees_diagnostic(donnees: Dict[str, Any]) -> Tuple[bool, str]:
     """
     Valide les données complètes d'un diagnostic